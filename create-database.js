@@ -10,9 +10,45 @@ const __dirname = path.dirname(__filename);
 const envPath = path.resolve(__dirname, 'backend', `.env.${process.env.NODE_ENV || 'production'}`);
 dotenv.config({ path: envPath });
 
-function runScript(scriptPath) {
+function logScriptOutput(line) {
+    let event;
+    try {
+        event = JSON.parse(line);
+    } catch {
+        log(`Python stdout: ${line}`, 'PYTHON');
+        return;
+    }
+    // Output that parses as JSON but is not an event object (a bare number or string) is logged as is
+    if (event === null || typeof event !== 'object' || Array.isArray(event)) {
+        log(`Python stdout: ${line}`, 'PYTHON');
+        return;
+    }
+    switch (event.event) {
+        case 'log':
+            log(`Python stdout: ${event.message}`, 'PYTHON');
+            break;
+        case 'progress': {
+            const total = event.total ? `/${event.total}` : '';
+            const eta = event.eta_seconds !== null && !event.final ? `, ETA ${event.eta_seconds}s` : '';
+            log(`${event.label}: ${event.done}${total} (${Math.round(event.rate)}/sec${eta})`, 'PYTHON');
+            break;
+        }
+        case 'span_end':
+            log(`Phase ${event.span} finished in ${event.seconds}s: ${event.rows} rows, ${event.statements} statements, ` +
+                `${event.round_trips} round trips, ${event.commits} commits`, 'PYTHON');
+            break;
+        case 'summary':
+            log(`Seeding totals: ${event.rows} rows, ${event.statements} statements, ` +
+                `${event.round_trips} round trips, ${event.commits} commits`, 'PYTHON');
+            break;
+        default:
+            break;
+    }
+}
+
+function runScript(scriptPath, args = []) {
     return new Promise((resolve, reject) => {
-        const childProcess = spawn('python3', [scriptPath], {
+        const childProcess = spawn('python3', [scriptPath, ...args], {
             cwd: path.resolve(__dirname, 'database'),
             env: {
                 ...process.env,
@@ -24,8 +60,20 @@ function runScript(scriptPath) {
             }
         });
 
+        // Scripts run with --instrumentation json print one JSON event per line
+        let pending = '';
         childProcess.stdout.on('data', (data) => {
-            log(`Python stdout: ${data}`, 'PYTHON');
+            pending += data;
+            const lines = pending.split('\n');
+            pending = lines.pop();
+            for (const line of lines) {
+                logScriptOutput(line);
+            }
+        });
+        childProcess.stdout.on('end', () => {
+            if (pending) {
+                logScriptOutput(pending);
+            }
         });
 
         childProcess.stderr.on('data', (data) => {
@@ -58,11 +106,13 @@ async function main() {
         log(`DATABASE_PORT: ${process.env.DATABASE_PORT}`);
 
         log("Running 0-Create-Database.py...");
-        await runScript('0-Create-Database.py');
+        // The sample data is loaded from scratch, so the schema is rebuilt rather than migrated
+        await runScript('0-Create-Database.py', ['--reset']);
         log("0-Create-Database.py completed successfully.");
 
         log("Running 1-Insert-Sample-Data-To-Database.py...");
-        await runScript('1-Insert-Sample-Data-To-Database.py');
+        // Extra arguments are passed on, e.g. `node create-database.js --seed 42 --snapshot`
+        await runScript('1-Insert-Sample-Data-To-Database.py', ['--instrumentation', 'json', ...process.argv.slice(2)]);
         log("1-Insert-Sample-Data-To-Database.py completed successfully.");
     } catch (error) {
         log(`An error occurred: ${error}`, 'ERROR');
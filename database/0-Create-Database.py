@@ -1,8 +1,14 @@
 import mysql.connector
 from mysql.connector import errorcode
+import argparse
 import datetime
+import time
 import os
 
+from seeding.migrations import MIGRATIONS, applied_versions, apply_migrations
+from seeding.orders import START_DATE
+from seeding.partitions import periods_ahead, plan_future_partitions, plan_partitioning
+
 # Use environment variables passed from Node.js
 DATABASE_HOST = os.environ.get('DATABASE_HOST')
 DATABASE_USER = os.environ.get('DATABASE_USER')
@@ -30,216 +36,106 @@ config = {
 def log(message):
     print(message)
     
+parser = argparse.ArgumentParser(description="Create or migrate the food ordering database schema.")
+parser.add_argument('--reset', action='store_true',
+                    help="Drop the database and build it again from migration 1 (used before a full reseed)")
+parser.add_argument('--dry-run', action='store_true',
+                    help="Only list the migrations and statements that would be applied")
+parser.add_argument('--target', type=int, default=None, metavar='VERSION',
+                    help=f"Apply migrations up to this version (default: latest, {MIGRATIONS[-1].version})")
+parser.add_argument('--indexes', choices=('create', 'defer'), default='create',
+                    help="Create the hot-path secondary indexes now, or defer them until after the bulk load "
+                         "(1-Insert-Sample-Data-To-Database.py --build-indexes) (default: create)")
+parser.add_argument('--partition', choices=('month', 'year'), default=None,
+                    help="Range-partition Orders, OrderDetails and PaymentDetails by month or year of their date. "
+                         "This drops their foreign keys and adds the date to their primary keys")
+parser.add_argument('--partitions-from', type=datetime.date.fromisoformat, default=START_DATE,
+                    help=f"First period given its own partition with --partition, YYYY-MM-DD (default: {START_DATE})")
+parser.add_argument('--partitions-ahead', type=int, default=3,
+                    help="Months or years after the current one to keep partitions for; every run "
+                         "adds the missing ones to already partitioned tables (default: 3)")
+args = parser.parse_args()
+
 log("---------------------------------")
 log("Script started.")
 
 try:
+    started = time.perf_counter()
     # Establish the connection
     conn = mysql.connector.connect(**config)
     cursor = conn.cursor()
     log("---------------------------------")
     log("Connection to the database has been established.")
     log("---------------------------------")
-    # Drop the existing database if it exists
-    log("Dropping the existing database if it exists.")
-    log("---------------------------------")
-    cursor.execute(f'DROP DATABASE IF EXISTS {os.getenv("DATABASE_NAME")}')
-    log("The previous database has been deleted.")
-    log("---------------------------------")
-
-    # Recreate the database
-    log("Creating the new database.")
-    log("---------------------------------")
-    cursor.execute(f'CREATE DATABASE {os.getenv("DATABASE_NAME")}')
-    log("The database has been successfully created.")
-    log("---------------------------------")
-
-    # Start using the new database
-    log("Switching to the new database.")
-    log("---------------------------------")
-    cursor.execute(f'USE {os.getenv("DATABASE_NAME")}')
-
-    # Create Customers table
-    log("Creating Customers table.")
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS Customers (
-            CustomerID BIGINT AUTO_INCREMENT PRIMARY KEY,
-            Name VARCHAR(255),
-            Email VARCHAR(255),
-            Address TEXT,
-            Phone VARCHAR(20),
-            Password VARCHAR(255)
-        )
-    ''')
-
-    # Create Users table for Admins
-    log("Creating Users table for Admins.")
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS Users (
-            UserID BIGINT AUTO_INCREMENT PRIMARY KEY,
-            Name VARCHAR(255),
-            Email VARCHAR(255),
-            Role ENUM('admin') DEFAULT 'admin',
-            Password VARCHAR(255)
-        ) AUTO_INCREMENT=1000000
-    ''')
-
-    # Create Products table
-    log("Creating Products table.")
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS Products (
-            ProductID INT AUTO_INCREMENT PRIMARY KEY,
-            Name VARCHAR(255),
-            Cost DECIMAL(10, 2),
-            Price DECIMAL(10, 2),
-            DynamicPrice DECIMAL(10, 2) DEFAULT NULL,
-            Category VARCHAR(100),
-            LastUpdated DATETIME DEFAULT CURRENT_TIMESTAMP,
-            Ranking INT DEFAULT 9999,
-            LowStock BOOLEAN DEFAULT FALSE
-        )
-    ''')
-
-    # Create Orders table
-    log("Creating Orders table.")
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS Orders (
-            OrderID INT AUTO_INCREMENT PRIMARY KEY,
-            CustomerID BIGINT,
-            OrderDate DATETIME,
-            OrderStatus VARCHAR(50) DEFAULT 'Delivered',
-            FOREIGN KEY (CustomerID) REFERENCES Customers(CustomerID)
-        )
-    ''')
-
-    # Create OrderDetails table for processed cart items
-    log("Creating OrderDetails table.")
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS OrderDetails (
-            OrderDetailID INT AUTO_INCREMENT PRIMARY KEY,
-            OrderID INT,
-            ProductID INT,
-            Quantity INT,
-            TotalPrice DECIMAL(10, 2),
-            FOREIGN KEY (OrderID) REFERENCES Orders(OrderID),
-            FOREIGN KEY (ProductID) REFERENCES Products(ProductID)
-        )
-    ''')
-
-    # Create PaymentDetails table
-    log("Creating PaymentDetails table.")
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS PaymentDetails (
-            PaymentID INT AUTO_INCREMENT PRIMARY KEY,
-            OrderID INT,
-            PaymentAmount DECIMAL(10, 2),
-            PaymentDate DATETIME,
-            PaymentMethod VARCHAR(50),
-            PaymentStatus ENUM('Pending', 'Completed', 'Failed') DEFAULT 'Pending',
-            FOREIGN KEY (OrderID) REFERENCES Orders(OrderID)
-        )
-    ''')
-
-    # Create PopularProducts table
-    log("Creating PopularProducts table.")
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS PopularProducts (
-            ProductID INT PRIMARY KEY,
-            PopularityScore DECIMAL(10, 2),
-            FOREIGN KEY (ProductID) REFERENCES Products(ProductID)
-        )
-    ''')
-
-    # Create DynamicPricing table
-    log("Creating DynamicPricing table.")
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS DynamicPricing (
-            ProductID INT PRIMARY KEY,
-            CurrentPrice DECIMAL(10, 2),
-            LastUpdated DATETIME,
-            FOREIGN KEY (ProductID) REFERENCES Products(ProductID)
-        )
-    ''')
-
-    # Create OrderPatterns table
-    log("Creating OrderPatterns table.")
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS OrderPatterns (
-            ProductID INT,
-            OrderHour INT,
-            OrderCount INT,
-            PRIMARY KEY (ProductID, OrderHour),
-            FOREIGN KEY (ProductID) REFERENCES Products(ProductID)
-        )
-    ''')
-
-    # Create ProductOrders table
-    log("Creating ProductOrders table.")
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS ProductOrders (
-            ProductOrderID INT AUTO_INCREMENT PRIMARY KEY,
-            ProductID INT,
-            OrderHour INT,
-            OrderDayOfWeek INT,
-            Season VARCHAR(50),
-            OrderCount INT,
-            FOREIGN KEY (ProductID) REFERENCES Products(ProductID)
-        )
-    ''')
-
-    # Create InventoryStatus table
-    log("Creating InventoryStatus table.")
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS InventoryStatus (
-            ProductID INT PRIMARY KEY,
-            StockLevel INT,
-            LastUpdated DATETIME,
-            FOREIGN KEY (ProductID) REFERENCES Products(ProductID)
-        )
-    ''')
-
-    # Create Promotions table
-    log("Creating Promotions table.")
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS Promotions (
-            PromotionID INT AUTO_INCREMENT PRIMARY KEY,
-            ProductID INT,
-            StartDate DATE,
-            EndDate DATE,
-            DiscountPercentage DECIMAL(5, 2),
-            FOREIGN KEY (ProductID) REFERENCES Products(ProductID)
-        )
-    ''')
-
-    # Create ShoppingSession table
-    log("Creating ShoppingSession table.")
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS ShoppingSession (
-            SessionID BIGINT AUTO_INCREMENT PRIMARY KEY,
-            UserID BIGINT UNIQUE,
-            Total DECIMAL(10, 2) NOT NULL DEFAULT '0.00',
-            CreatedAt TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-            ModifiedAt TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-            FOREIGN KEY (UserID) REFERENCES Customers(CustomerID)
-        )
-    ''')
+    database_name = os.getenv("DATABASE_NAME")
+
+    if args.reset:
+        # Drop the existing database if it exists
+        log("Dropping the existing database if it exists.")
+        if not args.dry_run:
+            cursor.execute(f'DROP DATABASE IF EXISTS {database_name}')
+            log("The previous database has been deleted.")
+        log("---------------------------------")
 
-    # Create CartItem table
-    log("Creating CartItem table.")
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS CartItem (
-            CartItemID INT AUTO_INCREMENT PRIMARY KEY,
-            SessionID BIGINT,
-            ProductID INT,
-            Quantity INT NOT NULL,
-            DateAdded TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (SessionID) REFERENCES ShoppingSession(SessionID),
-            FOREIGN KEY (ProductID) REFERENCES Products(ProductID)
-        )
-    ''')
+    cursor.execute('SELECT COUNT(*) FROM information_schema.SCHEMATA WHERE SCHEMA_NAME = %s', (database_name,))
+    database_exists = cursor.fetchone()[0] and not (args.reset and args.dry_run)
+    if not database_exists:
+        log(f"Creating the database {database_name}.")
+        if not args.dry_run:
+            cursor.execute(f'CREATE DATABASE {database_name}')
+            database_exists = True
+    if database_exists:
+        cursor.execute(f'USE {database_name}')
+
+    # Apply the schema migrations that are missing
+    applied = applied_versions(cursor) if database_exists else set()
+    results = apply_migrations(conn, cursor, applied, target=args.target, defer_indexes=(args.indexes == 'defer'),
+                               dry_run=args.dry_run)
+    for migration, statements, seconds in results:
+        if args.dry_run:
+            log(f"Would apply migration {migration.version}: {migration.name}")
+            for statement in statements:
+                log(f"    {' '.join(statement.split())}")
+        elif not statements:
+            log(f"Migration {migration.version}: {migration.name} was already in place; recorded as applied.")
+        else:
+            log(f"Applied migration {migration.version}: {migration.name} "
+                f"({len(statements)} statements in {seconds:.2f}s)")
+    if args.indexes == 'defer':
+        log("Secondary indexes deferred until after the bulk load.")
+
+    # Partition the order tables if asked to, and keep partitions ahead of the current date
+    today = datetime.date.today()
+    partition_steps = []
+    if args.partition:
+        partition_steps.append(("Partitioning the order tables by " + args.partition,
+                                lambda: plan_partitioning(cursor, args.partition, args.partitions_from,
+                                                          periods_ahead(today, args.partition, args.partitions_ahead))))
+    partition_steps.append(("Adding future partitions",
+                            lambda: plan_future_partitions(cursor, today, args.partitions_ahead)))
+    for description, plan in partition_steps:
+        statements = plan() if database_exists else []
+        if not statements:
+            continue
+        log(f"{'Would run' if args.dry_run else 'Running'}: {description}")
+        step_started = time.perf_counter()
+        for statement in statements:
+            if args.dry_run:
+                log(f"    {' '.join(statement.split())}")
+            else:
+                cursor.execute(statement)
+        if not args.dry_run:
+            conn.commit()
+            log(f"{description}: {len(statements)} statements in {time.perf_counter() - step_started:.2f}s")
 
     log("---------------------------------")
-    log("All necessary tables have been successfully created.")
+    if not results:
+        log(f"The schema is up to date (version {max(applied, default=0)}).")
+    elif args.dry_run:
+        log(f"{len(results)} migrations would be applied.")
+    else:
+        log(f"The schema has been migrated to version {results[-1][0].version}.")
+    log(f"Finished in {(time.perf_counter() - started) * 1000:.0f}ms.")
     log("---------------------------------")
 
 except mysql.connector.Error as err:
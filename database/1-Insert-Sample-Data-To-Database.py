@@ -1,12 +1,44 @@
-from concurrent.futures import ThreadPoolExecutor
-import bcrypt
-import faker
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import collections
 import random
 import mysql.connector
 import datetime
+import resource
+import shutil
+import time
 import sys
 import os
 
+from seeding.bulkload import BULK_LOAD_COMMIT_ROWS, begin_bulk_load, end_bulk_load, verify_integrity
+from seeding.checkpoints import (CHECKPOINT_COMMIT_ROWS, DEFAULT_RETRIES, RUN_CHECKPOINT, clear_checkpoints,
+                                 ensure_checkpoint_table, is_retryable, load_checkpoints, record_checkpoint,
+                                 retry_delay)
+from seeding.credentials import (CREDENTIAL_FORMATS, credentials_path, format_credentials, open_credentials,
+                                 truncate_credentials)
+from seeding.customers import (build_customer, email_digest_chunk, generate_customer_chunk, hash_customer_chunk,
+                               init_worker)
+from seeding.emails import EMAIL_DIGEST_SIZE, DuplicateEmails, email_digest
+from seeding.instrumentation import Instrumentation
+from seeding.migrations import applied_versions
+from seeding.hashing import DEFAULT_BCRYPT_COST, HashCache, hash_password
+from seeding.schema import create_indexes, drop_indexes, foreign_key_indexes
+from seeding.orders import (DEFAULT_ORDER_COUNTS, ORDER_GENERATORS, START_DATE, OrderAggregates, OrderCountDistribution,
+                            OrderSettings, count_orders, load_product_orders, parse_order_counts, register_order_tables,
+                            write_orders)
+from seeding.partitions import order_details_dated
+from seeding.pipeline import Stage, format_stage_stats, run_pipeline
+from seeding.sessions import DEFAULT_SESSION_SHARE, register_session_tables, write_sessions
+from seeding.rollups import (ORDER_DERIVED_WATERMARK, ensure_rollup_tables, get_watermark, refresh_customer_stats,
+                             refresh_daily_product_sales, refresh_order_derived_tables, set_watermark)
+from seeding.shards import plan_id_offsets, split_customer_range
+from seeding.sinks import SINKS, add_sink_rows, default_sink_path, open_sink, sink_available, sink_rows, sink_summary
+from seeding.snapshots import restore_snapshot, save_snapshot, schema_fingerprint, snapshot_key, snapshot_path
+from seeding.streams import chunked
+from seeding.tenants import MAX_CATALOGUE_VARIATION, vary_catalogue
+from seeding import vectorized
+from seeding.writers import WRITERS
+
 # Use environment variables passed from Node.js
 DATABASE_HOST = os.environ.get('DATABASE_HOST')
 DATABASE_USER = os.environ.get('DATABASE_USER')
@@ -14,14 +46,6 @@ DATABASE_PASSWORD = os.environ.get('DATABASE_PASSWORD')
 DATABASE_NAME = os.environ.get('DATABASE_NAME')
 DATABASE_PORT = os.environ.get('DATABASE_PORT')
 
-# Print environment variables to check if they are loaded correctly
-print("Environment Variables:")
-print(f"DATABASE_HOST: {DATABASE_HOST}")
-print(f"DATABASE_USER: {DATABASE_USER}")
-print(f"DATABASE_PASSWORD: {DATABASE_PASSWORD}")
-print(f"DATABASE_NAME: {DATABASE_NAME}")
-print(f"DATABASE_PORT: {DATABASE_PORT}")
-
 # Database connection configuration
 config = {
     'user': DATABASE_USER,
@@ -31,520 +55,1295 @@ config = {
     'database': DATABASE_NAME
 }
 
+# Defining the file path where customer passwords will be saved; main() gives it the suffix of
+# the format, .txt for the default text blocks
+password_file_path = os.path.join(os.path.dirname(__file__), "Customer_Passwords_Pre_Hash.txt")
+
+# Default directory of the dataset snapshots saved and restored with --snapshot
+SNAPSHOT_DIRECTORY = os.path.join(os.path.dirname(__file__), "snapshots")
+
+# Format of the credential file selected with --credentials-format ('text', 'csv' or 'jsonl')
+credentials_format = 'text'
+
+# Connection shared by the generation phases, opened in main()
+conn = None
+cursor = None
+
+# Table loader selected with --loader ('insert' or 'load-data')
+loader = 'insert'
+
+# Sink the tables are written to, selected with --sink ('mysql' or a stand-in such as
+# 'sqlite' or 'null'), and where a stand-in sink writes
+sink = 'mysql'
+sink_path = None
+
+# Bulk-load mode (--bulk-load): foreign key and unique checks off on every connection
+bulk_load = False
+
+# Rows written between intermediate commits, 0 to commit once per phase (--commit-rows)
+commit_rows = 0
+
+# Checkpoints of a resumable run as {phase: Checkpoint}, or None when the run records none
+# (runs without --checkpoint or --resume), and the retries of a phase after a lost connection
+checkpoints = None
+retries = DEFAULT_RETRIES
+
+# Phases that failed and were rolled back; a run with failures is not marked complete
+failed_phases = 0
+
+# Default directory of the files written by stand-in sinks
+SINK_DIRECTORY = os.path.join(os.path.dirname(__file__), "output")
+
+# Spans, counters and progress reporting, configured with --instrumentation in main()
+instrumentation = Instrumentation()
+
 # Logging function
 def log(message):
-    print(message)
+    instrumentation.log(message)
 
-# Recording the start time
-start_time = datetime.datetime.now()
+# Function to create a table writer for the selected loader, committing every
+# commit_rows rows when intermediate commits are enabled. A resumable run commits only
+# at the checkpoints of a phase that records them with record(position); the other
+# phases commit once, together with the checkpoint marking them done.
+# The writer uses the shared connection unless it is given another one and its cursor.
+def new_writer(record=None, connection=None, writer_cursor=None):
+    connection = connection or conn
+    writer = WRITERS[loader](writer_cursor or cursor)
+    if commit_rows and checkpoints is not None:
+        if record:
+            writer.commit_at_checkpoints(connection.commit, commit_rows, record)
+    elif commit_rows:
+        writer.commit_every(connection.commit, commit_rows)
+    return writer
 
-# Function to generate random password
-def generate_password(fake):
-    while True:
-        password = fake.password(length=12, special_chars=True, digits=True, upper_case=True, lower_case=True)
-        if (
-            any(c.islower() for c in password) and
-            any(c.isupper() for c in password) and
-            any(c.isdigit() for c in password) and
-            any(c in '!@#$%^&*()-_=+' for c in password)
-        ):
-            return password
-
-# Function to hash the password
-def hash_password(password, cost=10):
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(cost)).decode('utf-8')
-
-# Function to add a customer
-def insert_customer(fake, customer_id):
-    name = fake.name()
-    email = fake.email()
-    phone_number = ''.join([str(random.randint(0, 9)) for _ in range(random.randint(10, 12))])
-    address = fake.address()
-
-    password = generate_password(fake)
-    hashed_password = hash_password(password)
-    return (customer_id, name, email, hashed_password, address, phone_number, password)
-
-try:
-    # Establishing database connection
-    conn = mysql.connector.connect(**config)
+# Function to open a connection to a sink for a table loader, with the checks a bulk load
+# skips turned off. LOAD DATA LOCAL INFILE has to be allowed explicitly on the client side.
+def open_connection(sink_name, path, table_loader, bulk, allow_local_infile=False):
+    connection = open_sink(sink_name, path, config,
+                           allow_local_infile=(table_loader == 'load-data' or allow_local_infile))
+    if bulk:
+        bulk_cursor = connection.cursor()
+        begin_bulk_load(bulk_cursor)
+        bulk_cursor.close()
+    return connection
+
+# Function to open a connection to the selected sink for the selected loader
+def connect(allow_local_infile=False):
+    return open_connection(sink, sink_path, loader, bulk_load, allow_local_infile)
+
+# Function to open the connection of a pipeline's write stage, which runs on its own
+# thread and so does not share the cursor of the other phases. Stand-in sinks answer
+# lookups from the rows written through their connection, so they share the main one.
+# Returns (connection, cursor).
+def open_writer_connection():
+    if sink != 'mysql':
+        return conn, cursor
+    writer_conn = instrumentation.connection(connect())
+    return writer_conn, writer_conn.cursor()
+
+# Function to close the connection of a write stage, after rolling back what it did not commit
+def close_writer_connection(writer_conn, writer_cursor):
+    if writer_conn is conn:
+        return
+    try:
+        writer_conn.rollback()
+        writer_cursor.close()
+        writer_conn.close()
+    except mysql.connector.Error:
+        pass
+
+# Function to replace a lost connection with a new one
+def reconnect():
+    global conn, cursor
+    try:
+        conn.close()
+    except mysql.connector.Error:
+        pass
+    conn = instrumentation.connection(connect())
     cursor = conn.cursor()
 
-    # Generating fake data using Faker
-    fake = faker.Faker()
+# Function to read the last position a phase committed, or None if it has not committed any
+def checkpoint_position(phase):
+    checkpoint = checkpoints.get(phase) if checkpoints is not None else None
+    return checkpoint.position if checkpoint else None
 
-    # Defining the file path where customer passwords will be saved
-    password_file_path = os.path.join(os.path.dirname(__file__), "Customer_Passwords_Pre_Hash.txt")
+# Function to mark a phase done before the commit of its last rows, so a resumed run skips it.
+# The checkpoint is written with the cursor of those rows, the shared one unless given.
+def complete_phase(phase, phase_cursor=None):
+    if checkpoints is not None:
+        record_checkpoint(phase_cursor or cursor, phase, done=True)
 
-    # Function to add an admin user
-    def insert_admin():
-        try:
-            log("Inserting default admin user.")
-            name = "Admin User"
-            email = "admin"
-            role = "admin"
-            password = "123456"
+# Function to roll back a failed phase. When checkpoints are recorded, an error the
+# phase can be retried after is raised again for run_phase() to reconnect and retry.
+def rollback(err):
+    global failed_phases
+    if checkpoints is not None and is_retryable(err):
+        raise err
+    failed_phases += 1
+    conn.rollback()
 
-            # Hashing the admin password with a lower cost
-            hashed_password = hash_password(password, cost=10)
+# Function to run one phase in its span. When checkpoints are recorded, a phase that is
+# done already is skipped, and a phase that fails with a retryable error is retried
+# over a new connection after a growing delay, continuing from its last checkpoint.
+def run_phase(phase, function, *args, **kwargs):
+    global checkpoints
+    with instrumentation.span(phase):
+        attempt = 0
+        while True:
+            try:
+                if attempt:
+                    reconnect()
+                    checkpoints = load_checkpoints(cursor)
+                if checkpoints is not None and phase in checkpoints and checkpoints[phase].done:
+                    log(f"Skipping {phase}: it was completed by an earlier attempt.")
+                    return None
+                return function(*args, **kwargs)
+            except mysql.connector.Error as err:
+                attempt += 1
+                if checkpoints is None or not is_retryable(err) or attempt > retries:
+                    raise
+                delay = retry_delay(attempt)
+                log(f"{phase} failed: {err}")
+                log(f"Reconnecting in {delay:.1f}s (retry {attempt} of {retries}).")
+                time.sleep(delay)
 
-            # Add the admin user to the Users table
-            cursor.execute('''
-                INSERT INTO Users (Name, Email, Role, Password)
-                VALUES (%s, %s, %s, %s)
-            ''', (name, email, role, hashed_password))
+# Customer IDs handed to a pool worker per task, and tasks kept in flight per worker
+CUSTOMER_CHUNK_SIZE = 256
+TASKS_IN_FLIGHT_PER_WORKER = 4
 
-            conn.commit()
-            log(f"Admin user inserted")
-            log("---------------------------------")
-        except mysql.connector.Error as err:
-            log(f"Error inserting admin user: {err}")
-            conn.rollback()
-
-    # Function to insert customer data
-    def generate_customers(num):
-        try:
-            log(f"Starting to add {num} customers with their passwords hashed by bcrypt.")
-            passwords = []
-
-            with open(password_file_path, 'w') as password_file:
-                # Insert the specific customer with ID 1
-                specific_customer_id = 1
-                specific_name = "Test User"
-                specific_email = "test"
-                specific_address = "Test Address"
-                specific_phone = "1234567890"
-                specific_password = "123456"
-                specific_hashed_password = hash_password(specific_password)
-
-                cursor.execute('''
-                    INSERT INTO Customers (CustomerID, Name, Email, Password, Address, Phone)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                ''', (specific_customer_id, specific_name, specific_email, specific_hashed_password, specific_address, specific_phone))
-
-                password_file.write(f"CustomerID: {specific_customer_id}\n")
-                password_file.write(f"Name: {specific_name}\n")
-                password_file.write(f"E-Mail: {specific_email}\n")
-                password_file.write(f"Password: {specific_password}\n")
-                password_file.write(f"Address: {specific_address}\n")
-                password_file.write(f"Phone: {specific_phone}\n")
-                password_file.write("---------------------------------\n")
-
-                # Insert the remaining customers
-                with ThreadPoolExecutor(max_workers=32) as executor:
-                    futures = [executor.submit(insert_customer, fake, i) for i in range(2, num + 2)]
-                    for i, future in enumerate(futures):
-                        customer_id, name, email, hashed_password, address, phone_number, password = future.result()
-                        passwords.append((customer_id, password))
-                        cursor.execute('''
-                            INSERT INTO Customers (Name, Email, Password, Address, Phone)
-                            VALUES (%s, %s, %s, %s, %s)
-                        ''', (name, email, hashed_password, address, phone_number))
-                        
-                        password_file.write(f"CustomerID: {customer_id}\n")
-                        password_file.write(f"Name: {name}\n")
-                        password_file.write(f"E-Mail: {email}\n")
-                        password_file.write(f"Password: {password}\n")
-                        password_file.write(f"Address: {address}\n")
-                        password_file.write(f"Phone: {phone_number}\n")
-                        password_file.write("---------------------------------\n")
-
-                        sys.stdout.write(f"\rAdding customers: {i + 1}/{num} completed")
-                        sys.stdout.flush()
+# Function to report peak resident memory of this process and of its largest worker
+def log_peak_memory():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    unit = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unit
+    workers = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / unit
+    log(f"Peak memory: {own:,.1f} MB (main process), {workers:,.1f} MB (largest worker process)")
 
-            conn.commit()
-            log(f"\n{num} customers have been added.")
-            log(f"Customer passwords have been saved to {password_file_path}")
-            log("---------------------------------")
-        except mysql.connector.Error as err:
-            log(f"Error inserting customers: {err}")
-            conn.rollback()
-
-    # Add product data function
-    def generate_products():
-        try:
-            log("Starting to add products.")
-            product_count = 0
-            products = {
-                "Main Course": {
-                    "items": ["Margherita Pizza", "Pepperoni Pizza", "Four Seasons Pizza", "Veggie Pizza", "BBQ Chicken Pizza",
-                            "Spaghetti Bolognese", "Fettuccine Alfredo", "Penne Arrabiata", "Lasagna", "Pesto Pasta",
-                            "Ribeye Steak", "T-Bone Steak", "Filet Mignon", "Sirloin Steak", "Porterhouse Steak",
-                            "Classic Cheeseburger", "Bacon Burger", "Veggie Burger", "Chicken Burger", "Double Beef Burger",
-                            "Grilled Salmon", "Shrimp Scampi", "Fish and Chips", "Lobster Tail", "Seared Tuna"],
-                    "cost_range": (5.0, 15.0),
-                    "price_range": (8.0, 25.0)
-                },
-                "Beverage": {
-                    "items": ["Coca Cola", "Pepsi", "Fanta", "Sprite", "Tonic Water",
-                            "Orange Juice", "Apple Juice", "Cranberry Juice", "Tomato Juice", "Carrot Juice",
-                            "Espresso", "Cappuccino", "Latte", "Green Tea", "Black Tea",
-                            "Red Wine", "White Wine", "Beer", "Whiskey", "Margarita"],
-                    "cost_range": (1.0, 4.0),
-                    "price_range": (1.5, 8.0)
-                },
-                "Dessert": {
-                    "items": ["Chocolate Cake", "Cheesecake", "Red Velvet Cake", "Carrot Cake", "Lemon Drizzle Cake",
-                            "Vanilla Ice Cream", "Chocolate Ice Cream", "Strawberry Ice Cream", "Mint Chocolate Chip Ice Cream", "Cookie Dough Ice Cream",
-                            "Apple Pie", "Croissant", "Danish Pastry", "Eclair", "Cannoli",
-                            "Tiramisu", "Panna Cotta", "Rice Pudding", "Bread Pudding", "Creme Brulee",
-                            "Mixed Fruit Salad", "Berries with Cream", "Grilled Pineapple", "Mango Sorbet", "Poached Pears"],
-                    "cost_range": (1.5, 7.0),
-                    "price_range": (3.0, 10.0)
-                },
-                "Appetizer": {
-                    "items": ["Tomato Soup", "French Onion Soup", "Chicken Soup", "Clam Chowder", "Minestrone",
-                            "Caesar Salad", "Greek Salad", "Cobb Salad", "Caprese Salad", "Waldorf Salad",
-                            "Chicken Wings", "Mozzarella Sticks", "Spring Rolls", "Calamari", "Stuffed Jalapenos",
-                            "Hummus with Pita", "Guacamole with Tortilla Chips", "Spinach Artichoke Dip", "Salsa", "Cheese Fondue"],
-                    "cost_range": (2.0, 7.0),
-                    "price_range": (4.0, 12.0)
-                },
-                "Side Dish": {
-                    "items": ["French Fries", "Mashed Potatoes", "Baked Potato", "Sweet Potato Fries", "Potato Wedges",
-                            "Steamed Broccoli", "Grilled Asparagus", "Sauteed Spinach", "Glazed Carrots", "Roasted Brussels Sprouts",
-                            "Steamed Rice", "Pilaf", "Quinoa Salad", "Risotto", "Couscous",
-                            "Garlic Bread", "Focaccia", "Dinner Rolls", "Sourdough", "Baguette",
-                            "Coleslaw", "Mac and Cheese", "Onion Rings", "Baked Beans", "Corn on the Cob"],
-                    "cost_range": (1.0, 5.0),
-                    "price_range": (3.0, 8.0)
-                }
+# Function to add an admin user
+def insert_admin():
+    try:
+        log("Inserting default admin user.")
+        name = "Admin User"
+        email = "admin"
+        role = "admin"
+        password = "123456"
+
+        # Hashing the admin password with a random salt; this account also exists in real databases
+        hashed_password = hash_password(password, cost=DEFAULT_BCRYPT_COST)
+
+        # Add the admin user to the Users table
+        cursor.execute('''
+            INSERT INTO Users (Name, Email, Role, Password)
+            VALUES (%s, %s, %s, %s)
+        ''', (name, email, role, hashed_password))
+
+        complete_phase('insert_admin')
+        conn.commit()
+        log(f"Admin user inserted")
+        log("---------------------------------")
+    except mysql.connector.Error as err:
+        log(f"Error inserting admin user: {err}")
+        rollback(err)
+
+# Function to stream the emails of the stored customers before the given CustomerID, one page at a time
+def iter_customer_emails(before_customer_id, page_size=10000):
+    last_customer_id = 0
+    while True:
+        cursor.execute('SELECT CustomerID, Email FROM Customers WHERE CustomerID > %s AND CustomerID < %s '
+                       'ORDER BY CustomerID ASC LIMIT %s', (last_customer_id, before_customer_id, page_size))
+        page = cursor.fetchall()
+        if not page:
+            return
+        yield from [email for _, email in page if email is not None]
+        last_customer_id = page[-1][0]
+
+# Function to find the emails Faker draws more than once for the customers
+# first_customer_id..last_customer_id, or that already belong to a customer stored before
+# them (customers a resumed run committed already are drawn again, not read back).
+# Only the emails are drawn, in chunks on a process pool, and kept as digests in Bloom
+# filters, so memory stays at a few bytes per customer however many there are.
+def find_duplicate_emails(first_customer_id, last_customer_id, seed, workers=None):
+    started = time.perf_counter()
+    cursor.execute('SELECT COUNT(*) FROM Customers WHERE CustomerID < %s', (first_customer_id,))
+    stored = cursor.fetchone()[0]
+    num = last_customer_id - first_customer_id + 1
+    duplicates = DuplicateEmails(num + stored)
+    for email in iter_customer_emails(first_customer_id):
+        duplicates.add(email_digest(email))
+    id_ranges = ((chunk[0], chunk[-1])
+                 for chunk in chunked(range(first_customer_id, last_customer_id + 1), CUSTOMER_CHUNK_SIZE))
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=init_worker,
+                             initargs=(seed, DEFAULT_BCRYPT_COST)) as executor:
+        for digests in executor.map(email_digest_chunk, id_ranges):
+            for offset in range(0, len(digests), EMAIL_DIGEST_SIZE):
+                duplicates.add(digests[offset:offset + EMAIL_DIGEST_SIZE])
+    log(f"Emails: {num} checked in {time.perf_counter() - started:.2f}s, {duplicates.count} repeated "
+        f"(tagged with the CustomerID), filters of {duplicates.memory_bytes() / 1024:,.0f} KB")
+    return duplicates
+
+# Columns written for every customer
+CUSTOMER_COLUMNS = ('CustomerID', 'Name', 'Email', 'Password', 'Address', 'Phone')
+
+# Function to insert the customers first_customer_id..last_customer_id. Customer 1 is the
+# fixed test user. Credentials are appended to the password file in append mode.
+# Runs as a pipeline of stages connected by bounded queues, so generating, hashing,
+# writing to the database and exporting credentials overlap: customers are generated
+# and hashed in chunks on a process pool, then batched into Customers and exported.
+# With checkpoints, a commit records the last customer committed with it, and a resumed
+# run continues after that customer, with the credential file cut back to match.
+# Password salts are derived from salt_seed and the CustomerID when it is given (runs
+# with --seed), and random otherwise; the hash cache only holds derived ones.
+# The write stage inserts and commits over its own connection (see open_writer_connection).
+def generate_customers(first_customer_id, last_customer_id, seed, cost=DEFAULT_BCRYPT_COST, workers=None,
+                       cache_path=None, append=False, salt_seed=None):
+    writer_conn = writer_cursor = None
+    try:
+        committed_customer_id = checkpoint_position('generate_customers')
+        start_customer_id = first_customer_id if committed_customer_id is None else committed_customer_id + 1
+        num = last_customer_id - start_customer_id + 1
+        if committed_customer_id is not None:
+            log(f"Resuming after customer {committed_customer_id}.")
+        log(f"Starting to add {num} customers with their passwords hashed by bcrypt (cost {cost}).")
+        duplicates = find_duplicate_emails(first_customer_id, last_customer_id, seed, workers)
+        cache = HashCache(cache_path) if cache_path and salt_seed is not None else None
+        writer_conn, writer_cursor = open_writer_connection()
+        writer = new_writer(lambda customer_id: record_checkpoint(writer_cursor, 'generate_customers', customer_id),
+                            writer_conn, writer_cursor)
+        writer.register('Customers', CUSTOMER_COLUMNS)
+
+        progress = instrumentation.progress('Adding customers', num)
+        customers_done = 0
+
+        def write_chunk(records):
+            nonlocal customers_done
+            writer.add_many('Customers', [record[:6] for record in records])
+            writer.checkpoint(records[-1][0])
+            customers_done += len(records)
+            progress.update(customers_done)
+
+        def export_chunk(records):
+            credential_file.write(format_credentials(
+                [(customer_id, name, email, password, address, phone_number)
+                 for customer_id, name, email, _, address, phone_number, password, _ in records],
+                credentials_format))
+            if cache:
+                for _, _, _, hashed_password, _, _, password, cache_hit in records:
+                    cache.record(password, hashed_password, cache_hit)
+
+        workers = workers or os.cpu_count()
+        window = workers * TASKS_IN_FLIGHT_PER_WORKER
+        id_ranges = ((chunk[0], chunk[-1])
+                     for chunk in chunked(range(start_customer_id, last_customer_id + 1), CUSTOMER_CHUNK_SIZE))
+        # The credential file keeps the customers committed before this attempt, and no others
+        exported_customer_id = None
+        if checkpoints is not None:
+            exported_customer_id = truncate_credentials(password_file_path, start_customer_id - 1)
+        # One seeded Faker and hash cache connection per pool worker
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(seed, cost, cache_path, duplicates, salt_seed)) as executor, \
+                open_credentials(password_file_path, credentials_format,
+                                 append or exported_customer_id is not None) as credential_file:
+            # Committed customers whose credentials were not exported before the failure are
+            # generated again; without the bcrypt hash that only takes a Faker draw each
+            if exported_customer_id is not None:
+                missing_ranges = ((chunk[0], chunk[-1]) for chunk in chunked(
+                    range(max(exported_customer_id + 1, first_customer_id), start_customer_id), CUSTOMER_CHUNK_SIZE))
+                for records in executor.map(generate_customer_chunk, missing_ranges):
+                    credential_file.write(format_credentials(
+                        [(customer_id, name, email, password, address, phone_number)
+                         for customer_id, name, email, address, phone_number, password in records],
+                        credentials_format))
+            write = Stage('write', write_chunk)
+            export = Stage('export', export_chunk)
+            hashing = Stage('hash', hash_customer_chunk, executor=executor, window=window).feeds(write, export)
+            generate = Stage('generate', generate_customer_chunk, source=id_ranges, executor=executor,
+                             window=window).feeds(hashing)
+            pipeline_seconds, stage_stats = run_pipeline([generate, hashing, write, export])
+        progress.finish()
+
+        writer.flush()
+        writer.close()
+        complete_phase('generate_customers', writer_cursor)
+        writer_conn.commit()
+        conn.commit()  # Ends the shared connection's read snapshot, so it sees the customers
+        hashes_computed = cache.misses if cache else num
+        log(f"{num} customers have been added.")
+        log(f"Customer passwords have been saved to {password_file_path}")
+        log(f"bcrypt: {hashes_computed} hashes computed in {pipeline_seconds:.2f}s "
+            f"({hashes_computed / pipeline_seconds if pipeline_seconds > 0 else 0:,.1f} hashes/sec, "
+            f"{num / pipeline_seconds if pipeline_seconds > 0 else 0:,.1f} customers/sec)")
+        for line in format_stage_stats(stage_stats):
+            log(line)
+        if cache:
+            cache.flush()
+            log(f"Hash cache {cache_path}: {cache.hits} hits, {cache.misses} misses")
+            cache.close()
+        for line in writer.summary():
+            log(line)
+        log("---------------------------------")
+    except mysql.connector.Error as err:
+        log(f"Error inserting customers: {err}")
+        rollback(err)
+    finally:
+        if writer_conn is not None:
+            close_writer_connection(writer_conn, writer_cursor)
+
+# Add product data function. Prices and costs come from their own random stream of the seed.
+# With a catalogue variation the menu is varied per seed, as each restaurant of a
+# multi-tenant run serves its own selection at its own prices.
+def generate_products(seed, catalogue_variation=0.0):
+    try:
+        rng = random.Random(f"{seed}:products")
+        log("Starting to add products.")
+        product_count = 0
+        products = {
+            "Main Course": {
+                "items": ["Margherita Pizza", "Pepperoni Pizza", "Four Seasons Pizza", "Veggie Pizza", "BBQ Chicken Pizza",
+                        "Spaghetti Bolognese", "Fettuccine Alfredo", "Penne Arrabiata", "Lasagna", "Pesto Pasta",
+                        "Ribeye Steak", "T-Bone Steak", "Filet Mignon", "Sirloin Steak", "Porterhouse Steak",
+                        "Classic Cheeseburger", "Bacon Burger", "Veggie Burger", "Chicken Burger", "Double Beef Burger",
+                        "Grilled Salmon", "Shrimp Scampi", "Fish and Chips", "Lobster Tail", "Seared Tuna"],
+                "cost_range": (5.0, 15.0),
+                "price_range": (8.0, 25.0)
+            },
+            "Beverage": {
+                "items": ["Coca Cola", "Pepsi", "Fanta", "Sprite", "Tonic Water",
+                        "Orange Juice", "Apple Juice", "Cranberry Juice", "Tomato Juice", "Carrot Juice",
+                        "Espresso", "Cappuccino", "Latte", "Green Tea", "Black Tea",
+                        "Red Wine", "White Wine", "Beer", "Whiskey", "Margarita"],
+                "cost_range": (1.0, 4.0),
+                "price_range": (1.5, 8.0)
+            },
+            "Dessert": {
+                "items": ["Chocolate Cake", "Cheesecake", "Red Velvet Cake", "Carrot Cake", "Lemon Drizzle Cake",
+                        "Vanilla Ice Cream", "Chocolate Ice Cream", "Strawberry Ice Cream", "Mint Chocolate Chip Ice Cream", "Cookie Dough Ice Cream",
+                        "Apple Pie", "Croissant", "Danish Pastry", "Eclair", "Cannoli",
+                        "Tiramisu", "Panna Cotta", "Rice Pudding", "Bread Pudding", "Creme Brulee",
+                        "Mixed Fruit Salad", "Berries with Cream", "Grilled Pineapple", "Mango Sorbet", "Poached Pears"],
+                "cost_range": (1.5, 7.0),
+                "price_range": (3.0, 10.0)
+            },
+            "Appetizer": {
+                "items": ["Tomato Soup", "French Onion Soup", "Chicken Soup", "Clam Chowder", "Minestrone",
+                        "Caesar Salad", "Greek Salad", "Cobb Salad", "Caprese Salad", "Waldorf Salad",
+                        "Chicken Wings", "Mozzarella Sticks", "Spring Rolls", "Calamari", "Stuffed Jalapenos",
+                        "Hummus with Pita", "Guacamole with Tortilla Chips", "Spinach Artichoke Dip", "Salsa", "Cheese Fondue"],
+                "cost_range": (2.0, 7.0),
+                "price_range": (4.0, 12.0)
+            },
+            "Side Dish": {
+                "items": ["French Fries", "Mashed Potatoes", "Baked Potato", "Sweet Potato Fries", "Potato Wedges",
+                        "Steamed Broccoli", "Grilled Asparagus", "Sauteed Spinach", "Glazed Carrots", "Roasted Brussels Sprouts",
+                        "Steamed Rice", "Pilaf", "Quinoa Salad", "Risotto", "Couscous",
+                        "Garlic Bread", "Focaccia", "Dinner Rolls", "Sourdough", "Baguette",
+                        "Coleslaw", "Mac and Cheese", "Onion Rings", "Baked Beans", "Corn on the Cob"],
+                "cost_range": (1.0, 5.0),
+                "price_range": (3.0, 8.0)
             }
-            
-            total_products = sum(len(data["items"]) for data in products.values())
-            current_count = 0
-            for category, data in products.items():
-                for name in data["items"]:
-                    price = round(random.uniform(*data["price_range"]), 2)
-                    cost = round(random.uniform(data["cost_range"][0], min(price, data["cost_range"][1])), 2)
-                    cursor.execute('''
-                        INSERT INTO Products (Name, Cost, Price, Category)
-                        VALUES (%s, %s, %s, %s)
-                    ''', (name, cost, price, category))
-                    
-                    current_count += 1
-                    
-                    sys.stdout.write(f"\rAdding products: {current_count}/{total_products} completed")
-                    sys.stdout.flush()
-
-                    product_count += 1
-            conn.commit()
-            
-            cursor.execute('''
-            UPDATE Products
-            SET DynamicPrice = Price
-            ''')
-            conn.commit()
-            
-            log(f"\n{product_count} Products have been added and DynamicPrice updated.")
-            log("---------------------------------")
-        except mysql.connector.Error as err:
-            log(f"Error inserting products: {err}")
-            conn.rollback()
-            
-    # Function to determine the number of orders for the customer            
-    def generate_order_count():
-        base_order_count = random.randint(1, 10)
-        if base_order_count == 10:
-            if random.random() < 0.1:
-                return random.randint(10, 30)
-        return base_order_count
-
-
-    # Function to add orders and order details
-    def generate_orders_and_details():
-        try:
-            log("Starting to add orders and order details.")
-            cursor.execute('SELECT CustomerID FROM Customers ORDER BY CustomerID ASC')
-            customer_ids = [row[0] for row in cursor.fetchall()]
-
-            cursor.execute('SELECT ProductID FROM Products ORDER BY ProductID ASC')
-            product_ids = [row[0] for row in cursor.fetchall()]
-
-            if not customer_ids or not product_ids:
-                log("Customers or products not found. Ensure that customers and products are added first.")
-                return
-
-            order_count = 0
-            order_detail_count = 0
-
-            start_date = datetime.date(2020, 1, 1)
-            end_date = datetime.date.today()
-            delta_days = (end_date - start_date).days
-
-            for customer_id in customer_ids:
-                order_count_for_customer = generate_order_count()
-                for _ in range(order_count_for_customer):
-                    order_date = start_date + datetime.timedelta(days=random.randint(0, delta_days))
-                    if order_date == datetime.date.today():
-                        current_time = datetime.datetime.now().time()
-                        random_hour = random.randint(0, current_time.hour)
-                        random_minute = random.randint(0, current_time.minute) if random_hour == current_time.hour else random.randint(0, 59)
-                        random_second = random.randint(0, current_time.second) if random_minute == current_time.minute else random.randint(0, 59)
-                    else:
-                        random_hour = random.randint(0, 23)
-                        random_minute = random.randint(0, 59)
-                        random_second = random.randint(0, 59)
-
-                    order_datetime = datetime.datetime.combine(order_date, datetime.time(random_hour, random_minute, random_second))
-
-                    if order_date > datetime.date.today():
-                        continue
-                    cursor.execute('''
-                        INSERT INTO Orders (CustomerID, OrderDate)
-                        VALUES (%s, %s)
-                    ''', (customer_id, order_datetime.isoformat()))
-
-                    order_id = cursor.lastrowid
-                    order_count += 1
-
-                    order_details_for_order = random.randint(3, 7)
-                    for _ in range(order_details_for_order):
-                        product_id = random.choice(product_ids)
-                        quantity = random.randint(1, 5)
-                        cursor.execute('SELECT Price FROM Products WHERE ProductID = %s', (product_id,))
-                        price = cursor.fetchone()[0]
-                        total_price = round(quantity * price, 2)
-                        cursor.execute('''
-                            INSERT INTO OrderDetails (OrderID, ProductID, Quantity, TotalPrice)
-                            VALUES (%s, %s, %s, %s)
-                        ''', (order_id, product_id, quantity, total_price))
-                        order_detail_count += 1
-
-                        cursor.execute('''
-                            INSERT INTO PopularProducts (ProductID, PopularityScore)
-                            VALUES (%s, %s)
-                            ON DUPLICATE KEY UPDATE PopularityScore = PopularityScore + %s
-                        ''', (product_id, quantity, quantity))
-
-                        cursor.execute('''
-                            INSERT INTO DynamicPricing (ProductID, CurrentPrice, LastUpdated)
-                            VALUES (%s, %s, NOW())
-                            ON DUPLICATE KEY UPDATE CurrentPrice = %s, LastUpdated = NOW()
-                        ''', (product_id, total_price, total_price))
-
-                    sys.stdout.write(f"\rAdding orders: {order_count} completed")
-                    sys.stdout.flush()
+        }
 
-            conn.commit()
-            log(f"\n{order_count} orders and {order_detail_count} order details have been added.")
-            log("---------------------------------")
+        if catalogue_variation:
+            products = vary_catalogue(products, seed, catalogue_variation)
 
-            generate_inventory_status(product_ids)
-            generate_product_orders()
-            update_order_patterns()
-        except mysql.connector.Error as err:
-            log(f"Error inserting orders and order details: {err}")
-            conn.rollback()
-
-    # Function to update the InventoryStatus table
-    def generate_inventory_status(products):
-        try:
-            log("Starting to update inventory status.")
-            low_stock_products = random.sample(products, 12)
-            out_of_stock_products = random.sample([p for p in products if p not in low_stock_products], 12)
-            
-            for i, product_id in enumerate(products):
-                if product_id in low_stock_products:
-                    stock_level = random.randint(15, 20)
-                elif product_id in out_of_stock_products:
-                    stock_level = 0
-                else:
-                    stock_level = random.randint(20, 1000)
-                
-                cursor.execute('''
-                    INSERT INTO InventoryStatus (ProductID, StockLevel, LastUpdated)
-                    VALUES (%s, %s, NOW())
-                ''', (product_id, stock_level))
-
-                sys.stdout.write(f"\rUpdating inventory: {i + 1}/{len(products)} products processed")
-                sys.stdout.flush()
+        writer = new_writer()
+        writer.register('Products', ('Name', 'Cost', 'Price', 'DynamicPrice', 'Category'))
 
-            conn.commit()
-            log(f"\nInventory status has been updated for {len(products)} products.")
-            log(f"12 products have been set with low stock (15-20 items).")
-            log(f"12 products have been set as out of stock (0 items).")
-            log("---------------------------------")
-        except mysql.connector.Error as err:
-            log(f"Error updating inventory status: {err}")
-            conn.rollback()
-
-    # Function to update the ProductOrders table
-    def generate_product_orders():
-        try:
-            log("Starting to add product orders from OrderDetails.")
-            
-            cursor.execute('''
-                SELECT 
-                    OD.ProductID,
-                    HOUR(O.OrderDate) AS OrderHour,
-                    DAYOFWEEK(O.OrderDate) - 1 AS OrderDayOfWeek,
-                    CASE
-                        WHEN MONTH(O.OrderDate) IN (12, 1, 2) THEN 'Winter'
-                        WHEN MONTH(O.OrderDate) IN (3, 4, 5) THEN 'Spring'
-                        WHEN MONTH(O.OrderDate) IN (6, 7, 8) THEN 'Summer'
-                        WHEN MONTH(O.OrderDate) IN (9, 10, 11) THEN 'Autumn'
-                    END AS Season,
-                    SUM(OD.Quantity) AS OrderCount
-                FROM 
-                    OrderDetails OD
-                JOIN 
-                    Orders O ON OD.OrderID = O.OrderID
-                GROUP BY 
-                    OD.ProductID, OrderHour, OrderDayOfWeek, Season
-                ORDER BY 
-                    OD.ProductID, OrderHour, OrderDayOfWeek, Season;
-            ''')
-
-            orders = cursor.fetchall()
-
-            batch_size = 1000
-            batch = []
-            
-            for i, order in enumerate(orders):
-                batch.append(order)
-                if len(batch) >= batch_size:
-                    cursor.executemany('''
-                        INSERT INTO ProductOrders (ProductID, OrderHour, OrderDayOfWeek, Season, OrderCount)
-                        VALUES (%s, %s, %s, %s, %s)
-                    ''', batch)
-                    conn.commit()
-                    sys.stdout.write(f"\rInserting product orders: {i + 1}/{len(orders)} rows inserted")
-                    sys.stdout.flush()
-                    batch = []
-
-            if batch:
-                cursor.executemany('''
-                    INSERT INTO ProductOrders (ProductID, OrderHour, OrderDayOfWeek, Season, OrderCount)
-                    VALUES (%s, %s, %s, %s, %s)
-                ''', batch)
-                conn.commit()
-                log(f"Inserted {len(orders)} rows into ProductOrders.")
-            log("---------------------------------")
-            log(f"Product orders have been updated.")
-            log("---------------------------------")
-        except mysql.connector.Error as err:
-            log(f"Error inserting product orders: {err}")
-            conn.rollback()
-
-    # Function to update the OrderPatterns table
-    def update_order_patterns():
-        try:
-            log("Starting to update order patterns.")
-
-            cursor.execute('''
-                INSERT INTO OrderPatterns (ProductID, OrderHour, OrderCount)
-                SELECT 
-                    T1.ProductID, 
-                    T1.OrderHour,
-                    T1.TotalOrders
-                FROM (
-                    SELECT 
-                        OD.ProductID,
-                        HOUR(O.OrderDate) AS OrderHour,
-                        SUM(OD.Quantity) AS TotalOrders
-                    FROM 
-                        OrderDetails OD
-                    JOIN 
-                        Orders O ON OD.OrderID = O.OrderID
-                    GROUP BY 
-                        OD.ProductID, OrderHour
-                ) AS T1
-                JOIN (
-                    SELECT 
-                        ProductID, 
-                        MAX(TotalOrders) AS MaxOrders
-                    FROM (
-                        SELECT 
-                            OD.ProductID,
-                            HOUR(O.OrderDate) AS OrderHour,
-                            SUM(OD.Quantity) AS TotalOrders
-                        FROM 
-                            OrderDetails OD
-                        JOIN 
-                            Orders O ON OD.OrderID = O.OrderID
-                        GROUP BY 
-                            OD.ProductID, OrderHour
-                    ) AS T2
-                    GROUP BY 
-                        ProductID
-                ) AS T3
-                ON 
-                    T1.ProductID = T3.ProductID 
-                    AND T1.TotalOrders = T3.MaxOrders
-                ORDER BY 
-                    T1.ProductID
-                ON DUPLICATE KEY UPDATE
-                    OrderCount = OrderCount + VALUES(OrderCount);
-            ''')
-            conn.commit()
-            log("Order patterns have been updated.")
-            log("---------------------------------")
-        except mysql.connector.Error as err:
-            log(f"Error updating order patterns: {err}")
-            conn.rollback()
-
-    # Function to add data to the Promotions table
-    def generate_promotions(products):
-        log("Starting to add promotions.")
-        promotions_count = 0 
-        current_date = datetime.date.today()
-        future_date = current_date + datetime.timedelta(days=random.randint(10, 30))
-
-        for i, product_id in enumerate(products):
-            try:
-                if random.random() < 0.2:  # 20% chance to create a promotion for each product
-                    discount = round(random.uniform(5.0, 50.0), 2)
-                    cursor.execute('''
-                        INSERT INTO Promotions (ProductID, StartDate, EndDate, DiscountPercentage)
-                        VALUES (%s, %s, %s, %s)
-                    ''', (product_id, current_date, future_date, discount))
-                    promotions_count += 1
-
-                # Update the progress dynamically
-                sys.stdout.write(f"\rAdding promotions: {i + 1}/{len(products)} products processed")
-                sys.stdout.flush()
+        for category, data in products.items():
+            for name in data["items"]:
+                price = round(rng.uniform(*data["price_range"]), 2)
+                cost = round(rng.uniform(data["cost_range"][0], min(price, data["cost_range"][1])), 2)
+                # DynamicPrice starts out equal to Price
+                writer.add('Products', (name, cost, price, price, category))
+                product_count += 1
+        writer.flush()
+        writer.close()
+        complete_phase('generate_products')
+        conn.commit()
 
-            except mysql.connector.Error as err:
-                log(f"Error adding promotion for ProductID {product_id}: {err}")
-                conn.rollback()  # Rollback in case of error
+        log(f"{product_count} Products have been added and DynamicPrice updated.")
+        log("---------------------------------")
+    except mysql.connector.Error as err:
+        log(f"Error inserting products: {err}")
+        rollback(err)
 
-        try:
-            conn.commit()
-            log(f"\n{promotions_count} Promotions have been added.")
-        except mysql.connector.Error as err:
-            log(f"Error committing promotion transactions: {err}")
-            conn.rollback()  # Rollback if commit fails
+# Function to read product prices and costs and the next free OrderID and OrderDetailID.
+# Prices are kept in memory instead of being queried per order line, and IDs are
+# assigned on the client so rows can be batched without lastrowid.
+def load_order_context():
+    cursor.execute('SELECT ProductID, Price, Cost FROM Products ORDER BY ProductID ASC')
+    product_prices = {product_id: (price, cost) for product_id, price, cost in cursor.fetchall()}
+    cursor.execute('SELECT COALESCE(MAX(OrderID), 0) FROM Orders')
+    first_order_id = cursor.fetchone()[0] + 1
+    cursor.execute('SELECT COALESCE(MAX(OrderDetailID), 0) FROM OrderDetails')
+    first_order_detail_id = cursor.fetchone()[0] + 1
+    return product_prices, first_order_id, first_order_detail_id
+
+# Function to read the highest CustomerID, the time of the latest order and the next
+# OrderID, for append mode
+def load_append_context():
+    cursor.execute('SELECT COALESCE(MAX(CustomerID), 0) FROM Customers')
+    last_customer_id = cursor.fetchone()[0]
+    cursor.execute('SELECT MAX(OrderDate), COALESCE(MAX(OrderID), 0) + 1 FROM Orders')
+    last_order_date, first_order_id = cursor.fetchone()
+    return last_customer_id, last_order_date, first_order_id
+
+# Function to read the units sold per product by the orders from first_order_id on
+def load_units_sold(first_order_id):
+    cursor.execute('SELECT ProductID, SUM(Quantity) FROM OrderDetails WHERE OrderID >= %s GROUP BY ProductID',
+                   (first_order_id,))
+    return {product_id: int(units) for product_id, units in cursor.fetchall()}
+
+# Function to stream the IDs of the customers after the given one in ascending order, one page at a time
+def iter_customer_ids(after_customer_id=0, page_size=10000):
+    last_customer_id = after_customer_id
+    while True:
+        cursor.execute('SELECT CustomerID FROM Customers WHERE CustomerID > %s ORDER BY CustomerID ASC LIMIT %s',
+                       (last_customer_id, page_size))
+        page = [row[0] for row in cursor.fetchall()]
+        if not page:
+            return
+        yield from page
+        last_customer_id = page[-1]
+
+# Function to add orders and order details. Returns the aggregates of the orders added.
+# With checkpoints, a commit records the last customer whose orders it holds, and a
+# resumed run continues after that customer from the next free IDs. The aggregates of
+# the orders committed before are lost with the failed attempt, so the derived tables
+# are then refreshed from SQL, their watermarks being behind.
+def generate_orders_and_details(settings):
+    try:
+        log("Starting to add orders and order details.")
+        committed_customer_id = checkpoint_position('generate_orders_and_details')
+        if committed_customer_id is not None:
+            log(f"Resuming after customer {committed_customer_id}.")
+        cursor.execute('SELECT COUNT(*) FROM Customers WHERE CustomerID > %s', (committed_customer_id or 0,))
+        customer_count = cursor.fetchone()[0]
+
+        product_prices, first_order_id, first_order_detail_id = load_order_context()
+        product_ids = list(product_prices)
+
+        if (not customer_count and committed_customer_id is None) or not product_ids:
+            log("Customers or products not found. Ensure that customers and products are added first.")
+            return
+
+        # The order-derived tables are aggregated here and written once at the end;
+        # CustomerStats rows are written customer by customer if the table is up to date
+        customer_stats = get_watermark(cursor, 'CustomerStats') == first_order_id - 1
+
+        # Each checkpoint also moves the CustomerStats watermark past the orders committed
+        # with it, so a resumed run neither refreshes nor writes their statistics again
+        def record_orders_checkpoint(customer_id):
+            record_checkpoint(cursor, 'generate_orders_and_details', customer_id)
+            if customer_stats:
+                cursor.execute('SELECT MAX(OrderID) FROM Orders')
+                set_watermark(cursor, 'CustomerStats', cursor.fetchone()[0])
+
+        writer = new_writer(record_orders_checkpoint)
+        register_order_tables(writer, order_details_dated(cursor), customer_stats)
+        aggregates = OrderAggregates()
+
+        # Progress is counted in customers, whose total is known up front
+        progress = instrumentation.progress('Adding orders (customers done)', customer_count)
+        order_count, order_detail_count = write_orders(
+            writer, iter_customer_ids(committed_customer_id or 0), settings, product_prices, first_order_id,
+            first_order_detail_id, aggregates,
+            progress=(lambda customers_done, orders_done: progress.update(customers_done)) if instrumentation.enabled else None)
+        progress.finish()
+
+        writer.flush()
+        writer.close()
+        log(f"{order_count} orders and {order_detail_count} order details have been added.")
+        for line in writer.summary():
+            log(line)
+        complete_phase('generate_orders_and_details')
+        write_order_aggregates(aggregates, first_order_id, settings.now, customer_stats)
         log("---------------------------------")
+        return aggregates
+    except mysql.connector.Error as err:
+        log(f"Error inserting orders and order details: {err}")
+        rollback(err)
 
-    # Sample data generation operations
-    log("---------------------------------")
-    log("Script started.")
-    log("---------------------------------")
-    insert_admin()  # Add the admin user
-    generate_customers(15000)  # Add 15000 customers
-    generate_products()  # Add products
-    generate_orders_and_details()  # Add orders and order details
-    generate_promotions([i for i in range(1, 116)])  # Add promotions
-    log("Script finished.")
+# Function to write the derived tables aggregated during order generation and commit.
+# DailyProductSales and the order-derived tables (PopularProducts, DynamicPricing,
+# ProductOrders, OrderPatterns) are each written from memory only if their watermark is
+# level with the orders that existed before this run; otherwise they are refreshed from
+# SQL, which also folds the orders placed since their last refresh.
+# ProductOrders totals are added to the existing rows, and OrderPatterns is recomputed
+# for the products ordered, so an append only touches rows of the products it sold.
+# customer_stats_written tells whether CustomerStats was written along with the orders;
+# if not, it is refreshed from SQL.
+def write_order_aggregates(aggregates, first_order_id, now, customer_stats_written):
+    rollup_current = get_watermark(cursor, 'DailyProductSales', lock=True) == first_order_id - 1
+    derived_current = get_watermark(cursor, ORDER_DERIVED_WATERMARK, lock=True) == first_order_id - 1
+    existing_product_orders = None
+    if derived_current:
+        existing_product_orders = load_product_orders(cursor)
+        ordered_products = sorted(aggregates.popularity_scores)
+        for product_ids in chunked(ordered_products, 1000):
+            cursor.execute(f"DELETE FROM OrderPatterns WHERE ProductID IN ({', '.join(['%s'] * len(product_ids))})",
+                           product_ids)
+    writer = new_writer()
+    aggregates.register(writer, include_daily_sales=rollup_current, include_derived=derived_current)
+    aggregates.write(writer, now, include_daily_sales=rollup_current, existing_product_orders=existing_product_orders,
+                     include_derived=derived_current)
+    writer.flush()
+    writer.close()
+    if rollup_current and aggregates.last_order_id:
+        set_watermark(cursor, 'DailyProductSales', aggregates.last_order_id)
+    elif not rollup_current:
+        order_count, rows_touched, seconds = refresh_daily_product_sales(cursor)
+        log(f"DailyProductSales: refreshed from {order_count} orders, {rows_touched} rows affected in {seconds:.2f}s")
+    if derived_current and aggregates.last_order_id:
+        set_watermark(cursor, ORDER_DERIVED_WATERMARK, aggregates.last_order_id)
+    elif not derived_current:
+        order_count, lines_scanned, rows_affected, seconds, rebuilt = refresh_order_derived_tables(cursor, now)
+        log(f"Order-derived tables: {'rebuilt' if rebuilt else 'refreshed'} from {order_count} orders "
+            f"({lines_scanned} order lines scanned), {sum(rows_affected.values())} rows affected in {seconds:.2f}s")
+    if customer_stats_written and aggregates.last_order_id:
+        set_watermark(cursor, 'CustomerStats', aggregates.last_order_id)
+    elif not customer_stats_written:
+        order_count, rows_touched, seconds, rebuilt = refresh_customer_stats(cursor)
+        log(f"CustomerStats: {'rebuilt' if rebuilt else 'refreshed'} from {order_count} orders, "
+            f"{rows_touched} rows affected in {seconds:.2f}s")
+    conn.commit()
+    for line in writer.summary():
+        log(line)
+
+# Settings of the loader a shard process runs with, handed to it instead of the globals
+# main() sets: the table loader, sink, bulk-load mode, intermediate commits, credential
+# file and instrumentation mode
+ShardContext = collections.namedtuple('ShardContext', (
+    'loader', 'sink', 'sink_path', 'bulk_load', 'commit_rows', 'credentials_format', 'password_file_path',
+    'instrumentation_mode'))
+
+# Function to generate one shard: the customers first..last and their orders, in this
+# process over its own connection. Runs inside the shard process pool. The connection
+# is instrumented like the main one, and its counters are returned for the phase's span,
+# as are the rows it stored if the sink is a stand-in (each shard opens its own).
+def run_shard(context, index, first_customer_id, last_customer_id, first_order_id, first_order_detail_id,
+              settings, cost, cache_path, product_prices, duplicates, customer_stats, salt_seed):
+    shard_instrumentation = Instrumentation(context.instrumentation_mode)
+    shard_conn = shard_instrumentation.connection(open_connection(context.sink, context.sink_path, context.loader,
+                                                                  context.bulk_load))
+    shard_cursor = shard_conn.cursor()
+    try:
+        started = time.perf_counter()
+        init_worker(settings.seed, cost, cache_path, duplicates, salt_seed)
+        cache = HashCache(cache_path) if cache_path and salt_seed is not None else None
+        writer = WRITERS[context.loader](shard_cursor)
+        if context.commit_rows:
+            writer.commit_every(shard_conn.commit, context.commit_rows)
+        writer.register('Customers', CUSTOMER_COLUMNS)
+        register_order_tables(writer, order_details_dated(shard_cursor), customer_stats)
+
+        customer_ids = range(first_customer_id, last_customer_id + 1)
+        # Shard parts have no header; they are merged into the credential file in customer order
+        with open_credentials(f"{context.password_file_path}.shard{index}", context.credentials_format,
+                              header=False) as part:
+            for customer_ids_chunk in chunked(customer_ids, CUSTOMER_CHUNK_SIZE):
+                records = [build_customer(customer_id) for customer_id in customer_ids_chunk]
+                writer.add_many('Customers', [record[:6] for record in records])
+                part.write(format_credentials(
+                    [(customer_id, name, email, password, address, phone_number)
+                     for customer_id, name, email, _, address, phone_number, password, _ in records],
+                    context.credentials_format))
+                if cache:
+                    for _, _, _, hashed_password, _, _, password, cache_hit in records:
+                        cache.record(password, hashed_password, cache_hit)
+        if cache:
+            cache.flush()
+            cache.close()
+
+        aggregates = OrderAggregates()
+        order_count, order_detail_count = write_orders(writer, customer_ids, settings, product_prices, first_order_id,
+                                                       first_order_detail_id, aggregates)
+        writer.flush()
+        writer.close()
+        shard_conn.commit()
+        sink_counts, sink_max_ids = sink_rows(shard_conn)
+        return {
+            'index': index,
+            'customers': (first_customer_id, last_customer_id),
+            'orders': order_count,
+            'order_details': order_detail_count,
+            'rows': sum(writer.rows_written.values()),
+            'seconds': time.perf_counter() - started,
+            'aggregates': aggregates,
+            'counters': shard_instrumentation.counters,
+            'sink_rows': sink_counts,
+            'sink_max_ids': sink_max_ids,
+        }
+    finally:
+        shard_cursor.close()
+        shard_conn.close()
+
+# Function to add customers, orders and order details split into customer-ID shards,
+# each generated by its own process and connection. For a given seed the data is the
+# same for any shard count: records are derived from (seed, customer ID) and every
+# shard's first OrderID/OrderDetailID is planned from the preceding shards' counts.
+# Returns the last customer ID added, which a stand-in sink of this process does not hold.
+def generate_sharded(num, settings, shards, cost=DEFAULT_BCRYPT_COST, cache_path=None, salt_seed=None):
+    try:
+        log(f"Starting to add {num} customers with their orders in {shards} shards.")
+        product_prices, first_order_id, first_order_detail_id = load_order_context()
+        product_ids = list(product_prices)
+        if not product_ids:
+            log("Products not found. Ensure that products are added first.")
+            return
+
+        started = time.perf_counter()
+        # Repeated emails are found across all shards, so each shard tags the same ones
+        duplicates = find_duplicate_emails(1, num + 1, settings.seed)
+        ranges = split_customer_range(1, num + 1, shards)
+        customer_stats = get_watermark(cursor, 'CustomerStats') == first_order_id - 1
+        with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+            counts = list(executor.map(count_orders, [settings] * len(ranges), *zip(*ranges)))
+            offsets = plan_id_offsets(counts, first_order_id, first_order_detail_id)
+            context = ShardContext(loader, sink, sink_path, bulk_load, commit_rows, credentials_format,
+                                   password_file_path, instrumentation.mode)
+            jobs = [
+                executor.submit(run_shard, context, index, first, last, order_id, order_detail_id,
+                                settings, cost, cache_path, product_prices, duplicates, customer_stats, salt_seed)
+                for index, ((first, last), (order_id, order_detail_id)) in enumerate(zip(ranges, offsets))
+            ]
+            results = [job.result() for job in jobs]
+        # The rows, statements and commits of the shard connections count towards this phase
+        for result in results:
+            for counter, amount in result['counters'].items():
+                instrumentation.count(counter, amount)
+            add_sink_rows(conn, result['sink_rows'], result['sink_max_ids'])
+
+        # Merge the per-shard credential files in customer order
+        with open_credentials(password_file_path, credentials_format) as password_file:
+            for index in range(len(ranges)):
+                part_path = f"{password_file_path}.shard{index}"
+                with open(part_path, encoding='utf-8', newline='') as part:
+                    shutil.copyfileobj(part, password_file)
+                os.remove(part_path)
+
+        aggregates = OrderAggregates()
+        for result in results:
+            aggregates.merge(result['aggregates'])
+        write_order_aggregates(aggregates, first_order_id, settings.now, customer_stats)
+
+        seconds = time.perf_counter() - started
+        order_count = sum(result['orders'] for result in results)
+        order_detail_count = sum(result['order_details'] for result in results)
+        for result in results:
+            first, last = result['customers']
+            rate = result['rows'] / result['seconds'] if result['seconds'] > 0 else 0
+            log(f"Shard {result['index']}: customers {first}-{last}, {result['orders']} orders, "
+                f"{result['order_details']} order details in {result['seconds']:.2f}s ({rate:,.0f} rows/sec)")
+        log(f"{num} customers, {order_count} orders and {order_detail_count} order details have been added in {seconds:.2f}s.")
+        log(f"Customer passwords have been saved to {password_file_path}")
+        log("---------------------------------")
+        return max(result['customers'][1] for result in results)
+    except mysql.connector.Error as err:
+        log(f"Error generating shards: {err}")
+        rollback(err)
+
+# Function to update the InventoryStatus table, as of the reference time now
+def generate_inventory_status(products, seed, now):
+    try:
+        log("Starting to update inventory status.")
+        rng = random.Random(f"{seed}:inventory")
+        low_stock_products = rng.sample(products, 12)
+        out_of_stock_products = rng.sample([p for p in products if p not in low_stock_products], 12)
+        last_updated = now.isoformat(sep=' ', timespec='seconds')
+
+        writer = new_writer()
+        writer.register('InventoryStatus', ('ProductID', 'StockLevel', 'LastUpdated'))
+
+        for product_id in products:
+            if product_id in low_stock_products:
+                stock_level = rng.randint(15, 20)
+            elif product_id in out_of_stock_products:
+                stock_level = 0
+            else:
+                stock_level = rng.randint(20, 1000)
+
+            writer.add('InventoryStatus', (product_id, stock_level, last_updated))
+
+        writer.flush()
+        writer.close()
+        complete_phase('generate_inventory_status')
+        conn.commit()
+        log(f"Inventory status has been updated for {len(products)} products.")
+        log(f"12 products have been set with low stock (15-20 items).")
+        log(f"12 products have been set as out of stock (0 items).")
+        log("---------------------------------")
+    except mysql.connector.Error as err:
+        log(f"Error updating inventory status: {err}")
+        rollback(err)
+
+# Function to draw down InventoryStatus by the units sold per product, never below zero
+def update_inventory_status(units_sold, now):
+    try:
+        log("Starting to update inventory status from the new orders.")
+        cursor.execute('SELECT ProductID, StockLevel FROM InventoryStatus')
+        stock_levels = dict(cursor.fetchall())
+        last_updated = now.isoformat(sep=' ', timespec='seconds')
+
+        writer = new_writer()
+        writer.register('InventoryStatus', ('ProductID', 'StockLevel', 'LastUpdated'),
+                        'ON DUPLICATE KEY UPDATE StockLevel = VALUES(StockLevel), LastUpdated = VALUES(LastUpdated)')
+        for product_id, units in sorted(units_sold.items()):
+            if product_id in stock_levels:
+                writer.add('InventoryStatus', (product_id, max(stock_levels[product_id] - units, 0), last_updated))
+        writer.flush()
+        writer.close()
+        complete_phase('update_inventory_status')
+        conn.commit()
+        out_of_stock = sum(1 for product_id, units in units_sold.items()
+                           if product_id in stock_levels and stock_levels[product_id] <= units)
+        log(f"Inventory status has been updated for {writer.rows_written['InventoryStatus']} products, "
+            f"{out_of_stock} of them are now out of stock.")
+        log("---------------------------------")
+    except mysql.connector.Error as err:
+        log(f"Error updating inventory status: {err}")
+        rollback(err)
+
+# Function to add shopping sessions with their carts, active and abandoned, as of the reference
+# time now, for the customers up to last_customer_id (by default the last one in Customers)
+def generate_sessions(count, seed, now, last_customer_id=None):
+    try:
+        log(f"Starting to add {count} shopping sessions with their carts.")
+        product_ids = load_product_ids()
+        if last_customer_id is None:
+            cursor.execute('SELECT COALESCE(MAX(CustomerID), 0) FROM Customers')
+            last_customer_id = cursor.fetchone()[0]
+        cursor.execute('SELECT COALESCE(MAX(CartItemID), 0) FROM CartItem')
+        first_cart_item_id = cursor.fetchone()[0] + 1
+        if not product_ids:
+            log("Products not found. Ensure that products are added first.")
+            return
+
+        writer = new_writer()
+        register_session_tables(writer)
+        progress = instrumentation.progress('Adding shopping sessions', count)
+        session_count, cart_item_count = write_sessions(writer, count, seed, now, last_customer_id, product_ids,
+                                                        first_cart_item_id, progress=progress.update)
+        progress.finish()
+        writer.flush()
+        writer.close()
+        complete_phase('generate_sessions')
+        conn.commit()
+        log(f"{session_count} shopping sessions and {cart_item_count} cart items have been added.")
+        for line in writer.summary():
+            log(line)
+        log("---------------------------------")
+    except mysql.connector.Error as err:
+        log(f"Error inserting shopping sessions: {err}")
+        rollback(err)
+
+# Function to build the hot-path secondary indexes after the bulk load
+def build_indexes():
+    try:
+        log("Building secondary indexes.")
+        built = create_indexes(cursor)
+        for table, names, seconds in built:
+            log(f"{table}: {', '.join(names)} built in {seconds:.2f}s")
+        log("Secondary indexes are up to date." if built else "All secondary indexes already exist.")
+        log("---------------------------------")
+    except mysql.connector.Error as err:
+        log(f"Error building secondary indexes: {err}")
+
+# Function to drop the hot-path secondary indexes before a bulk load; build_indexes() adds them back
+def drop_secondary_indexes():
+    try:
+        log("Dropping secondary indexes for the bulk load.")
+        kept = foreign_key_indexes(cursor)
+        dropped = drop_indexes(cursor)
+        for table, names, seconds in dropped:
+            log(f"{table}: {', '.join(names)} dropped in {seconds:.2f}s")
+        if kept:
+            log(f"Kept for foreign keys: {', '.join([f'{table}.{name}' for table, name, _ in kept])}")
+        log("Secondary indexes will be rebuilt after the load; if the load fails, rerun with --build-indexes."
+            if dropped else "No secondary indexes to drop.")
+        log("---------------------------------")
+    except mysql.connector.Error as err:
+        log(f"Error dropping secondary indexes: {err}")
+
+# Function to re-check referential integrity and unique keys after a bulk load and turn the checks back on.
+# A failed check fails the phase, so the script exits with an error.
+def verify_bulk_load():
+    global failed_phases
+    try:
+        log("Verifying referential integrity after the bulk load.")
+        problems, checks, seconds = verify_integrity(cursor)
+        for problem in problems:
+            log(f"Error: {problem}")
+        log(f"Integrity verification: {checks} checks in {seconds:.2f}s, "
+            + (f"{len(problems)} failed." if problems else "all passed."))
+        if problems:
+            failed_phases += 1
+        end_bulk_load(cursor)
+        log("---------------------------------")
+    except mysql.connector.Error as err:
+        log(f"Error verifying integrity: {err}")
+        rollback(err)
+
+# Function to read the IDs of all products
+def load_product_ids():
+    cursor.execute('SELECT ProductID FROM Products ORDER BY ProductID ASC')
+    return [row[0] for row in cursor.fetchall()]
+
+# Function to add data to the Promotions table, starting on the day of the reference time now
+def generate_promotions(products, seed, now):
+    log("Starting to add promotions.")
+    rng = random.Random(f"{seed}:promotions")
+    promotions_count = 0 
+    current_date = now.date()
+    future_date = current_date + datetime.timedelta(days=rng.randint(10, 30))
+
+    writer = new_writer()
+    writer.register('Promotions', ('ProductID', 'StartDate', 'EndDate', 'DiscountPercentage'))
+
+    for product_id in products:
+        if rng.random() < 0.2:  # 20% chance to create a promotion for each product
+            discount = round(rng.uniform(5.0, 50.0), 2)
+            writer.add('Promotions', (product_id, current_date, future_date, discount))
+            promotions_count += 1
+
+    try:
+        writer.flush()
+        complete_phase('generate_promotions')
+        conn.commit()
+        log(f"{promotions_count} Promotions have been added.")
+    except mysql.connector.Error as err:
+        log(f"Error adding promotions: {err}")
+        rollback(err)  # Rollback if the batch or commit fails
+    finally:
+        writer.close()
     log("---------------------------------")
 
-except mysql.connector.Error as err:
-    log(f"MySQL Error: {err}")
+# Function to describe the dataset a run generates; runs with equal parameters
+# generate the same data and share a snapshot
+def snapshot_parameters(args, seed, num_customers):
+    parameters = {
+        'seed': seed,
+        'scale': args.scale,
+        'customers': num_customers,
+        'schema_version': max(applied_versions(cursor), default=0),
+        'schema': schema_fingerprint(cursor),
+        'start_date': args.start_date.isoformat(),
+        'orders_per_customer': list(args.orders_per_customer),
+        'generator': args.generator,
+        'bcrypt_cost': args.bcrypt_cost,
+        'sessions': args.sessions,
+    }
+    # Only set when given, so the snapshots of the full catalogue keep their keys
+    if args.catalogue_variation:
+        parameters['catalogue_variation'] = args.catalogue_variation
+    return parameters
 
-finally:
-    if 'conn' in locals() and conn.is_connected():
-        cursor.close()
-        conn.close()
-        log("Database connection closed.")
+# Function to describe a resumable run to its checkpoints: the options that decide its
+# data, and where an append starts, so --resume continues it however it is invoked
+def run_parameters(args, seed, now, num_customers, order_seed, last_customer_id, first_order_id):
+    return {
+        'seed': seed,
+        'as_of': now.isoformat(sep=' '),
+        'customers': num_customers,
+        'start_date': args.start_date.isoformat(),
+        'orders_per_customer': list(args.orders_per_customer),
+        'generator': args.generator,
+        'sessions': args.sessions,
+        'append': args.append,
+        'bcrypt_cost': args.bcrypt_cost,
+        'credentials_format': args.credentials_format,
+        'catalogue_variation': args.catalogue_variation,
+        'order_seed': order_seed,
+        'salt_seed': args.seed,
+        'last_customer_id': last_customer_id,
+        'first_order_id': first_order_id,
+    }
+
+# Function to restore the options of the interrupted run from its parameters.
+# Returns (seed, now, customers, order seed, last CustomerID and next OrderID before an append).
+def resume_parameters(args, parameters):
+    args.start_date = datetime.date.fromisoformat(parameters['start_date'])
+    args.orders_per_customer = OrderCountDistribution(*parameters['orders_per_customer'])
+    args.generator = parameters['generator']
+    args.sessions = parameters['sessions']
+    args.append = parameters['append']
+    args.bcrypt_cost = parameters['bcrypt_cost']
+    args.credentials_format = parameters['credentials_format']
+    args.catalogue_variation = parameters.get('catalogue_variation', 0.0)
+    # Whether the run was given --seed, which decides how its password salts are made
+    args.seed = parameters.get('salt_seed')
+    if args.generator == 'numpy' and not vectorized.available():
+        raise ValueError("the interrupted run used --generator numpy, which requires NumPy (pip install numpy)")
+    return (parameters['seed'], datetime.datetime.fromisoformat(parameters['as_of']), parameters['customers'],
+            parameters['order_seed'], parameters['last_customer_id'], parameters['first_order_id'])
+
+# Function to fill the database from a snapshot instead of generating it
+def restore_from_snapshot(path):
+    global password_file_path
+    try:
+        log(f"Restoring snapshot {path}.")
+        started = time.perf_counter()
+        manifest, restored_credentials = restore_snapshot(cursor, path, password_file_path)
+        conn.commit()
+        seconds = time.perf_counter() - started
+        rows = sum(table['rows'] for table in manifest['tables'])
+        log(f"{rows} rows in {len(manifest['tables'])} tables restored in {seconds:.2f}s "
+            f"({rows / seconds if seconds > 0 else 0:,.0f} rows/sec), generated as of {manifest['as_of']}")
+        if restored_credentials:
+            password_file_path = restored_credentials
+            log(f"Customer passwords have been restored to {password_file_path}")
+        log("---------------------------------")
+    except mysql.connector.Error as err:
+        log(f"Error restoring snapshot: {err}")
+        rollback(err)
+
+# Function to save the generated tables and credentials to a snapshot
+def save_to_snapshot(path, parameters, now):
+    try:
+        log(f"Saving snapshot {path}.")
+        started = time.perf_counter()
+        rows = save_snapshot(conn, path, parameters, now.isoformat(sep=' '), password_file_path)
+        log(f"{sum(rows.values())} rows in {len(rows)} tables saved in {time.perf_counter() - started:.2f}s "
+            f"({os.path.getsize(path) / (1024 * 1024):,.1f} MB)")
+        log("---------------------------------")
+    except mysql.connector.Error as err:
+        log(f"Error saving snapshot: {err}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Insert sample data into the food ordering database.")
+    parser.add_argument('--customers', type=int, default=None,
+                        help="Number of generated customers before --scale is applied "
+                             "(default: 15000, or 0 new customers with --append)")
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help="Multiplier applied to the customer count, and with it to the order volume (default: 1.0)")
+    parser.add_argument('--start-date', type=datetime.date.fromisoformat, default=None,
+                        help=f"First day of the generated order history, YYYY-MM-DD "
+                             f"(default: {START_DATE}, or the day of the latest order with --append)")
+    parser.add_argument('--orders-per-customer', type=parse_order_counts, default=DEFAULT_ORDER_COUNTS,
+                        metavar='MIN-MAX[:TAIL_P:TAIL_MAX]',
+                        help="Orders per customer: uniform MIN-MAX, and customers drawing MAX move to a tail "
+                             "of up to TAIL_MAX orders with probability TAIL_P (default: 1-10:0.1:30). "
+                             "With --append this is the number of orders per customer in the new window")
+    parser.add_argument('--sessions', type=int, default=None,
+                        help=f"Number of shopping sessions with carts, active and abandoned, logged in and guest "
+                             f"(default: {DEFAULT_SESSION_SHARE} x the customer count)")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="Seed for all generated data (a random seed is chosen and logged when omitted); "
+                             "with --as-of every run with the same seed generates the same dataset. Password "
+                             "salts are derived from it and the CustomerID only when it is given")
+    parser.add_argument('--as-of', type=datetime.datetime.fromisoformat, default=None, metavar='DATETIME',
+                        help="Reference time of the generated data: orders end, inventory is updated and promotions "
+                             "start at it, YYYY-MM-DD[ HH:MM:SS] (default: now)")
+    parser.add_argument('--bcrypt-cost', type=int, default=DEFAULT_BCRYPT_COST,
+                        help=f"bcrypt cost factor for customer passwords (default: {DEFAULT_BCRYPT_COST})")
+    parser.add_argument('--hash-workers', type=int, default=os.cpu_count(),
+                        help="Number of processes generating and hashing customers (default: CPU count)")
+    parser.add_argument('--hash-cache', default=None, metavar='PATH',
+                        help="SQLite file caching bcrypt hashes by (salt, password) across reseeds with the same "
+                             "--seed (requires --seed)")
+    parser.add_argument('--shards', type=int, default=1,
+                        help="Split customers and their orders into N customer-ID ranges generated in parallel processes (default: 1)")
+    parser.add_argument('--build-indexes', action='store_true',
+                        help="Build missing hot-path secondary indexes after loading (pairs with 0-Create-Database.py --indexes defer)")
+    parser.add_argument('--loader', choices=sorted(WRITERS), default='insert',
+                        help="How generated tables are written: batched INSERTs or LOAD DATA LOCAL INFILE (default: insert)")
+    parser.add_argument('--sink', choices=SINKS, default='mysql',
+                        help="Where the tables are written: the MySQL database, or without a server an SQLite "
+                             "file, CSV, Parquet or TSV files per table, or nowhere with rows only counted "
+                             "(default: mysql)")
+    parser.add_argument('--sink-path', default=None, metavar='PATH',
+                        help="File or directory written by a stand-in sink (default: database/output/seed.sqlite3 "
+                             "for sqlite, database/output/<sink> for the others)")
+    parser.add_argument('--append', action='store_true',
+                        help="Extend an existing database instead of filling a new one: add --customers new customers, "
+                             "give every customer orders from --start-date until now, and update the derived tables "
+                             "from the new rows only")
+    parser.add_argument('--generator', choices=ORDER_GENERATORS, default='numpy' if vectorized.available() else 'python',
+                        help="Order generator: vectorized with NumPy, or pure Python; they give different orders for "
+                             "the same seed (default: numpy when installed)")
+    parser.add_argument('--credentials-path', default=None, metavar='PATH',
+                        help="File the customer credentials are exported to, given the suffix of "
+                             "--credentials-format (default: database/Customer_Passwords_Pre_Hash.txt)")
+    parser.add_argument('--catalogue-variation', type=float, default=0.0, metavar='SHARE',
+                        help=f"Vary the product catalogue by the seed, as a restaurant of a multi-tenant run: up to "
+                             f"SHARE of each category's items left out and prices scaled by up to +/-SHARE "
+                             f"(0 to {MAX_CATALOGUE_VARIATION}, default: 0, the full catalogue)")
+    parser.add_argument('--credentials-format', choices=sorted(CREDENTIAL_FORMATS), default='text',
+                        help="Format of the exported customer credentials: the original text block per customer, "
+                             "or one CSV or JSON line each, .csv or .jsonl (default: text, .txt)")
+    parser.add_argument('--snapshot', action='store_true',
+                        help="Restore the dataset from a snapshot saved by an earlier run with the same --seed, "
+                             "scale and schema version, or generate it and save a snapshot (requires --seed)")
+    parser.add_argument('--snapshot-dir', default=SNAPSHOT_DIRECTORY, metavar='PATH',
+                        help="Directory of the snapshots (default: database/snapshots)")
+    parser.add_argument('--bulk-load', action='store_true',
+                        help="Bulk-load mode: foreign key and unique checks off, hot-path indexes dropped before "
+                             "the load and rebuilt after it, intermediate commits every --commit-rows rows, and "
+                             "a final pass re-checking foreign keys and unique keys")
+    parser.add_argument('--commit-rows', type=int, default=None, metavar='ROWS',
+                        help=f"Commit after every ROWS rows written instead of once per phase; with --checkpoint "
+                             f"customers and orders are committed with a checkpoint --resume continues from "
+                             f"(default: {BULK_LOAD_COMMIT_ROWS} with --bulk-load, otherwise {CHECKPOINT_COMMIT_ROWS} "
+                             f"with --checkpoint, otherwise once per phase)")
+    parser.add_argument('--checkpoint', action='store_true',
+                        help="Record the run's progress in the SeedCheckpoints table so an interrupted run can be "
+                             "continued with --resume, committing customers and orders with each checkpoint, and "
+                             "retry a phase after a lost connection or a deadlock (requires --sink mysql)")
+    parser.add_argument('--resume', action='store_true',
+                        help="Continue the interrupted run recorded in the SeedCheckpoints table from its last "
+                             "commit, with the data options it was started with; phases it completed are skipped")
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES,
+                        help=f"With --checkpoint, times a phase that lost its connection or hit a deadlock is "
+                             f"retried over a new connection, after delays doubling from 1s, continuing from its "
+                             f"last checkpoint (default: {DEFAULT_RETRIES})")
+    parser.add_argument('--instrumentation', choices=('text', 'json', 'off'), default='text',
+                        help="Phase timings, counters and progress as text, as JSON lines for create-database.js, "
+                             "or off (default: text)")
+    parser.add_argument('--progress-interval', type=float, default=1.0, metavar='SECONDS',
+                        help="Minimum time between progress reports; 0 disables them (default: 1)")
+    args = parser.parse_args()
+    if args.append and args.shards > 1:
+        parser.error("--append cannot be combined with --shards")
+    if args.append and args.sessions:
+        parser.error("--sessions cannot be combined with --append")
+    if args.snapshot and args.seed is None:
+        parser.error("--snapshot requires --seed")
+    if args.hash_cache and args.seed is None and not args.resume:
+        # Without --seed salts are random, so no hash could be reused
+        parser.error("--hash-cache requires --seed")
+    if args.snapshot and args.append:
+        parser.error("--snapshot cannot be combined with --append")
+    if (args.resume or args.checkpoint) and (args.shards > 1 or args.snapshot):
+        parser.error(f"{'--resume' if args.resume else '--checkpoint'} cannot be combined with --shards or --snapshot")
+    if args.retries < 0:
+        parser.error("--retries cannot be negative")
+    if not 0 <= args.catalogue_variation <= MAX_CATALOGUE_VARIATION:
+        parser.error(f"--catalogue-variation must be between 0 and {MAX_CATALOGUE_VARIATION}")
+    if args.sink != 'mysql':
+        # Stand-in sinks only model the batched INSERTs and lookups of a new dataset
+        if args.loader != 'insert':
+            parser.error(f"--sink {args.sink} only supports --loader insert")
+        for option, given in (('--append', args.append), ('--snapshot', args.snapshot),
+                              ('--build-indexes', args.build_indexes), ('--bulk-load', args.bulk_load),
+                              ('--checkpoint', args.checkpoint), ('--resume', args.resume)):
+            if given:
+                parser.error(f"{option} requires --sink mysql")
+        if args.shards > 1 and args.sink != 'null':
+            parser.error("--shards requires --sink mysql or null")
+        if not sink_available(args.sink):
+            parser.error(f"--sink {args.sink} requires pyarrow (pip install pyarrow)")
+    if args.generator == 'numpy' and not vectorized.available():
+        parser.error("--generator numpy requires NumPy (pip install numpy)")
+    return args
+
+def main():
+    global conn, cursor, loader, sink, sink_path, bulk_load, commit_rows, instrumentation, credentials_format, \
+        password_file_path, checkpoints, retries
+    args = parse_args()
+    loader = args.loader
+    bulk_load = args.bulk_load
+    # Runs given --checkpoint record checkpoints and can be resumed; --resume continues one
+    resumable = args.checkpoint or args.resume
+    commit_rows = args.commit_rows if args.commit_rows is not None else (
+        BULK_LOAD_COMMIT_ROWS if bulk_load else CHECKPOINT_COMMIT_ROWS if resumable else 0)
+    retries = args.retries
+    sink = args.sink
+    sink_path = args.sink_path or default_sink_path(sink, SINK_DIRECTORY)
+    credentials_format = args.credentials_format
+    password_file_path = credentials_path(args.credentials_path or password_file_path, credentials_format)
+    instrumentation = Instrumentation(args.instrumentation, args.progress_interval)
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+    if args.customers is None:
+        args.customers = 0 if args.append else 15000
+    num_customers = max(0 if args.append else 1, round(args.customers * args.scale))
+    if args.sessions is None:
+        args.sessions = 0 if args.append else round(num_customers * DEFAULT_SESSION_SHARE)
+
+    # Print environment variables to check if they are loaded correctly
+    log("Environment Variables:")
+    log(f"DATABASE_HOST: {DATABASE_HOST}")
+    log(f"DATABASE_USER: {DATABASE_USER}")
+    log(f"DATABASE_PASSWORD: {DATABASE_PASSWORD}")
+    log(f"DATABASE_NAME: {DATABASE_NAME}")
+    log(f"DATABASE_PORT: {DATABASE_PORT}")
+
+    # Recording the start time
+    start_time = datetime.datetime.now()
+    failed = False  # Set when an error stops the run before its phases finish
+
+    try:
+        # Establishing database connection; snapshots are restored with LOAD DATA LOCAL INFILE
+        # Statements, round trips and commits are counted unless instrumentation is off
+        conn = instrumentation.connection(connect(allow_local_infile=args.snapshot))
+        cursor = conn.cursor()
+
+        run = None
+        if resumable:
+            ensure_checkpoint_table(cursor)  # Databases created before the checkpoints were added lack them
+            checkpoints = load_checkpoints(cursor)
+            run = checkpoints.get(RUN_CHECKPOINT)
+            if args.resume and (run is None or run.done):
+                raise ValueError("there is no interrupted run to resume in this database")
+            if not args.resume and run is not None and not run.done:
+                raise ValueError("the previous run did not finish; continue it with --resume, "
+                                 "or recreate the database to start over")
+        elif sink == 'mysql':
+            # A run without checkpoints changes the data an interrupted run was resumable from
+            ensure_checkpoint_table(cursor)
+            clear_checkpoints(cursor)
+            conn.commit()
+
+        if args.resume:
+            # The interrupted run's options replace the ones given now
+            seed, now, num_customers, order_seed, last_customer_id, first_order_id = resume_parameters(
+                args, run.parameters)
+            credentials_format = args.credentials_format
+            password_file_path = credentials_path(password_file_path, credentials_format)
+        else:
+            # Reference time of the generated data, shared by all shards so no order is in the future
+            now = (args.as_of or datetime.datetime.now()).replace(microsecond=0)
+            order_seed = seed
+            last_customer_id = first_order_id = None
+            if args.append:
+                # New customers continue after the existing ones, and the new order window
+                # starts where the existing order history ends unless a start date is given
+                last_customer_id, last_order_date, first_order_id = load_append_context()
+                if args.start_date is None:
+                    args.start_date = last_order_date.date() if last_order_date else now.date()
+                # Orders of a new window come from their own random streams, so existing
+                # customers do not repeat the baskets they were given in earlier windows
+                order_seed = f"{seed}:{args.start_date.isoformat()}"
+            elif args.start_date is None:
+                args.start_date = START_DATE
+            if args.start_date > now.date():
+                raise ValueError(f"the order window cannot start in the future: {args.start_date}")
+            if resumable:
+                # A new run starts with no checkpoints but its own options
+                clear_checkpoints(cursor)
+                record_checkpoint(cursor, RUN_CHECKPOINT, parameters=run_parameters(
+                    args, seed, now, num_customers, order_seed, last_customer_id, first_order_id))
+                conn.commit()
+                checkpoints = load_checkpoints(cursor)
+
+        # Sample data generation operations
+        log("---------------------------------")
+        log("Script started." if not args.resume else "Script resumed.")
+        log(f"Seed: {seed}")
+        log("Password salts: " + ("derived from the seed" if args.seed is not None else "random"))
+        log(f"{'New customers' if args.append else 'Customers'}: {num_customers}, orders from {args.start_date}")
+        log(f"Loader: {loader}")
+        log(f"Sink: {sink}" + (f" ({sink_path})" if sink != 'mysql' else ''))
+        if bulk_load:
+            log(f"Bulk load: foreign key and unique checks off, commits every {commit_rows} rows")
+        if checkpoints is not None and commit_rows:
+            log(f"Checkpoints: customers and orders are committed every {commit_rows} rows, "
+                f"up to {retries} retries after a lost connection")
+        log(f"Order generator: {args.generator}")
+        log(f"As of: {now}")
+        log("---------------------------------")
+        settings = OrderSettings(order_seed, args.start_date, now, args.orders_per_customer, args.generator)
+        ensure_rollup_tables(cursor)  # Databases created before the rollups were added lack them
+        # A snapshot is keyed by the parameters that decide the data; the reference time is
+        # recorded in it but is not part of the key, so restoring does not depend on the clock
+        snapshot_file = None
+        restored = False
+        if args.snapshot:
+            parameters = snapshot_parameters(args, seed, num_customers)
+            snapshot_file = snapshot_path(args.snapshot_dir, snapshot_key(parameters))
+        # Every phase runs in its own span, timed and with its own counters; with checkpoints
+        # a completed phase is skipped and a lost connection is retried
+        if bulk_load:
+            # Indexes are rebuilt once after the load instead of row by row
+            run_phase('drop_indexes', drop_secondary_indexes)
+        if snapshot_file and os.path.exists(snapshot_file):
+            run_phase('restore_snapshot', restore_from_snapshot, snapshot_file)  # Load every table from the snapshot
+            restored = True
+        elif args.append:
+            if num_customers:
+                run_phase('generate_customers', generate_customers,  # Add new customers
+                          last_customer_id + 1, last_customer_id + num_customers, seed, args.bcrypt_cost,
+                          args.hash_workers, args.hash_cache, append=True, salt_seed=args.seed)
+            # Add the new window of orders
+            aggregates = run_phase('generate_orders_and_details', generate_orders_and_details, settings)
+            # With checkpoints the orders may have been added over several attempts, so the
+            # units sold are read back rather than taken from the last attempt's aggregates
+            units_sold = (load_units_sold(first_order_id) if checkpoints is not None
+                          else aggregates.popularity_scores if aggregates else None)
+            if units_sold:
+                # Draw down stock by the units sold
+                run_phase('update_inventory_status', update_inventory_status, units_sold, now)
+        elif args.shards > 1:
+            run_phase('insert_admin', insert_admin)  # Add the admin user
+            run_phase('generate_products', generate_products, seed, args.catalogue_variation)  # Add products
+            # Add customers with their orders
+            last_customer_id = run_phase('generate_sharded', generate_sharded, num_customers, settings, args.shards,
+                                         args.bcrypt_cost, args.hash_cache, args.seed)
+            # Add inventory status
+            run_phase('generate_inventory_status', generate_inventory_status, load_product_ids(), seed, now)
+        else:
+            run_phase('insert_admin', insert_admin)  # Add the admin user
+            run_phase('generate_customers', generate_customers,  # Add customers
+                      1, num_customers + 1, seed, args.bcrypt_cost, args.hash_workers, args.hash_cache,
+                      salt_seed=args.seed)
+            run_phase('generate_products', generate_products, seed, args.catalogue_variation)  # Add products
+            run_phase('generate_orders_and_details', generate_orders_and_details, settings)  # Add orders and order details
+            # Add inventory status
+            run_phase('generate_inventory_status', generate_inventory_status, load_product_ids(), seed, now)
+        if not args.append and not restored:
+            # Add promotions
+            run_phase('generate_promotions', generate_promotions, load_product_ids(), seed, now)
+        if args.sessions and not restored:
+            # Add shopping sessions with their carts
+            run_phase('generate_sessions', generate_sessions, args.sessions, seed, now,
+                      last_customer_id if args.shards > 1 else None)
+        if snapshot_file and not restored:
+            # Save the generated dataset for later runs
+            run_phase('save_snapshot', save_to_snapshot, snapshot_file, parameters, now)
+        if args.build_indexes or bulk_load:
+            run_phase('build_indexes', build_indexes)  # Add the deferred secondary indexes
+        if bulk_load:
+            run_phase('verify_integrity', verify_bulk_load)  # Re-check what the disabled checks skipped
+        if checkpoints is not None and not failed_phases:
+            # The run is complete; a later run starts over instead of resuming it
+            record_checkpoint(cursor, RUN_CHECKPOINT, done=True, parameters=checkpoints[RUN_CHECKPOINT].parameters)
+            conn.commit()
+        elif checkpoints is not None:
+            log(f"{failed_phases} phases failed; continue the run with --resume to run them again.")
+        elif failed_phases:
+            log(f"{failed_phases} phases failed.")
+        for line in sink_summary(conn):
+            log(line)
+        log("Script finished.")
         log("---------------------------------")
 
-# Calculate the total elapsed time
-end_time = datetime.datetime.now()
-elapsed_time = end_time - start_time
-minutes, seconds = divmod(elapsed_time.total_seconds(), 60)
+    except mysql.connector.Error as err:
+        log(f"MySQL Error: {err}")
+        if checkpoints is not None:
+            log("The committed rows are kept; continue the run with --resume.")
+        failed = True
+    except ValueError as err:
+        log(f"Error: {err}")
+        failed = True
+
+    finally:
+        if conn is not None and conn.is_connected():
+            cursor.close()
+            conn.close()
+            log("Database connection closed.")
+            log("---------------------------------")
+
+    # Calculate the total elapsed time
+    end_time = datetime.datetime.now()
+    elapsed_time = end_time - start_time
+    minutes, seconds = divmod(elapsed_time.total_seconds(), 60)
+
+    if minutes >= 1:
+        log(f"Script completed in {int(minutes)} minutes {int(seconds)} seconds")
+    else:
+        log(f"Script completed in {int(seconds)} seconds")
+    log_peak_memory()
+    instrumentation.summary()
+    # A non-zero exit status tells the caller (create-database.js) the data is incomplete
+    return 1 if failed or failed_phases else 0
 
-if minutes >= 1:
-    log(f"Script completed in {int(minutes)} minutes {int(seconds)} seconds")
-else:
-    log(f"Script completed in {int(seconds)} seconds")
+if __name__ == '__main__':
+    sys.exit(main())
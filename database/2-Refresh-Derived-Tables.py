@@ -0,0 +1,106 @@
+import mysql.connector
+import argparse
+import datetime
+import os
+
+from seeding.rollups import (ORDER_ID_SAFETY_LAG, ensure_rollup_tables, rebuild_derived_tables,
+                             refresh_customer_stats, refresh_daily_product_sales, refresh_order_derived_tables)
+
+# Use environment variables passed from Node.js
+DATABASE_HOST = os.environ.get('DATABASE_HOST')
+DATABASE_USER = os.environ.get('DATABASE_USER')
+DATABASE_PASSWORD = os.environ.get('DATABASE_PASSWORD')
+DATABASE_NAME = os.environ.get('DATABASE_NAME')
+DATABASE_PORT = os.environ.get('DATABASE_PORT')
+
+# Database connection configuration
+config = {
+    'user': DATABASE_USER,
+    'password': DATABASE_PASSWORD,
+    'host': DATABASE_HOST,
+    'port': int(DATABASE_PORT),
+    'database': DATABASE_NAME
+}
+
+# Logging function
+def log(message):
+    print(message)
+
+parser = argparse.ArgumentParser(description="Fold the orders placed since the last run into the derived tables.")
+parser.add_argument('--rebuild', action='store_true',
+                    help="Truncate DailyProductSales, PopularProducts, DynamicPricing, ProductOrders, OrderPatterns "
+                         "and CustomerStats and rebuild them from every order, e.g. after they were changed "
+                         "outside this job")
+parser.add_argument('--lag', type=int, default=ORDER_ID_SAFETY_LAG, metavar='ORDERS',
+                    help="Orders behind the newest one within which a missing OrderID is taken to be an order "
+                         f"not committed yet, so the refresh stops before it (default: {ORDER_ID_SAFETY_LAG})")
+args = parser.parse_args()
+
+# Functions to log the result of each refresh
+def log_daily_product_sales(order_count, rows_touched, seconds):
+    log(f"DailyProductSales: {order_count} new orders folded, {rows_touched} rows affected in {seconds:.2f}s")
+
+def log_order_derived_tables(order_count, lines_scanned, rows_affected, seconds, rebuilt):
+    if rebuilt:
+        log("No watermark: the order-derived tables were rebuilt from every order.")
+    log(f"Order-derived tables: {order_count} new orders folded, {lines_scanned} order lines scanned "
+        f"in {seconds:.2f}s")
+    for table, rows in rows_affected.items():
+        log(f"{table}: {rows} rows affected")
+
+def log_customer_stats(order_count, rows_touched, seconds, rebuilt):
+    log(f"CustomerStats: {'rebuilt from' if rebuilt else 'folded'} {order_count} new orders, "
+        f"{rows_touched} rows affected in {seconds:.2f}s")
+
+# Folds the orders placed since the last run into the rollup and order-derived tables.
+# Safe to run repeatedly: each refresh only reads orders past its watermark, so its cost
+# follows the orders placed since the last run rather than the whole order history.
+log("---------------------------------")
+log("Script started.")
+
+try:
+    conn = mysql.connector.connect(**config)
+    cursor = conn.cursor()
+    ensure_rollup_tables(cursor)
+
+    now = datetime.datetime.now().replace(microsecond=0)
+
+    if args.rebuild:
+        log("Rebuilding the derived tables from every order.")
+        daily_product_sales, order_derived_tables, customer_stats = rebuild_derived_tables(cursor, now, args.lag)
+        conn.commit()
+        log_daily_product_sales(*daily_product_sales)
+        log_order_derived_tables(*order_derived_tables)
+        log_customer_stats(*customer_stats)
+    else:
+        log("Refreshing DailyProductSales.")
+        daily_product_sales = refresh_daily_product_sales(cursor, args.lag)
+        conn.commit()
+        log_daily_product_sales(*daily_product_sales)
+
+        log("Refreshing PopularProducts, DynamicPricing, ProductOrders and OrderPatterns.")
+        order_derived_tables = refresh_order_derived_tables(cursor, now, args.lag)
+        conn.commit()
+        log_order_derived_tables(*order_derived_tables)
+
+        log("Refreshing CustomerStats.")
+        customer_stats = refresh_customer_stats(cursor, args.lag)
+        conn.commit()
+        log_customer_stats(*customer_stats)
+    log("---------------------------------")
+
+except mysql.connector.Error as err:
+    log(f"MySQL Error: {err}")
+    if 'conn' in locals() and conn.is_connected():
+        conn.rollback()
+except ValueError as err:
+    log(f"Error: {err}")
+    if 'conn' in locals() and conn.is_connected():
+        conn.rollback()
+
+finally:
+    if 'conn' in locals() and conn.is_connected():
+        cursor.close()
+        conn.close()
+        log("Database connection closed.")
+        log("---------------------------------")
@@ -0,0 +1,169 @@
+import mysql.connector
+import argparse
+import datetime
+import json
+import math
+import os
+import random
+import sys
+import time
+
+from seeding.migrations import apply_migrations
+from seeding.schema import EMAIL_INDEXES, drop_indexes, plan_indexes
+
+# Measures the login lookup of userController.js (SELECT * FROM Customers WHERE Email = ?)
+# at growing customer counts, without and with the unique email index. Customers are
+# synthetic rows with unique emails: only the row count matters to the lookup, so they
+# are inserted directly instead of being generated and hashed by the seeding script.
+
+# Use environment variables passed from Node.js
+config = {
+    'user': os.environ.get('DATABASE_USER'),
+    'password': os.environ.get('DATABASE_PASSWORD'),
+    'host': os.environ.get('DATABASE_HOST'),
+    'port': int(os.environ.get('DATABASE_PORT') or 3306),
+}
+
+# The statement the backend runs for every customer login
+LOGIN_LOOKUP = 'SELECT * FROM Customers WHERE Email = %s'
+
+# Customers inserted per statement while the table is filled
+FILL_BATCH_SIZE = 10000
+
+# Percentiles reported per measurement
+PERCENTILES = (50, 95, 99)
+
+# Logging function
+def log(message):
+    print(message)
+
+# Function to return the email of a synthetic customer
+def customer_email(customer_id):
+    return f"customer.{customer_id}@example.com"
+
+# Function to create the scratch database, migrated to the current schema
+def open_scratch_database(args):
+    conn = mysql.connector.connect(**config)
+    cursor = conn.cursor()
+    cursor.execute(f'DROP DATABASE IF EXISTS {args.database}')
+    cursor.execute(f'CREATE DATABASE {args.database}')
+    cursor.execute(f'USE {args.database}')
+    apply_migrations(conn, cursor, set())
+    return conn, cursor
+
+# Function to insert the synthetic customers first..last
+def fill_customers(conn, cursor, first_customer_id, last_customer_id):
+    for start in range(first_customer_id, last_customer_id + 1, FILL_BATCH_SIZE):
+        end = min(start + FILL_BATCH_SIZE - 1, last_customer_id)
+        cursor.executemany('''
+            INSERT INTO Customers (CustomerID, Name, Email, Address, Phone, Password)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        ''', [(customer_id, f"Customer {customer_id}", customer_email(customer_id), "Benchmark Address",
+               "1234567890", "x" * 60) for customer_id in range(start, end + 1)])
+        conn.commit()
+
+# Function to read how MySQL accesses Customers for the login lookup (ALL is a full table scan)
+def lookup_plan(cursor):
+    cursor.execute(f'EXPLAIN {LOGIN_LOOKUP}', (customer_email(1),))
+    columns = [column[0] for column in cursor.description]
+    return dict(zip(columns, cursor.fetchone()))['type']
+
+# Function to time the login lookup of the given emails one after another.
+# Returns {plan, lookups, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}.
+def measure_lookups(cursor, emails):
+    latencies = []
+    for email in emails:
+        started = time.perf_counter()
+        cursor.execute(LOGIN_LOOKUP, (email,))
+        cursor.fetchall()
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    metrics = {
+        'plan': lookup_plan(cursor),
+        'lookups': len(latencies),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3),
+    }
+    for percentile in PERCENTILES:
+        # Nearest-rank percentile
+        rank = max(1, math.ceil(percentile / 100 * len(latencies)))
+        metrics[f"p{percentile}_ms"] = round(latencies[rank - 1] * 1000, 3)
+    metrics['max_ms'] = round(latencies[-1] * 1000, 3)
+    return metrics
+
+# Function to run the benchmark at every customer count, growing one table. At each count
+# the email indexes are dropped, the lookups timed, the indexes built and the lookups timed again.
+def run_benchmark(args):
+    rng = random.Random(args.seed)
+    conn, cursor = open_scratch_database(args)
+    results = {}
+    try:
+        stored = 0
+        for count in sorted(set(args.customers)):
+            drop_indexes(cursor, EMAIL_INDEXES)
+            log(f"Filling Customers to {count} rows.")
+            fill_customers(conn, cursor, stored + 1, count)
+            stored = count
+            emails = [customer_email(rng.randint(1, count)) for _ in range(args.lookups)]
+            before = measure_lookups(cursor, emails)
+            started = time.perf_counter()
+            for _, _, statement in plan_indexes(cursor, EMAIL_INDEXES, unique=True):
+                cursor.execute(statement)
+            index_seconds = time.perf_counter() - started
+            after = measure_lookups(cursor, emails)
+            results[str(count)] = {
+                'before': before,
+                'after': after,
+                'index_build_seconds': round(index_seconds, 3),
+                'speedup': round(before['mean_ms'] / after['mean_ms'], 1) if after['mean_ms'] > 0 else None,
+            }
+    finally:
+        cursor.execute(f'DROP DATABASE IF EXISTS {args.database}')
+        cursor.close()
+        conn.close()
+    return results
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the customer login lookup with and without the email index.")
+    parser.add_argument('--database', default=f"{os.environ.get('DATABASE_NAME') or 'food_ordering'}_login_benchmark",
+                        help="Scratch database that is created for the run and dropped after it "
+                             "(default: <DATABASE_NAME>_login_benchmark)")
+    parser.add_argument('--customers', type=lambda value: [int(count) for count in value.split(',')],
+                        default=[10000, 100000, 1000000],
+                        help="Comma-separated customer counts to measure at (default: 10000,100000,1000000)")
+    parser.add_argument('--lookups', type=int, default=200,
+                        help="Login lookups timed per count, before and after the index (default: 200)")
+    parser.add_argument('--seed', type=int, default=1, help="Seed for the emails looked up (default: 1)")
+    parser.add_argument('--output', default=None, metavar='PATH', help="Also write the results to a JSON file")
+    args = parser.parse_args()
+    if min(args.customers) < 1 or args.lookups < 1:
+        parser.error("--customers and --lookups must be positive")
+    return args
+
+def main():
+    args = parse_args()
+    report = {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'lookups': args.lookups,
+        'results': run_benchmark(args),
+    }
+
+    log("---------------------------------")
+    log(f"{'customers':>10} {'index':<6} {'plan':<6} {'mean ms':>9} "
+        + ' '.join([f"{'p' + str(percentile) + ' ms':>9}" for percentile in PERCENTILES]) + f" {'max ms':>9}")
+    for count, result in report['results'].items():
+        for label in ('before', 'after'):
+            metrics = result[label]
+            log(f"{count:>10} {'no' if label == 'before' else 'yes':<6} {metrics['plan']:<6} {metrics['mean_ms']:>9.3f} "
+                + ' '.join([f"{metrics[f'p{percentile}_ms']:>9.3f}" for percentile in PERCENTILES])
+                + f" {metrics['max_ms']:>9.3f}")
+        log(f"{count:>10} index built in {result['index_build_seconds']:.2f}s, lookups {result['speedup']}x faster")
+    log("---------------------------------")
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+        log(f"Results have been saved to {args.output}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
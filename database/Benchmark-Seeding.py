@@ -0,0 +1,251 @@
+import mysql.connector
+import argparse
+import datetime
+import importlib.util
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+from seeding.credentials import credentials_path
+from seeding.hashing import DEFAULT_BCRYPT_COST
+from seeding.instrumentation import COUNTERS, InstrumentedConnection
+from seeding.migrations import apply_migrations
+from seeding import vectorized
+from seeding.orders import DEFAULT_ORDER_COUNTS, ORDER_GENERATORS, START_DATE, OrderSettings
+from seeding.sessions import DEFAULT_SESSION_SHARE
+from seeding.sinks import SINKS, default_sink_path, open_sink, sink_available
+
+# The loader reads its connection settings when it is imported, which the stand-in sinks do not need
+os.environ.setdefault('DATABASE_PORT', '3306')
+
+# The seeding script is loaded as a module so each phase can be run and measured on its own
+LOADER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '1-Insert-Sample-Data-To-Database.py')
+
+# Default baseline file, in a directory ignored by git since timings are machine-specific
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks', 'baseline.json')
+
+# Credential export format of the benchmarked runs, the loader's default
+CREDENTIALS_FORMAT = 'text'
+
+# Logging function
+def log(message):
+    print(message)
+
+# Function to load the seeding script as a module
+def load_loader():
+    spec = importlib.util.spec_from_file_location('insert_sample_data', LOADER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+# Function to read the current resident memory of this process in bytes
+def current_rss():
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        # Without /proc fall back to the peak so far (kilobytes on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+# Samples the resident memory of this process in the background and keeps the peak
+class MemorySampler:
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = current_rss()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+        self.peak = max(self.peak, current_rss())
+
+# Function to open a fresh database for one benchmark run: an empty MySQL database
+# migrated to the current schema, or a stand-in sink writing to the work directory
+def open_database(loader_module, args, work_directory):
+    if args.target != 'mysql':
+        return open_sink(args.target, default_sink_path(args.target, work_directory))
+    config = {key: value for key, value in loader_module.config.items() if key != 'database'}
+    conn = mysql.connector.connect(**config, allow_local_infile=(args.loader == 'load-data'))
+    cursor = conn.cursor()
+    cursor.execute(f'DROP DATABASE IF EXISTS {args.database}')
+    cursor.execute(f'CREATE DATABASE {args.database}')
+    cursor.execute(f'USE {args.database}')
+    apply_migrations(conn, cursor, set())
+    cursor.close()
+    return conn
+
+# Function to run every seeding phase once at the given scale and measure it.
+# Returns {phase: {wall_seconds, rows, rows_per_sec, statements, peak_rss_mb}}.
+def run_benchmark(loader_module, args, scale):
+    num_customers = max(1, round(args.customers * scale))
+    now = datetime.datetime.now().replace(microsecond=0)
+    settings = OrderSettings(args.seed, START_DATE, now, DEFAULT_ORDER_COUNTS, args.generator)
+    m = loader_module
+    phases = [
+        ('insert_admin', lambda: m.insert_admin()),
+        ('generate_customers', lambda: m.generate_customers(1, num_customers + 1, args.seed, args.bcrypt_cost,
+                                                              args.hash_workers)),
+        ('generate_products', lambda: m.generate_products(args.seed)),
+        ('generate_orders_and_details', lambda: m.generate_orders_and_details(settings)),
+        ('generate_inventory_status', lambda: m.generate_inventory_status(m.load_product_ids(), args.seed, now)),
+        ('generate_promotions', lambda: m.generate_promotions(m.load_product_ids(), args.seed, now)),
+        ('generate_sessions', lambda: m.generate_sessions(round(num_customers * DEFAULT_SESSION_SHARE), args.seed, now)),
+    ]
+
+    with tempfile.TemporaryDirectory(prefix='seeding_benchmark_') as work_directory:
+        counters = dict.fromkeys(COUNTERS, 0)
+        conn = InstrumentedConnection(open_database(m, args, work_directory), counters)
+        cursor = conn.cursor()
+        m.conn, m.cursor, m.loader, m.sink = conn, cursor, args.loader, args.target
+        # The customer write stage opens its own connection to the scratch database,
+        # whose statements are counted with the benchmark's
+        m.config = {**m.config, 'database': args.database}
+        m.instrumentation.counters = counters
+        m.credentials_format = CREDENTIALS_FORMAT
+        m.password_file_path = credentials_path(os.path.join(work_directory, 'Customer_Passwords_Pre_Hash'),
+                                                CREDENTIALS_FORMAT)
+        results = {}
+        try:
+            for phase, run in phases:
+                before = dict(counters)
+                with MemorySampler() as memory:
+                    started = time.perf_counter()
+                    run()
+                    seconds = time.perf_counter() - started
+                rows = counters['rows'] - before['rows']
+                results[phase] = {
+                    'wall_seconds': round(seconds, 4),
+                    'rows': rows,
+                    'rows_per_sec': round(rows / seconds, 1) if seconds > 0 else 0,
+                    'statements': counters['statements'] - before['statements'],
+                    'peak_rss_mb': round(memory.peak / (1024 * 1024), 1),
+                }
+        finally:
+            cursor.close()
+            conn.close()
+    return results
+
+# Function to compare results with a baseline. Returns [(scale, phase, baseline seconds,
+# seconds, percent slower)] for every phase more than threshold percent slower.
+def find_regressions(results, baseline, threshold, min_seconds):
+    regressions = []
+    for scale, phases in results.items():
+        for phase, metrics in phases.items():
+            reference = baseline.get(scale, {}).get(phase)
+            if not reference or reference['wall_seconds'] < min_seconds:
+                continue
+            slower = (metrics['wall_seconds'] - reference['wall_seconds']) / reference['wall_seconds'] * 100
+            if slower > threshold:
+                regressions.append((scale, phase, reference['wall_seconds'], metrics['wall_seconds'], slower))
+    return regressions
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark each phase of the sample data loader.")
+    parser.add_argument('--target', choices=SINKS, default='mysql',
+                        help="Run against a scratch MySQL database or a stand-in sink: SQLite, CSV, Parquet or "
+                             "TSV files, or null to measure generation without ingest (default: mysql)")
+    parser.add_argument('--database', default=f"{os.environ.get('DATABASE_NAME') or 'food_ordering'}_benchmark",
+                        help="Scratch database that is dropped and recreated for every run (default: <DATABASE_NAME>_benchmark)")
+    parser.add_argument('--scales', type=lambda value: [float(scale) for scale in value.split(',')],
+                        default=[0.01, 0.1], help="Comma-separated scale factors to run (default: 0.01,0.1)")
+    parser.add_argument('--customers', type=int, default=15000,
+                        help="Customer count at scale 1.0 (default: 15000)")
+    parser.add_argument('--seed', type=int, default=1, help="Seed for the generated data (default: 1)")
+    parser.add_argument('--bcrypt-cost', type=int, default=DEFAULT_BCRYPT_COST,
+                        help=f"bcrypt cost factor for customer passwords (default: {DEFAULT_BCRYPT_COST})")
+    parser.add_argument('--hash-workers', type=int, default=os.cpu_count(),
+                        help="Number of processes hashing customer passwords (default: CPU count)")
+    parser.add_argument('--loader', choices=('insert', 'load-data'), default='insert',
+                        help="Table loader to benchmark; stand-in sinks support insert only (default: insert)")
+    parser.add_argument('--generator', choices=ORDER_GENERATORS, default='numpy' if vectorized.available() else 'python',
+                        help="Order generator to benchmark (default: numpy when installed)")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE_PATH, metavar='PATH',
+                        help="JSON baseline to compare against (default: database/benchmarks/baseline.json)")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="Write this run's results to the baseline file instead of comparing")
+    parser.add_argument('--output', default=None, metavar='PATH',
+                        help="Also write this run's results to a JSON file")
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help="Percent a phase may be slower than the baseline before it is flagged (default: 10)")
+    parser.add_argument('--min-seconds', type=float, default=0.05,
+                        help="Baseline phases faster than this are too noisy to compare (default: 0.05)")
+    args = parser.parse_args()
+    if args.target != 'mysql' and args.loader != 'insert':
+        parser.error(f"the {args.target} target only supports --loader insert")
+    if not sink_available(args.target):
+        parser.error(f"the {args.target} target requires pyarrow (pip install pyarrow)")
+    if args.generator == 'numpy' and not vectorized.available():
+        parser.error("--generator numpy requires NumPy (pip install numpy)")
+    return args
+
+def main():
+    args = parse_args()
+    loader_module = load_loader()
+
+    report = {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'target': args.target,
+        'loader': args.loader,
+        'customers': args.customers,
+        'bcrypt_cost': args.bcrypt_cost,
+        'generator': args.generator,
+        'results': {},
+    }
+    for scale in args.scales:
+        log(f"Benchmarking scale {scale} ({max(1, round(args.customers * scale))} customers) on {args.target}.")
+        report['results'][str(scale)] = run_benchmark(loader_module, args, scale)
+
+    log("---------------------------------")
+    log(f"{'scale':>6} {'phase':<28} {'seconds':>9} {'rows':>10} {'rows/sec':>12} {'statements':>10} {'peak MB':>8}")
+    for scale, phases in report['results'].items():
+        for phase, metrics in phases.items():
+            log(f"{scale:>6} {phase:<28} {metrics['wall_seconds']:>9.3f} {metrics['rows']:>10} "
+                f"{metrics['rows_per_sec']:>12,.0f} {metrics['statements']:>10} {metrics['peak_rss_mb']:>8.1f}")
+    log("---------------------------------")
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+        log(f"Results have been saved to {args.output}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump(report, baseline_file, indent=2)
+        log(f"Baseline has been saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        log(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 0
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+    if (baseline.get('target'), baseline.get('loader'), baseline.get('generator', 'python')) != (
+            args.target, args.loader, args.generator):
+        log(f"Warning: the baseline was recorded with target {baseline.get('target')}, loader "
+            f"{baseline.get('loader')} and generator {baseline.get('generator', 'python')}, so timings may not be comparable.")
+    regressions = find_regressions(report['results'], baseline['results'], args.threshold, args.min_seconds)
+    for scale, phase, reference, seconds, slower in regressions:
+        log(f"REGRESSION: {phase} at scale {scale} took {seconds:.3f}s, {slower:.1f}% slower than the "
+            f"baseline {reference:.3f}s (threshold {args.threshold:.0f}%)")
+    if not regressions:
+        log(f"No phase is more than {args.threshold:.0f}% slower than the baseline.")
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
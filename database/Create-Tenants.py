@@ -0,0 +1,197 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import datetime
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+from seeding.hashing import DEFAULT_BCRYPT_COST
+from seeding import vectorized
+from seeding.orders import ORDER_GENERATORS
+from seeding.tenants import MAX_CATALOGUE_VARIATION, parse_customer_range, plan_tenants
+
+# Provisions one database per restaurant location and fills them concurrently. Every
+# tenant is created by 0-Create-Database.py and seeded by 1-Insert-Sample-Data-To-Database.py,
+# run with the tenant's DATABASE_NAME, seed, customer count and catalogue variation, so a
+# tenant has exactly the schema and kind of data of the single database.
+
+CREATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '0-Create-Database.py')
+LOADER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '1-Insert-Sample-Data-To-Database.py')
+
+# Default directory of the tenants' credential files and script logs
+TENANT_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tenants")
+
+# Logging function
+def log(message):
+    print(message)
+
+# Function to read the JSON events of a loader run, skipping any line that is not one
+def read_events(output):
+    events = []
+    for line in output.splitlines():
+        if line.startswith('{'):
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                pass
+    return events
+
+# Function to create and seed one tenant, run in a worker of the tenant pool. The output
+# of both scripts goes to <database>.log in the tenant directory.
+# Returns {index, database, seed, customers, rows, seconds, rows_per_sec, errors}.
+def populate_tenant(tenant, args, hash_workers, as_of):
+    env = dict(os.environ, DATABASE_NAME=tenant.database)
+    result = {
+        'index': tenant.index,
+        'database': tenant.database,
+        'seed': tenant.seed,
+        'customers': tenant.customers,
+        'rows': 0,
+        'seconds': 0.0,
+        'rows_per_sec': 0.0,
+        'errors': [],
+    }
+    with open(os.path.join(args.directory, f"{tenant.database}.log"), 'w', encoding='utf-8') as output:
+        # 0-Create-Database.py logs MySQL errors and still exits with 0
+        created = subprocess.run([sys.executable, CREATE_PATH, '--reset'], env=env, capture_output=True, text=True)
+        output.write(created.stdout + created.stderr)
+        failures = [line for line in created.stdout.splitlines() if line.startswith('MySQL Error')]
+        if created.returncode or failures:
+            result['errors'] = failures or [f"0-Create-Database.py failed (exit code {created.returncode})"]
+            return result
+
+        command = [
+            sys.executable, LOADER_PATH,
+            '--seed', str(tenant.seed),
+            '--customers', str(tenant.customers),
+            '--as-of', as_of.isoformat(sep=' '),
+            '--catalogue-variation', str(args.catalogue_variation),
+            '--generator', args.generator,
+            '--bcrypt-cost', str(args.bcrypt_cost),
+            '--hash-workers', str(hash_workers),
+            '--credentials-path', os.path.join(args.directory, f"{tenant.database}_Passwords_Pre_Hash"),
+            '--instrumentation', 'json',
+            '--progress-interval', '0',
+        ] + (['--bulk-load'] if args.bulk_load else [])
+        started = time.perf_counter()
+        loaded = subprocess.run(command, env=env, capture_output=True, text=True)
+        result['seconds'] = time.perf_counter() - started
+        output.write(loaded.stdout + loaded.stderr)
+
+    events = read_events(loaded.stdout)
+    summaries = [event for event in events if event['event'] == 'summary']
+    if summaries:
+        result['rows'] = summaries[-1]['rows']
+    result['rows_per_sec'] = result['rows'] / result['seconds'] if result['seconds'] > 0 else 0.0
+    # The loader logs failed phases and carries on, so its errors are read from its log
+    result['errors'] = [event['message'] for event in events
+                        if event['event'] == 'log' and event['message'].startswith(('Error', 'MySQL Error'))]
+    if loaded.returncode:
+        result['errors'].append(f"1-Insert-Sample-Data-To-Database.py failed (exit code {loaded.returncode})")
+    return result
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Create and seed one food ordering database per restaurant "
+                                                 "location, in parallel.")
+    parser.add_argument('--tenants', type=int, required=True, help="Number of tenant databases")
+    parser.add_argument('--prefix', default=f"{os.environ.get('DATABASE_NAME') or 'food_ordering'}_tenant",
+                        help="Tenant databases are named <prefix>_01, <prefix>_02, ... and dropped and created "
+                             "again by every run (default: <DATABASE_NAME>_tenant)")
+    parser.add_argument('--customers', type=parse_customer_range, default=(1000, 5000), metavar='MIN[-MAX]',
+                        help="Customers per tenant, drawn per tenant from MIN-MAX (default: 1000-5000)")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="Seed the tenants' seeds and sizes are drawn from (a random seed is chosen and logged "
+                             "when omitted)")
+    parser.add_argument('--as-of', type=datetime.datetime.fromisoformat, default=None, metavar='DATETIME',
+                        help="Reference time shared by every tenant, YYYY-MM-DD[ HH:MM:SS] (default: now)")
+    parser.add_argument('--catalogue-variation', type=float, default=0.3, metavar='SHARE',
+                        help=f"Up to SHARE of each category's items left off a tenant's menu, and prices scaled "
+                             f"by up to +/-SHARE (0 to {MAX_CATALOGUE_VARIATION}, default: 0.3)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Tenants seeded at the same time, each by its own processes "
+                             "(default: the number of tenants, at most the CPU count)")
+    parser.add_argument('--generator', choices=ORDER_GENERATORS, default='numpy' if vectorized.available() else 'python',
+                        help="Order generator of every tenant (default: numpy when installed)")
+    parser.add_argument('--bcrypt-cost', type=int, default=DEFAULT_BCRYPT_COST,
+                        help=f"bcrypt cost factor for customer passwords (default: {DEFAULT_BCRYPT_COST})")
+    parser.add_argument('--bulk-load', action='store_true', help="Seed every tenant in bulk-load mode")
+    parser.add_argument('--directory', default=TENANT_DIRECTORY, metavar='PATH',
+                        help="Directory of the tenants' credential files and script logs (default: database/tenants)")
+    parser.add_argument('--output', default=None, metavar='PATH', help="Also write the results to a JSON file")
+    args = parser.parse_args()
+    if args.tenants < 1:
+        parser.error("--tenants must be positive")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be positive")
+    if not 0 <= args.catalogue_variation <= MAX_CATALOGUE_VARIATION:
+        parser.error(f"--catalogue-variation must be between 0 and {MAX_CATALOGUE_VARIATION}")
+    return args
+
+def main():
+    args = parse_args()
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+    as_of = (args.as_of or datetime.datetime.now()).replace(microsecond=0)
+    tenants = plan_tenants(args.tenants, args.prefix, seed, args.customers)
+    workers = min(args.workers or os.cpu_count(), len(tenants))
+    # The CPUs are shared out among the tenants seeded at the same time
+    hash_workers = max(1, os.cpu_count() // workers)
+    os.makedirs(args.directory, exist_ok=True)
+
+    log("---------------------------------")
+    log(f"Seed: {seed}")
+    log(f"Tenants: {len(tenants)} ({tenants[0].database} to {tenants[-1].database}), "
+        f"{sum(tenant.customers for tenant in tenants)} customers in total")
+    log(f"Workers: {workers} tenants at a time, {hash_workers} hash workers each")
+    log(f"As of: {as_of}")
+    log("---------------------------------")
+
+    started = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        jobs = [executor.submit(populate_tenant, tenant, args, hash_workers, as_of) for tenant in tenants]
+        for job in as_completed(jobs):
+            result = job.result()
+            results.append(result)
+            log(f"{result['database']}: {'failed' if result['errors'] else 'done'} in {result['seconds']:.2f}s "
+                f"({len(results)} of {len(tenants)})")
+    wall_seconds = time.perf_counter() - started
+    results.sort(key=lambda result: result['index'])
+
+    total_rows = sum(result['rows'] for result in results)
+    failed = [result for result in results if result['errors']]
+    report = {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'seed': seed,
+        'as_of': as_of.isoformat(sep=' '),
+        'workers': workers,
+        'tenants': results,
+        'rows': total_rows,
+        'wall_seconds': round(wall_seconds, 3),
+        'rows_per_sec': round(total_rows / wall_seconds, 1) if wall_seconds > 0 else 0,
+        'failed': len(failed),
+    }
+
+    log("---------------------------------")
+    log(f"{'tenant':<32} {'seed':>10} {'customers':>10} {'rows':>12} {'seconds':>9} {'rows/sec':>10}")
+    for result in results:
+        log(f"{result['database']:<32} {result['seed']:>10} {result['customers']:>10} {result['rows']:>12} "
+            f"{result['seconds']:>9.2f} {result['rows_per_sec']:>10,.0f}")
+    log(f"{'all tenants':<32} {'':>10} {sum(result['customers'] for result in results):>10} {total_rows:>12} "
+        f"{wall_seconds:>9.2f} {report['rows_per_sec']:>10,.0f}")
+    for result in failed:
+        for error in result['errors']:
+            log(f"{result['database']}: {error}")
+    log(f"{len(results) - len(failed)} of {len(results)} tenants seeded; logs and credentials are in {args.directory}")
+    log("---------------------------------")
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+        log(f"Results have been saved to {args.output}")
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
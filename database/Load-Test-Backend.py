@@ -0,0 +1,334 @@
+import argparse
+import asyncio
+import collections
+import json
+import math
+import os
+import random
+import ssl
+import sys
+import urllib.parse
+
+from seeding.credentials import CREDENTIAL_FORMATS, credentials_path, read_credentials
+
+# Replays the seeded customers against a running backend: every virtual customer logs in,
+# browses the menu, fills a cart, checks out and views their orders. Requests are issued
+# open-loop at a fixed rate whatever the response times, and the latency of each request
+# is measured from the moment it was due, so a slow server cannot hide its queueing delay.
+# Checkouts create real orders, so run it against a disposable database.
+
+# Credential file written by the seeding script, without its format suffix
+PASSWORD_FILE_BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Customer_Passwords_Pre_Hash')
+
+DEFAULT_URL = f"http://localhost:{os.environ.get('BACKEND_PORT') or 8000}"
+
+# Percentiles reported per endpoint
+PERCENTILES = (50, 95, 99)
+
+# Logging function
+def log(message):
+    print(message)
+
+# Function to find the credential file in whichever export format exists
+def default_credentials_path():
+    for credential_format in CREDENTIAL_FORMATS:
+        path = credentials_path(PASSWORD_FILE_BASE, credential_format)
+        if os.path.exists(path):
+            return path
+    return credentials_path(PASSWORD_FILE_BASE, 'text')
+
+# Minimal HTTP/1.1 client over one keep-alive connection, with a cookie jar so the
+# backend's express session follows the customer like a browser's would
+class HttpConnection:
+    def __init__(self, url, timeout):
+        parts = urllib.parse.urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.ssl = ssl.create_default_context() if parts.scheme == 'https' else None
+        self.base_path = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.cookies = {}
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method, path, body=None, token=None):
+        try:
+            return await asyncio.wait_for(self._request(method, path, body, token), self.timeout)
+        except BaseException:
+            # A connection in an unknown state cannot be reused
+            self.close()
+            raise
+
+    async def _request(self, method, path, body, token):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+        payload = json.dumps(body).encode() if body is not None else b''
+        headers = [f"{method} {self.base_path}{path} HTTP/1.1", f"Host: {self.host}:{self.port}",
+                   'Connection: keep-alive', 'Accept: application/json', f"Content-Length: {len(payload)}"]
+        if body is not None:
+            headers.append('Content-Type: application/json')
+        if token:
+            headers.append(f"Authorization: Bearer {token}")
+        if self.cookies:
+            headers.append('Cookie: ' + '; '.join([f"{name}={value}" for name, value in self.cookies.items()]))
+        self.writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode('latin-1') + payload)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError('connection closed by the server')
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = (await self.reader.readline()).decode('latin-1').rstrip('\r\n')
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            name = name.strip().lower()
+            value = value.strip()
+            if name == 'set-cookie':
+                cookie_name, _, cookie_value = value.split(';', 1)[0].partition('=')
+                self.cookies[cookie_name.strip()] = cookie_value.strip()
+            response_headers[name] = value
+
+        if method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+            content = b''
+        elif response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            content = await self._read_chunked()
+        elif 'content-length' in response_headers:
+            content = await self.reader.readexactly(int(response_headers['content-length']))
+        else:
+            content = await self.reader.read()
+            response_headers['connection'] = 'close'
+        if response_headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status, content
+
+    async def _read_chunked(self):
+        chunks = []
+        while True:
+            size = int((await self.reader.readline()).split(b';')[0], 16)
+            if size == 0:
+                # Skip trailers up to the blank line ending the message
+                while (await self.reader.readline()).strip():
+                    pass
+                return b''.join(chunks)
+            chunks.append(await self.reader.readexactly(size))
+            await self.reader.readexactly(2)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+# One virtual customer working through a shopping session. next_request() gives the
+# next request as (endpoint label, method, path, JSON body, authenticated), and
+# handle() takes its response; the session is over when next_request() returns None.
+class CustomerSession:
+    def __init__(self, credentials, connection, rng, catalogue, max_cart_items):
+        self.customer_id, self.email, self.password = credentials
+        self.connection = connection
+        self.rng = rng
+        self.catalogue = catalogue
+        self.token = None
+        self.cart = {}
+        self.steps = collections.deque(['login', 'menu'] + ['add_to_cart'] * rng.randint(1, max_cart_items)
+                                       + ['view_cart', 'checkout', 'orders'])
+
+    def next_request(self):
+        while self.steps:
+            step = self.steps.popleft()
+            if step == 'login':
+                return 'POST /api/login', 'POST', '/api/login', {'email': self.email, 'password': self.password}, False
+            if step == 'menu':
+                return 'GET /api/products/ranking-promotion', 'GET', '/api/products/ranking-promotion', None, False
+            if step == 'add_to_cart' and self.catalogue:
+                product_id = self.rng.choice(self.catalogue)
+                quantity = self.rng.randint(1, 3)
+                self.cart[product_id] = self.cart.get(product_id, 0) + quantity
+                return 'POST /api/cart', 'POST', '/api/cart', {'productId': product_id, 'quantity': quantity}, True
+            if step == 'view_cart':
+                return 'GET /api/cart', 'GET', '/api/cart', None, True
+            if step == 'checkout' and self.cart:
+                order_items = [{'productId': product_id, 'quantity': quantity} for product_id, quantity in self.cart.items()]
+                return 'POST /api/orders', 'POST', '/api/orders', {'orderItems': order_items}, True
+            if step == 'orders':
+                return 'GET /api/orders/customer/:id', 'GET', f"/api/orders/customer/{self.customer_id}", None, True
+        return None
+
+    def handle(self, label, status, content):
+        if status >= 400:
+            if label == 'POST /api/login':
+                # Without a token the rest of the session would only measure 401s
+                self.steps.clear()
+            return
+        if label == 'POST /api/login':
+            self.token = json.loads(content).get('token')
+        elif label == 'GET /api/products/ranking-promotion' and not self.catalogue:
+            products = json.loads(content)
+            self.catalogue.extend(sorted({product['ProductID'] for product in products
+                                          if isinstance(product, dict) and 'ProductID' in product}))
+
+# Latencies and errors of one endpoint
+class EndpointStats:
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.statuses = collections.Counter()
+
+    def record(self, seconds, status):
+        self.latencies.append(seconds)
+        self.statuses[status] += 1
+        if not isinstance(status, int) or status >= 400:
+            self.errors += 1
+
+    def summary(self):
+        latencies = sorted(self.latencies)
+        requests = len(latencies)
+        metrics = {
+            'requests': requests,
+            'errors': self.errors,
+            'error_rate': round(self.errors / requests, 4) if requests else 0,
+            'max_ms': round(latencies[-1] * 1000, 1) if latencies else None,
+            'statuses': {str(status): count for status, count in sorted(self.statuses.items(), key=str)},
+        }
+        for percentile in PERCENTILES:
+            # Nearest-rank percentile
+            rank = max(1, math.ceil(percentile / 100 * requests))
+            metrics[f"p{percentile}_ms"] = round(latencies[rank - 1] * 1000, 1) if latencies else None
+        return metrics
+
+# Function to run the load test. Requests are due at a fixed rate (or as a Poisson process);
+# each due slot goes to a virtual customer whose previous request has completed, or to a new
+# customer logging in. Slots are skipped when max_in_flight requests are outstanding.
+async def run_load(args, credentials):
+    loop = asyncio.get_running_loop()
+    rng = random.Random(args.seed)
+    rng.shuffle(credentials)
+    next_credentials = 0
+    catalogue = []
+    ready = collections.deque()
+    stats = collections.defaultdict(EndpointStats)
+    in_flight = set()
+    sessions_started = 0
+    sessions_completed = 0
+    skipped = 0
+
+    async def issue(session, request, due):
+        nonlocal sessions_completed
+        label, method, path, body, authenticated = request
+        try:
+            status, content = await session.connection.request(method, path, body,
+                                                               session.token if authenticated else None)
+        except (OSError, asyncio.TimeoutError, ValueError, IndexError, asyncio.IncompleteReadError) as err:
+            stats[label].record(loop.time() - due, type(err).__name__)
+            session.steps.clear()
+        else:
+            stats[label].record(loop.time() - due, status)
+            try:
+                session.handle(label, status, content)
+            except (ValueError, AttributeError):
+                session.steps.clear()
+        if session.steps:
+            ready.append(session)
+        else:
+            session.connection.close()
+            sessions_completed += 1
+
+    started = loop.time()
+    due = started
+    while due - started < args.duration:
+        delay = due - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(in_flight) >= args.max_in_flight:
+            skipped += 1
+        else:
+            request = None
+            while request is None:
+                if ready:
+                    session = ready.popleft()
+                else:
+                    session = CustomerSession(credentials[next_credentials % len(credentials)],
+                                              HttpConnection(args.url, args.timeout), rng, catalogue,
+                                              args.max_cart_items)
+                    next_credentials += 1
+                    sessions_started += 1
+                request = session.next_request()
+                if request is None:
+                    session.connection.close()
+                    sessions_completed += 1
+            task = asyncio.create_task(issue(session, request, due))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        due += rng.expovariate(args.rps) if args.arrivals == 'poisson' else 1 / args.rps
+
+    if in_flight:
+        await asyncio.wait(in_flight, timeout=args.timeout)
+    for session in ready:
+        session.connection.close()
+    elapsed = loop.time() - started
+    return {
+        'url': args.url,
+        'target_rps': args.rps,
+        'achieved_rps': round(sum(len(endpoint.latencies) for endpoint in stats.values()) / elapsed, 1),
+        'duration_seconds': round(elapsed, 1),
+        'arrivals': args.arrivals,
+        'sessions_started': sessions_started,
+        'sessions_completed': sessions_completed,
+        'skipped_slots': skipped,
+        'endpoints': {label: endpoint.summary() for label, endpoint in sorted(stats.items())},
+    }
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Open-loop HTTP load test of the backend API with the seeded customers.")
+    parser.add_argument('--url', default=DEFAULT_URL, help=f"Backend base URL (default: {DEFAULT_URL})")
+    parser.add_argument('--credentials', default=None, metavar='PATH',
+                        help="Credential file written by the seeding script, as CSV, JSON lines or text "
+                             "(default: database/Customer_Passwords_Pre_Hash.txt, .csv or .jsonl, whichever exists)")
+    parser.add_argument('--rps', type=float, default=50.0, help="Target requests per second (default: 50)")
+    parser.add_argument('--duration', type=float, default=60.0, help="Seconds to generate load for (default: 60)")
+    parser.add_argument('--arrivals', choices=('uniform', 'poisson'), default='poisson',
+                        help="Spacing of requests: fixed intervals or a Poisson process (default: poisson)")
+    parser.add_argument('--max-in-flight', type=int, default=1000,
+                        help="Outstanding requests beyond which due requests are skipped and counted (default: 1000)")
+    parser.add_argument('--max-cart-items', type=int, default=4,
+                        help="Most add-to-cart requests per session (default: 4)")
+    parser.add_argument('--timeout', type=float, default=30.0, help="Per-request timeout in seconds (default: 30)")
+    parser.add_argument('--seed', type=int, default=None, help="Seed for the customer order and cart contents")
+    parser.add_argument('--output', default=None, metavar='PATH', help="Also write the report to a JSON file")
+    args = parser.parse_args()
+    if args.rps <= 0 or args.duration <= 0 or args.max_in_flight < 1 or args.max_cart_items < 1:
+        parser.error("--rps, --duration, --max-in-flight and --max-cart-items must be positive")
+    return args
+
+def main():
+    args = parse_args()
+    args.credentials = args.credentials or default_credentials_path()
+    credentials = read_credentials(args.credentials)
+    if not credentials:
+        log(f"No customer credentials found in {args.credentials}. Run 1-Insert-Sample-Data-To-Database.py first.")
+        return 1
+    log(f"Replaying {len(credentials)} customers against {args.url} at {args.rps:g} requests/sec "
+        f"({args.arrivals} arrivals) for {args.duration:g}s.")
+    report = asyncio.run(run_load(args, credentials))
+
+    log("---------------------------------")
+    log(f"{'endpoint':<38} {'requests':>8} {'errors':>7} {'error %':>7} "
+        + ' '.join([f"{'p' + str(percentile) + ' ms':>9}" for percentile in PERCENTILES]) + f" {'max ms':>9}")
+    for label, metrics in report['endpoints'].items():
+        log(f"{label:<38} {metrics['requests']:>8} {metrics['errors']:>7} {metrics['error_rate'] * 100:>7.2f} "
+            + ' '.join([f"{metrics[f'p{percentile}_ms']:>9.1f}" for percentile in PERCENTILES])
+            + f" {metrics['max_ms']:>9.1f}")
+    log("---------------------------------")
+    log(f"Achieved {report['achieved_rps']} requests/sec of {args.rps:g} targeted; {report['sessions_started']} sessions "
+        f"started, {report['sessions_completed']} completed, {report['skipped_slots']} slots skipped at the in-flight limit.")
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+        log(f"Report has been saved to {args.output}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1 @@
+# Helpers shared by the numbered database scripts in this directory
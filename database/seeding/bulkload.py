@@ -0,0 +1,82 @@
+import time
+
+# Session variables of a bulk load as {name: (during the load, afterwards)}. They only
+# affect the connection that sets them, and a dropped connection takes them with it.
+BULK_LOAD_SESSION = {
+    'foreign_key_checks': (0, 1),
+    'unique_checks': (0, 1),
+}
+
+# Rows written between commits in bulk-load mode unless --commit-rows is given
+BULK_LOAD_COMMIT_ROWS = 250000
+
+# Function to turn foreign key and unique checks off for this session
+def begin_bulk_load(cursor):
+    for name, (value, _) in BULK_LOAD_SESSION.items():
+        cursor.execute(f'SET SESSION {name} = {value}')
+
+# Function to turn foreign key and unique checks back on for this session
+def end_bulk_load(cursor):
+    for name, (_, value) in BULK_LOAD_SESSION.items():
+        cursor.execute(f'SET SESSION {name} = {value}')
+
+# Function to read the foreign keys of the database as [(table, [columns], referenced table, [referenced columns])]
+def foreign_keys(cursor):
+    cursor.execute('''
+        SELECT TABLE_NAME, CONSTRAINT_NAME, COLUMN_NAME, REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME
+        FROM information_schema.KEY_COLUMN_USAGE
+        WHERE TABLE_SCHEMA = DATABASE() AND REFERENCED_TABLE_NAME IS NOT NULL
+        ORDER BY TABLE_NAME, CONSTRAINT_NAME, ORDINAL_POSITION
+    ''')
+    keys = {}
+    for table, constraint, column, referenced_table, referenced_column in cursor.fetchall():
+        key = keys.setdefault((table, constraint), (table, [], referenced_table, []))
+        key[1].append(column)
+        key[3].append(referenced_column)
+    return list(keys.values())
+
+# Function to read the unique secondary keys of the database as [(table, index name, [columns])].
+# Primary keys are left out: they are enforced even with unique checks off.
+def unique_keys(cursor):
+    cursor.execute('''
+        SELECT TABLE_NAME, INDEX_NAME, COLUMN_NAME
+        FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND NON_UNIQUE = 0 AND INDEX_NAME <> 'PRIMARY'
+        ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX
+    ''')
+    keys = {}
+    for table, index, column in cursor.fetchall():
+        keys.setdefault((table, index), (table, index, []))[2].append(column)
+    return list(keys.values())
+
+# Function to re-check what the bulk load did not: every foreign key value has its
+# referenced row, and no unique key holds a value twice. NULLs satisfy both, as in MySQL.
+# Returns ([problem descriptions], checks run, seconds).
+def verify_integrity(cursor):
+    started = time.perf_counter()
+    problems = []
+    checks = 0
+    for table, columns, referenced_table, referenced_columns in foreign_keys(cursor):
+        present = ' AND '.join([f"c.{column} IS NOT NULL" for column in columns])
+        matches = ' AND '.join([f"p.{referenced} = c.{column}" for column, referenced in zip(columns, referenced_columns)])
+        cursor.execute(f'''
+            SELECT COUNT(*) FROM {table} c
+            WHERE {present} AND NOT EXISTS (SELECT 1 FROM {referenced_table} p WHERE {matches})
+        ''')
+        orphans = cursor.fetchone()[0]
+        checks += 1
+        if orphans:
+            problems.append(f"{orphans} rows of {table} ({', '.join(columns)}) reference missing "
+                            f"{referenced_table} ({', '.join(referenced_columns)}) rows")
+    for table, index, columns in unique_keys(cursor):
+        present = ' AND '.join([f"{column} IS NOT NULL" for column in columns])
+        cursor.execute(f'''
+            SELECT COUNT(*) FROM (
+                SELECT 1 FROM {table} WHERE {present} GROUP BY {', '.join(columns)} HAVING COUNT(*) > 1
+            ) AS Duplicates
+        ''')
+        duplicates = cursor.fetchone()[0]
+        checks += 1
+        if duplicates:
+            problems.append(f"{duplicates} values of unique key {table}.{index} ({', '.join(columns)}) are duplicated")
+    return problems, checks, time.perf_counter() - started
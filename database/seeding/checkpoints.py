@@ -0,0 +1,82 @@
+import collections
+import json
+import random
+
+from mysql.connector import errorcode
+
+# Progress of the seeding run in the database it fills, one row per phase. A phase records
+# its position (the last customer it committed) in the same transaction as the rows up to
+# it, and marks itself done in the transaction of its last commit, so after a failure the
+# rows tell exactly what is committed. The 'run' row keeps the options of the run.
+SEED_CHECKPOINTS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS SeedCheckpoints (
+        Phase VARCHAR(64) PRIMARY KEY,
+        Position BIGINT NOT NULL DEFAULT 0,
+        Done BOOLEAN NOT NULL DEFAULT FALSE,
+        Parameters TEXT,
+        UpdatedAt DATETIME NOT NULL
+    )
+'''
+
+# Phase name of the row holding the options of the run
+RUN_CHECKPOINT = 'run'
+
+# A phase's recorded progress; parameters is a dictionary or None
+Checkpoint = collections.namedtuple('Checkpoint', ('position', 'done', 'parameters'))
+
+# Rows written between the checkpoints of a resumable run unless --commit-rows is given
+CHECKPOINT_COMMIT_ROWS = 100000
+
+# Retries of a phase after a lost connection unless --retries is given, and the delays
+# between them: doubling from the base up to the maximum, each shortened by a random jitter
+DEFAULT_RETRIES = 5
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 60.0
+
+# Errors after which a phase is retried over a new connection: the server could not be
+# reached or the connection was lost, or the transaction was rolled back by a deadlock
+# or a lock wait timeout
+RETRYABLE_ERRORS = {
+    errorcode.CR_CONN_HOST_ERROR,
+    errorcode.CR_SERVER_GONE_ERROR,
+    errorcode.CR_SERVER_LOST,
+    errorcode.CR_SERVER_LOST_EXTENDED,
+    errorcode.ER_LOCK_DEADLOCK,
+    errorcode.ER_LOCK_WAIT_TIMEOUT,
+}
+
+# Jitter of the retry delays, kept apart from the random streams of the generated data
+_jitter = random.Random()
+
+# Function to create the checkpoint table if it does not exist yet
+def ensure_checkpoint_table(cursor):
+    cursor.execute(SEED_CHECKPOINTS_TABLE)
+
+# Function to read every phase's checkpoint as {phase: Checkpoint}
+def load_checkpoints(cursor):
+    cursor.execute('SELECT Phase, Position, Done, Parameters FROM SeedCheckpoints')
+    return {phase: Checkpoint(position, bool(done), json.loads(parameters) if parameters else None)
+            for phase, position, done, parameters in cursor.fetchall()}
+
+# Function to record a phase's checkpoint. The caller commits, so the checkpoint is
+# committed together with the rows it covers.
+def record_checkpoint(cursor, phase, position=0, done=False, parameters=None):
+    cursor.execute('''
+        INSERT INTO SeedCheckpoints (Phase, Position, Done, Parameters, UpdatedAt)
+        VALUES (%s, %s, %s, %s, NOW())
+        ON DUPLICATE KEY UPDATE Position = VALUES(Position), Done = VALUES(Done),
+                                Parameters = VALUES(Parameters), UpdatedAt = VALUES(UpdatedAt)
+    ''', (phase, position, done, json.dumps(parameters) if parameters is not None else None))
+
+# Function to forget the checkpoints of the previous run
+def clear_checkpoints(cursor):
+    cursor.execute('DELETE FROM SeedCheckpoints')
+
+# Function to tell whether a phase that failed with err can be retried over a new connection.
+# Only the errors listed in RETRYABLE_ERRORS are; any other, operational or not, fails the phase.
+def is_retryable(err):
+    return err.errno in RETRYABLE_ERRORS
+
+# Function to return the delay before the given retry (1 for the first)
+def retry_delay(attempt):
+    return min(RETRY_BASE_DELAY * 2 ** (attempt - 1), RETRY_MAX_DELAY) * _jitter.uniform(0.5, 1.0)
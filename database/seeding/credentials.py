@@ -0,0 +1,114 @@
+import csv
+import io
+import json
+import os
+
+# Formats the plaintext customer credentials can be exported in, with their file suffix.
+# 'text' is the original multi-line block per customer; csv and jsonl take one line each.
+CREDENTIAL_FORMATS = {'text': '.txt', 'csv': '.csv', 'jsonl': '.jsonl'}
+
+# Fields of an exported credential record, in order
+CREDENTIAL_FIELDS = ('CustomerID', 'Name', 'Email', 'Password', 'Address', 'Phone')
+
+# Function to give a credential file path the suffix of its format
+def credentials_path(path, credential_format):
+    return os.path.splitext(path)[0] + CREDENTIAL_FORMATS[credential_format]
+
+# Function to format credential records (CustomerID, name, email, password, address, phone)
+# as one block of text, so a chunk of customers is written with a single call
+def format_credentials(records, credential_format):
+    if credential_format == 'csv':
+        block = io.StringIO()
+        csv.writer(block, lineterminator='\n').writerows(records)
+        return block.getvalue()
+    if credential_format == 'jsonl':
+        return ''.join([json.dumps(dict(zip(CREDENTIAL_FIELDS, record))) + '\n' for record in records])
+    return ''.join([
+        f"CustomerID: {customer_id}\nName: {name}\nE-Mail: {email}\nPassword: {password}\n"
+        f"Address: {address}\nPhone: {phone_number}\n---------------------------------\n"
+        for customer_id, name, email, password, address, phone_number in records
+    ])
+
+# Function to open a credential file for writing. A CSV file that is new or empty starts
+# with a header row, unless header is False (for parts merged into a file later).
+def open_credentials(path, credential_format, append=False, header=True):
+    has_content = append and os.path.exists(path) and os.path.getsize(path) > 0
+    credential_file = open(path, 'a' if append else 'w', encoding='utf-8', newline='')
+    if credential_format == 'csv' and header and not has_content:
+        credential_file.write(','.join(CREDENTIAL_FIELDS) + '\n')
+    return credential_file
+
+# Function to read a credential file in any of the export formats, told apart by suffix.
+# Returns [(CustomerID, email, password)].
+def read_credentials(path):
+    credentials = []
+    with open(path, encoding='utf-8', newline='') as credential_file:
+        if path.endswith(CREDENTIAL_FORMATS['csv']):
+            for row in csv.DictReader(credential_file):
+                credentials.append((int(row['CustomerID']), row['Email'], row['Password']))
+        elif path.endswith(CREDENTIAL_FORMATS['jsonl']):
+            for line in credential_file:
+                if line.strip():
+                    record = json.loads(line)
+                    credentials.append((int(record['CustomerID']), record['Email'], record['Password']))
+        else:
+            entry = {}
+            for line in credential_file:
+                if line.startswith('---'):
+                    if {'CustomerID', 'E-Mail', 'Password'} <= entry.keys():
+                        credentials.append((int(entry['CustomerID']), entry['E-Mail'], entry['Password']))
+                    entry = {}
+                    continue
+                key, _, value = line.rstrip('\n').partition(': ')
+                entry[key] = value
+    return credentials
+
+# Function to cut a credential file back to the customers up to last_customer_id, for a
+# resumed run whose later customers were not committed. Records are in CustomerID order,
+# so the file is truncated after the last complete record kept. Returns the highest
+# CustomerID left in the file, or 0.
+def truncate_credentials(path, last_customer_id):
+    if not os.path.exists(path):
+        return 0
+    kept_id = 0
+    kept_bytes = 0
+    consumed = 0
+    complete = True
+    with open(path, encoding='utf-8', newline='') as credential_file:
+        # Lines of the file, counting the bytes read; a last line without its newline was cut off
+        def lines():
+            nonlocal consumed, complete
+            for line in credential_file:
+                consumed += len(line.encode('utf-8'))
+                complete = line.endswith('\n')
+                yield line
+
+        if path.endswith(CREDENTIAL_FORMATS['csv']):
+            for row in csv.reader(lines()):
+                if row == list(CREDENTIAL_FIELDS):
+                    kept_bytes = consumed
+                    continue
+                if not complete or len(row) != len(CREDENTIAL_FIELDS) or int(row[0]) > last_customer_id:
+                    break
+                kept_id, kept_bytes = int(row[0]), consumed
+        elif path.endswith(CREDENTIAL_FORMATS['jsonl']):
+            for line in lines():
+                if not complete:
+                    break
+                customer_id = int(json.loads(line)['CustomerID'])
+                if customer_id > last_customer_id:
+                    break
+                kept_id, kept_bytes = customer_id, consumed
+        else:
+            customer_id = None
+            for line in lines():
+                if line.startswith('CustomerID: '):
+                    customer_id = int(line[len('CustomerID: '):])
+                elif line.startswith('---') and complete:
+                    if customer_id is None or customer_id > last_customer_id:
+                        break
+                    kept_id, kept_bytes = customer_id, consumed
+                    customer_id = None
+    with open(path, 'r+b') as credential_file:
+        credential_file.truncate(kept_bytes)
+    return kept_id
@@ -0,0 +1,95 @@
+import faker
+
+from seeding.emails import disambiguate_email, email_digest
+from seeding.hashing import HashCache, derive_salt, hash_password
+
+# The specific customer with ID 1: (Name, Email, Address, Phone, Password)
+TEST_CUSTOMER_ID = 1
+TEST_CUSTOMER = ("Test User", "test", "Test Address", "1234567890", "123456")
+
+# Per-process state, set up once in each pool worker by init_worker
+_worker = {}
+
+# Pool initializer: one Faker instance and one cache connection per worker process.
+# duplicates holds the emails generated more than once (see DuplicateEmails). With a
+# salt_seed the password salts are derived from it and the CustomerID, otherwise they
+# are random; only hashes with derived salts are cached.
+def init_worker(seed, cost, cache_path=None, duplicates=None, salt_seed=None):
+    _worker['fake'] = faker.Faker()
+    _worker['seed'] = seed
+    _worker['cost'] = cost
+    _worker['cache'] = HashCache(cache_path) if cache_path and salt_seed is not None else None
+    _worker['duplicates'] = duplicates
+    _worker['salt_seed'] = salt_seed
+
+# Function to generate random password
+def generate_password(fake):
+    while True:
+        password = fake.password(length=12, special_chars=True, digits=True, upper_case=True, lower_case=True)
+        if (
+            any(c.islower() for c in password) and
+            any(c.isupper() for c in password) and
+            any(c.isdigit() for c in password) and
+            any(c in '!@#$%^&*()-_=+' for c in password)
+        ):
+            return password
+
+# Function to reseed Faker for a customer and draw the name and email it starts with.
+# Reseeding per customer makes each record independent of which worker builds it.
+def customer_identity(customer_id):
+    if customer_id == TEST_CUSTOMER_ID:
+        return TEST_CUSTOMER[:2]
+    fake = _worker['fake']
+    fake.seed_instance(f"{_worker['seed']}:{customer_id}")
+    return fake.name(), fake.email()
+
+# Function to generate one customer record without its password hash:
+# (CustomerID, name, email, address, phone, password). An email Faker drew for
+# more than one customer is tagged with the CustomerID, so every email is unique.
+def generate_customer(customer_id):
+    fake = _worker['fake']
+
+    if customer_id == TEST_CUSTOMER_ID:
+        name, email, address, phone_number, password = TEST_CUSTOMER
+    else:
+        name, email = customer_identity(customer_id)
+        if _worker['duplicates'] is not None and email in _worker['duplicates']:
+            email = disambiguate_email(email, customer_id)
+        rng = fake.random
+        phone_number = ''.join([str(rng.randint(0, 9)) for _ in range(rng.randint(10, 12))])
+        address = fake.address()
+        password = generate_password(fake)
+    return (customer_id, name, email, address, phone_number, password)
+
+# Function to hash the password of a generated customer unless the cache already has it.
+# Returns (CustomerID, name, email, hash, address, phone, password, cache hit).
+def hash_customer(record):
+    customer_id, name, email, address, phone_number, password = record
+    cost = _worker['cost']
+    cache = _worker['cache']
+    salt = derive_salt(_worker['salt_seed'], customer_id, cost) if _worker['salt_seed'] is not None else None
+    hashed_password = cache.get(password, salt) if cache else None
+    cache_hit = hashed_password is not None
+    if not cache_hit:
+        hashed_password = hash_password(password, cost, salt)
+    return (customer_id, name, email, hashed_password, address, phone_number, password, cache_hit)
+
+# Function to build one customer record, hashing its password unless the cache already has it
+def build_customer(customer_id):
+    return hash_customer(generate_customer(customer_id))
+
+# Function to generate the customers with IDs first..last, used as one pool task
+def generate_customer_chunk(id_range):
+    first_customer_id, last_customer_id = id_range
+    return [generate_customer(customer_id) for customer_id in range(first_customer_id, last_customer_id + 1)]
+
+# Function to draw the emails of the customers with IDs first..last, as concatenated
+# digests, used as one pool task while the repeated emails are collected
+def email_digest_chunk(id_range):
+    first_customer_id, last_customer_id = id_range
+    return b''.join([email_digest(customer_identity(customer_id)[1])
+                     for customer_id in range(first_customer_id, last_customer_id + 1)])
+
+# Function to hash the passwords of a list of generated customers, used as one pool task
+def hash_customer_chunk(records):
+    return [hash_customer(record) for record in records]
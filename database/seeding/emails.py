@@ -0,0 +1,84 @@
+import hashlib
+import math
+
+# False positive rate of the email filters. A false positive only renames an email
+# that was unique already, so it costs a longer address, never a duplicate.
+EMAIL_FALSE_POSITIVE_RATE = 0.001
+
+# Bytes of the digest an email is reduced to before it is added to a filter
+EMAIL_DIGEST_SIZE = 16
+
+# Function to reduce an email to the digest the filters hash. MySQL compares emails
+# case-insensitively, so case is folded first.
+def email_digest(email):
+    return hashlib.blake2b(email.lower().encode('utf-8'), digest_size=EMAIL_DIGEST_SIZE).digest()
+
+# Function to make an email unique by tagging its local part with the customer ID,
+# e.g. jane.doe+1234@example.com. Generated emails never contain '+', so tagged ones
+# cannot clash with them or with each other.
+def disambiguate_email(email, customer_id):
+    local, at, domain = email.partition('@')
+    return f"{local}+{customer_id}{at}{domain}"
+
+# Bloom filter over email digests: a bit array of about 14 bits per email at the default
+# rate, where a Python set of the emails takes well over 100 bytes each. It can tell
+# that an email was possibly added before, never miss one that was.
+class EmailFilter:
+    def __init__(self, capacity, false_positive_rate=EMAIL_FALSE_POSITIVE_RATE):
+        capacity = max(capacity, 1)
+        self.size = max(64, math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def positions(self, digest):
+        # Double hashing: two 64-bit halves of the digest give every bit position
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    # Adds a digest; returns True if it was possibly added before
+    def add(self, digest):
+        present = True
+        for position in self.positions(digest):
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] & (1 << bit):
+                present = False
+                self.bits[byte] |= 1 << bit
+        return present
+
+    def __contains__(self, digest):
+        return all(self.bits[position // 8] & (1 << position % 8) for position in self.positions(digest))
+
+# The emails seen more than once among the generated (and already stored) customers,
+# kept as two filters: emails seen, and emails seen again. Whether an email is repeated
+# depends only on the set of emails added, not on their order, so every customer can
+# decide on its own (in any worker or shard) whether its email has to be tagged.
+class DuplicateEmails:
+    def __init__(self, capacity):
+        self.seen = EmailFilter(capacity)
+        self.repeated = EmailFilter(capacity)
+        self.count = 0
+
+    def add(self, digest):
+        if self.seen.add(digest) and not self.repeated.add(digest):
+            self.count += 1
+
+    def __contains__(self, email):
+        return email_digest(email) in self.repeated
+
+    def memory_bytes(self):
+        return len(self.seen.bits) + len(self.repeated.bits)
+
+# Function to build the statement that makes the emails already stored in a table unique:
+# the row with the lowest ID keeps an email, the others are tagged with their ID
+def deduplicate_emails_statement(table, id_column):
+    return f'''
+        UPDATE {table} t
+        JOIN (
+            SELECT Email, MIN({id_column}) AS FirstID FROM {table}
+            WHERE Email IS NOT NULL GROUP BY Email HAVING COUNT(*) > 1
+        ) d ON t.Email = d.Email AND t.{id_column} > d.FirstID
+        SET t.Email = IF(LOCATE('@', t.Email) > 0,
+                         CONCAT(SUBSTRING_INDEX(t.Email, '@', 1), '+', t.{id_column}, '@', SUBSTRING_INDEX(t.Email, '@', -1)),
+                         CONCAT(t.Email, '+', t.{id_column}))
+    '''
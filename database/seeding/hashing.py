@@ -0,0 +1,75 @@
+import base64
+import hashlib
+import random
+import sqlite3
+
+import bcrypt
+
+# bcrypt cost used for seeded accounts, matching the cost used by the backend
+DEFAULT_BCRYPT_COST = 10
+
+# bcrypt encodes its salt in base64 with its own alphabet
+BCRYPT_ALPHABET = bytes.maketrans(b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/',
+                                  b'./ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789')
+
+# Length of the '$2b$<cost>$<salt>' prefix a bcrypt hash starts with
+BCRYPT_SALT_LENGTH = 29
+
+# Function to derive the bcrypt salt of a generated customer from (seed, CustomerID) with
+# a seeded random stream, so a run given --seed gets the same hashes every time while
+# every customer has a salt of its own, whatever its password
+def derive_salt(seed, customer_id, cost):
+    rng = random.Random(f"{seed}:salt:{customer_id}")
+    return b'$2b$%02d$' % cost + base64.b64encode(rng.randbytes(16)).translate(BCRYPT_ALPHABET)[:22]
+
+# Function to hash the password, with a random salt unless a derived one is given
+def hash_password(password, cost=DEFAULT_BCRYPT_COST, salt=None):
+    return bcrypt.hashpw(password.encode('utf-8'), salt or bcrypt.gensalt(rounds=cost)).decode('utf-8')
+
+# On-disk cache of bcrypt hashes with derived salts, keyed by (salt, password), so a
+# reseed with the same --seed reuses them. Keys are SHA-256 digests, so the cache file
+# never holds plaintext passwords. The cost is part of the salt.
+class HashCache:
+    def __init__(self, path):
+        self.path = path
+        # The seeding pipeline records hashes from a stage thread, one thread at a time
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS BcryptHashes (CacheKey TEXT PRIMARY KEY, Hash TEXT NOT NULL)')
+        self.conn.commit()
+        self.hits = 0
+        self.misses = 0
+        self.pending = []
+
+    @staticmethod
+    def key(password, salt):
+        return hashlib.sha256(b'salted:' + salt + b':' + password.encode('utf-8')).hexdigest()
+
+    def get(self, password, salt):
+        row = self.conn.execute('SELECT Hash FROM BcryptHashes WHERE CacheKey = ?', (self.key(password, salt),)).fetchone()
+        return row[0] if row else None
+
+    # Stores (password, hash) pairs under the salt each hash starts with
+    def put_many(self, entries):
+        self.conn.executemany('INSERT OR REPLACE INTO BcryptHashes (CacheKey, Hash) VALUES (?, ?)',
+                              [(self.key(password, hashed[:BCRYPT_SALT_LENGTH].encode('utf-8')), hashed)
+                               for password, hashed in entries])
+        self.conn.commit()
+
+    # Counts a lookup made by a pool worker and queues newly computed hashes for storage
+    def record(self, password, hashed, cache_hit):
+        if cache_hit:
+            self.hits += 1
+            return
+        self.misses += 1
+        self.pending.append((password, hashed))
+        if len(self.pending) >= 5000:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.put_many(self.pending)
+            self.pending = []
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,186 @@
+import contextlib
+import datetime
+import json
+import re
+import sys
+import time
+
+# Statements that write rows, counted as rows written
+WRITE_PATTERN = re.compile(r'^\s*(INSERT|REPLACE|UPDATE|DELETE|LOAD DATA)', re.IGNORECASE)
+
+# Names of the counters kept for every span
+COUNTERS = ('rows', 'statements', 'round_trips', 'commits')
+
+# Cursor wrapper counting statements, round trips and rows written. Multi-row INSERTs
+# sent by executemany are one statement and one round trip.
+class InstrumentedCursor:
+    def __init__(self, cursor, counters):
+        self.cursor = cursor
+        self.counters = counters
+
+    def execute(self, statement, params=None):
+        self.cursor.execute(statement, params)
+        self.counters['statements'] += 1
+        self.counters['round_trips'] += 1
+        if WRITE_PATTERN.match(statement) and self.cursor.rowcount > 0:
+            self.counters['rows'] += self.cursor.rowcount
+
+    def executemany(self, statement, rows):
+        self.cursor.executemany(statement, rows)
+        self.counters['statements'] += 1
+        self.counters['round_trips'] += 1
+        self.counters['rows'] += len(rows)
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+# Connection wrapper counting commits and handing out instrumented cursors
+class InstrumentedConnection:
+    def __init__(self, conn, counters):
+        self.conn = conn
+        self.counters = counters
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self.conn.cursor(*args, **kwargs), self.counters)
+
+    def commit(self):
+        self.conn.commit()
+        self.counters['commits'] += 1
+        self.counters['round_trips'] += 1
+
+    def rollback(self):
+        self.conn.rollback()
+        self.counters['round_trips'] += 1
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+# Progress of one loop, reported at most once per interval with rate and ETA.
+# Callers update it once per chunk of work, not once per row.
+class Progress:
+    def __init__(self, instrumentation, label, total, interval):
+        self.instrumentation = instrumentation
+        self.label = label
+        self.total = total
+        self.interval = interval
+        self.started = time.monotonic()
+        self.next_report = self.started + interval
+        self.done = 0
+
+    def update(self, done):
+        self.done = done
+        now = time.monotonic()
+        if now >= self.next_report:
+            self.next_report = now + self.interval
+            self._report(now, final=False)
+
+    def finish(self):
+        self._report(time.monotonic(), final=True)
+
+    def _report(self, now, final):
+        elapsed = now - self.started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        eta = (self.total - self.done) / rate if self.total and rate > 0 else None
+        self.instrumentation.progress_event(self.label, self.done, self.total, rate, eta, final)
+
+# Stand-in for Progress when instrumentation is off
+class NullProgress:
+    def update(self, done):
+        pass
+
+    def finish(self):
+        pass
+
+NULL_PROGRESS = NullProgress()
+
+# Instrumentation for the loader: log messages, timed spans per phase with counter
+# deltas, and rate-limited progress. Output is human-readable text or one JSON event
+# per line ('json') for the Node wrapper. With 'off' only log messages are printed,
+# and nothing is wrapped or timed, so the hot loops run exactly as uninstrumented.
+class Instrumentation:
+    def __init__(self, mode='text', progress_interval=1.0, stream=None):
+        self.mode = mode
+        self.enabled = mode != 'off'
+        self.progress_interval = progress_interval
+        self.stream = stream or sys.stdout
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.spans = []
+        # Length of the text progress line left open by the last report, 0 when none is
+        self.progress_width = 0
+
+    def emit(self, event, **fields):
+        record = {'event': event, 'time': datetime.datetime.now().isoformat(timespec='milliseconds')}
+        record.update(fields)
+        self.stream.write(json.dumps(record, default=str) + '\n')
+        self.stream.flush()
+
+    def log(self, message):
+        if self.mode == 'json':
+            self.emit('log', message=str(message))
+            return
+        # A message logged while a progress line is open starts on a line of its own
+        if self.progress_width:
+            self.stream.write('\n')
+            self.progress_width = 0
+        print(message, file=self.stream)
+
+    # Wraps a connection so its statements, round trips and commits are counted
+    def connection(self, conn):
+        return InstrumentedConnection(conn, self.counters) if self.enabled else conn
+
+    def count(self, counter, amount=1):
+        if self.enabled:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    @contextlib.contextmanager
+    def span(self, name):
+        if not self.enabled:
+            yield
+            return
+        before = dict(self.counters)
+        started = time.perf_counter()
+        if self.mode == 'json':
+            self.emit('span_start', span=name)
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            deltas = {counter: value - before.get(counter, 0) for counter, value in self.counters.items()}
+            self.spans.append((name, seconds, deltas))
+            if self.mode == 'json':
+                self.emit('span_end', span=name, seconds=round(seconds, 4), **deltas)
+            else:
+                rate = deltas['rows'] / seconds if seconds > 0 else 0
+                self.log(f"[{name}] {seconds:.2f}s, {deltas['rows']} rows ({rate:,.0f} rows/sec), "
+                         f"{deltas['statements']} statements, {deltas['round_trips']} round trips, "
+                         f"{deltas['commits']} commits")
+
+    def progress(self, label, total=None):
+        if not self.enabled or self.progress_interval <= 0:
+            return NULL_PROGRESS
+        return Progress(self, label, total, self.progress_interval)
+
+    def progress_event(self, label, done, total, rate, eta, final):
+        if self.mode == 'json':
+            self.emit('progress', label=label, done=done, total=total, rate=round(rate, 1),
+                      eta_seconds=round(eta, 1) if eta is not None else None, final=final)
+            return
+        line = f"{label}: {done:,}" + (f"/{total:,}" if total else '') + f" ({rate:,.0f}/sec"
+        if eta is not None and not final:
+            line += f", ETA {datetime.timedelta(seconds=round(eta))}"
+        line += ')'
+        # Each report overwrites the last, padded so no characters of a longer one are left
+        self.stream.write('\r' + line.ljust(self.progress_width) + ('\n' if final else ''))
+        self.stream.flush()
+        self.progress_width = 0 if final else len(line)
+
+    # Summary of all spans, for the end of the run
+    def summary(self):
+        if not self.enabled:
+            return
+        if self.mode == 'json':
+            self.emit('summary', spans=[dict(span=name, seconds=round(seconds, 4), **deltas)
+                                        for name, seconds, deltas in self.spans], **self.counters)
+            return
+        self.log(f"Totals: {self.counters['rows']} rows, {self.counters['statements']} statements, "
+                 f"{self.counters['round_trips']} round trips, {self.counters['commits']} commits")
@@ -0,0 +1,258 @@
+import collections
+import time
+
+from seeding.checkpoints import SEED_CHECKPOINTS_TABLE
+from seeding.emails import deduplicate_emails_statement
+from seeding.rollups import CUSTOMER_STATS_TABLE, ROLLUP_TABLES, WIDEN_WATERMARKS
+from seeding.schema import EMAIL_INDEXES, plan_indexes, plan_order_columns
+
+# A numbered schema change. Steps are SQL statements, or functions of a cursor that
+# return the statements still needed, so a step can skip work that is already done.
+# index_only marks migrations that only add indexes, which a bulk load may defer.
+Migration = collections.namedtuple('Migration', ('version', 'name', 'steps', 'index_only'))
+
+# Applied migrations, one row per version
+SCHEMA_VERSION_TABLE = '''
+    CREATE TABLE IF NOT EXISTS SchemaVersion (
+        Version INT PRIMARY KEY,
+        Name VARCHAR(255) NOT NULL,
+        AppliedAt DATETIME NOT NULL,
+        Seconds DECIMAL(10, 3) NOT NULL
+    )
+'''
+
+# Tables of the original schema, exactly as 0-Create-Database.py created them before the
+# migrations were added, in foreign-key order
+INITIAL_TABLES = [
+    ('Customers', '''
+        CREATE TABLE IF NOT EXISTS Customers (
+            CustomerID BIGINT AUTO_INCREMENT PRIMARY KEY,
+            Name VARCHAR(255),
+            Email VARCHAR(255),
+            Address TEXT,
+            Phone VARCHAR(20),
+            Password VARCHAR(255)
+        )
+    '''),
+    # Users, for Admins
+    ('Users', '''
+        CREATE TABLE IF NOT EXISTS Users (
+            UserID BIGINT AUTO_INCREMENT PRIMARY KEY,
+            Name VARCHAR(255),
+            Email VARCHAR(255),
+            Role ENUM('admin') DEFAULT 'admin',
+            Password VARCHAR(255)
+        ) AUTO_INCREMENT=1000000
+    '''),
+    ('Products', '''
+        CREATE TABLE IF NOT EXISTS Products (
+            ProductID INT AUTO_INCREMENT PRIMARY KEY,
+            Name VARCHAR(255),
+            Cost DECIMAL(10, 2),
+            Price DECIMAL(10, 2),
+            DynamicPrice DECIMAL(10, 2) DEFAULT NULL,
+            Category VARCHAR(100),
+            LastUpdated DATETIME DEFAULT CURRENT_TIMESTAMP,
+            Ranking INT DEFAULT 9999,
+            LowStock BOOLEAN DEFAULT FALSE
+        )
+    '''),
+    ('Orders', '''
+        CREATE TABLE IF NOT EXISTS Orders (
+            OrderID INT AUTO_INCREMENT PRIMARY KEY,
+            CustomerID BIGINT,
+            OrderDate DATETIME,
+            OrderStatus VARCHAR(50) DEFAULT 'Delivered',
+            FOREIGN KEY (CustomerID) REFERENCES Customers(CustomerID)
+        )
+    '''),
+    # OrderDetails, for processed cart items
+    ('OrderDetails', '''
+        CREATE TABLE IF NOT EXISTS OrderDetails (
+            OrderDetailID INT AUTO_INCREMENT PRIMARY KEY,
+            OrderID INT,
+            ProductID INT,
+            Quantity INT,
+            TotalPrice DECIMAL(10, 2),
+            FOREIGN KEY (OrderID) REFERENCES Orders(OrderID),
+            FOREIGN KEY (ProductID) REFERENCES Products(ProductID)
+        )
+    '''),
+    ('PaymentDetails', '''
+        CREATE TABLE IF NOT EXISTS PaymentDetails (
+            PaymentID INT AUTO_INCREMENT PRIMARY KEY,
+            OrderID INT,
+            PaymentAmount DECIMAL(10, 2),
+            PaymentDate DATETIME,
+            PaymentMethod VARCHAR(50),
+            PaymentStatus ENUM('Pending', 'Completed', 'Failed') DEFAULT 'Pending',
+            FOREIGN KEY (OrderID) REFERENCES Orders(OrderID)
+        )
+    '''),
+    ('PopularProducts', '''
+        CREATE TABLE IF NOT EXISTS PopularProducts (
+            ProductID INT PRIMARY KEY,
+            PopularityScore DECIMAL(10, 2),
+            FOREIGN KEY (ProductID) REFERENCES Products(ProductID)
+        )
+    '''),
+    ('DynamicPricing', '''
+        CREATE TABLE IF NOT EXISTS DynamicPricing (
+            ProductID INT PRIMARY KEY,
+            CurrentPrice DECIMAL(10, 2),
+            LastUpdated DATETIME,
+            FOREIGN KEY (ProductID) REFERENCES Products(ProductID)
+        )
+    '''),
+    ('OrderPatterns', '''
+        CREATE TABLE IF NOT EXISTS OrderPatterns (
+            ProductID INT,
+            OrderHour INT,
+            OrderCount INT,
+            PRIMARY KEY (ProductID, OrderHour),
+            FOREIGN KEY (ProductID) REFERENCES Products(ProductID)
+        )
+    '''),
+    ('ProductOrders', '''
+        CREATE TABLE IF NOT EXISTS ProductOrders (
+            ProductOrderID INT AUTO_INCREMENT PRIMARY KEY,
+            ProductID INT,
+            OrderHour INT,
+            OrderDayOfWeek INT,
+            Season VARCHAR(50),
+            OrderCount INT,
+            FOREIGN KEY (ProductID) REFERENCES Products(ProductID)
+        )
+    '''),
+    ('InventoryStatus', '''
+        CREATE TABLE IF NOT EXISTS InventoryStatus (
+            ProductID INT PRIMARY KEY,
+            StockLevel INT,
+            LastUpdated DATETIME,
+            FOREIGN KEY (ProductID) REFERENCES Products(ProductID)
+        )
+    '''),
+    ('Promotions', '''
+        CREATE TABLE IF NOT EXISTS Promotions (
+            PromotionID INT AUTO_INCREMENT PRIMARY KEY,
+            ProductID INT,
+            StartDate DATE,
+            EndDate DATE,
+            DiscountPercentage DECIMAL(5, 2),
+            FOREIGN KEY (ProductID) REFERENCES Products(ProductID)
+        )
+    '''),
+    ('ShoppingSession', '''
+        CREATE TABLE IF NOT EXISTS ShoppingSession (
+            SessionID BIGINT AUTO_INCREMENT PRIMARY KEY,
+            UserID BIGINT UNIQUE,
+            Total DECIMAL(10, 2) NOT NULL DEFAULT '0.00',
+            CreatedAt TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            ModifiedAt TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            FOREIGN KEY (UserID) REFERENCES Customers(CustomerID)
+        )
+    '''),
+    ('CartItem', '''
+        CREATE TABLE IF NOT EXISTS CartItem (
+            CartItemID INT AUTO_INCREMENT PRIMARY KEY,
+            SessionID BIGINT,
+            ProductID INT,
+            Quantity INT NOT NULL,
+            DateAdded TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (SessionID) REFERENCES ShoppingSession(SessionID),
+            FOREIGN KEY (ProductID) REFERENCES Products(ProductID)
+        )
+    '''),
+]
+
+# Function to plan the tables of the original schema that do not exist yet. A database
+# created before the migrations has all of them and no SchemaVersion table, so for it
+# nothing is run and migration 1 is only recorded as applied; the later migrations then
+# bring its tables up to date.
+def plan_initial_schema(cursor):
+    cursor.execute('SELECT TABLE_NAME FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE()')
+    present = {row[0].lower() for row in cursor.fetchall()}
+    return [ddl for table, ddl in INITIAL_TABLES if table.lower() not in present]
+
+# Function to plan the hot-path secondary indexes that do not exist yet
+def plan_hot_path_indexes(cursor):
+    return [statement for _, _, statement in plan_indexes(cursor)]
+
+# Key of each table given a unique email index; the lowest key keeps a repeated email
+EMAIL_ID_COLUMNS = {'Customers': 'CustomerID', 'Users': 'UserID'}
+
+# Function to plan the unique email indexes that do not exist yet. Emails stored before
+# them may repeat, so each table's repeated emails are tagged first (the rows keep their
+# passwords, but the credential file of an earlier seed lists the old emails).
+def plan_email_indexes(cursor):
+    planned = plan_indexes(cursor, EMAIL_INDEXES, unique=True)
+    return ([deduplicate_emails_statement(table, EMAIL_ID_COLUMNS[table]) for table, _, _ in planned]
+            + [statement for _, _, statement in planned])
+
+# Every schema change in order, starting from the original schema. Applied migrations
+# must never be edited: a change to the schema, even to a table of migration 1, is a new
+# migration appended here.
+MIGRATIONS = [
+    Migration(1, 'Initial schema', [plan_initial_schema], False),
+    Migration(2, 'Generated order columns', [plan_order_columns], False),
+    Migration(3, 'Rollup tables', list(ROLLUP_TABLES.values()), False),
+    Migration(4, 'Hot-path secondary indexes', [plan_hot_path_indexes], True),
+    Migration(5, 'Unique email indexes', [plan_email_indexes], False),
+    Migration(6, 'BIGINT rollup watermarks', [WIDEN_WATERMARKS], False),
+    Migration(7, 'Customer statistics', [CUSTOMER_STATS_TABLE], False),
+    Migration(8, 'Seed checkpoints', [SEED_CHECKPOINTS_TABLE], False),
+]
+
+# Function to read the versions already applied to the current database
+def applied_versions(cursor):
+    cursor.execute('''
+        SELECT COUNT(*) FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'SchemaVersion'
+    ''')
+    if not cursor.fetchone()[0]:
+        return set()
+    cursor.execute('SELECT Version FROM SchemaVersion')
+    return {row[0] for row in cursor.fetchall()}
+
+# Function to list the migrations that are not applied yet, up to the target version
+def pending_migrations(applied, target=None, defer_indexes=False):
+    return [
+        migration for migration in MIGRATIONS
+        if migration.version not in applied
+        and (target is None or migration.version <= target)
+        and not (defer_indexes and migration.index_only)
+    ]
+
+# Function to resolve a migration's steps into the SQL statements to run now
+def migration_statements(cursor, migration):
+    statements = []
+    for step in migration.steps:
+        if callable(step):
+            statements.extend(step(cursor))
+        else:
+            statements.append(step)
+    return statements
+
+# Function to apply the pending migrations in order. MySQL commits DDL implicitly, and
+# each migration's SchemaVersion row is committed as soon as its statements have run; its
+# steps are written to be safe to re-run, so a migration interrupted midway is simply
+# applied again. With dry_run nothing is executed and the statements are only reported.
+# Returns [(migration, statements, seconds)].
+def apply_migrations(conn, cursor, applied, target=None, defer_indexes=False, dry_run=False):
+    results = []
+    pending = pending_migrations(applied, target, defer_indexes)
+    if pending and not dry_run:
+        cursor.execute(SCHEMA_VERSION_TABLE)
+    for migration in pending:
+        started = time.perf_counter()
+        statements = migration_statements(cursor, migration)
+        if not dry_run:
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute('''
+                INSERT INTO SchemaVersion (Version, Name, AppliedAt, Seconds)
+                VALUES (%s, %s, NOW(), %s)
+            ''', (migration.version, migration.name, time.perf_counter() - started))
+            conn.commit()
+        results.append((migration, statements, time.perf_counter() - started))
+    return results
@@ -0,0 +1,301 @@
+import collections
+import datetime
+import random
+
+from seeding.rollups import (CUSTOMER_STATS_COLUMNS, CUSTOMER_STATS_UPSERT, DAILY_PRODUCT_SALES_COLUMNS,
+                             DAILY_PRODUCT_SALES_UPSERT)
+
+# First day covered by generated order history
+START_DATE = datetime.date(2020, 1, 1)
+
+# Orders per customer: uniform between minimum and maximum; a customer who draws the
+# maximum moves to a heavy tail of up to tail_maximum orders with tail_probability
+OrderCountDistribution = collections.namedtuple(
+    'OrderCountDistribution', ('minimum', 'maximum', 'tail_probability', 'tail_maximum'))
+
+DEFAULT_ORDER_COUNTS = OrderCountDistribution(1, 10, 0.1, 30)
+
+# Everything order generation depends on besides the customer ID. It is passed to
+# shard and worker processes as-is, so every process generates the same orders.
+# generator is 'python' (this module) or 'numpy' (seeding.vectorized); the two draw
+# from different random streams, so a seed gives different orders with each.
+OrderSettings = collections.namedtuple('OrderSettings', ('seed', 'start_date', 'now', 'order_counts', 'generator'),
+                                       defaults=('python',))
+
+# Order generators selectable with --generator
+ORDER_GENERATORS = ('python', 'numpy')
+
+# Every order is paid once. Payment methods and statuses are drawn with these weights,
+# and the payment follows the order by up to MAX_PAYMENT_DELAY seconds, never after now.
+PAYMENT_METHODS = ('Credit Card', 'Debit Card', 'PayPal', 'Cash')
+PAYMENT_METHOD_WEIGHTS = (55, 25, 12, 8)
+PAYMENT_STATUSES = ('Completed', 'Failed', 'Pending')
+PAYMENT_STATUS_WEIGHTS = (93, 5, 2)
+MAX_PAYMENT_DELAY = 300
+
+# Function to parse an --orders-per-customer value: MIN-MAX[:TAIL_PROBABILITY:TAIL_MAX]
+def parse_order_counts(value):
+    span, _, tail = value.partition(':')
+    minimum, _, maximum = span.partition('-')
+    minimum = int(minimum)
+    maximum = int(maximum or minimum)
+    tail_probability, tail_maximum = 0.0, maximum
+    if tail:
+        tail_probability, _, tail_maximum = tail.partition(':')
+        tail_probability = float(tail_probability)
+        tail_maximum = int(tail_maximum or maximum)
+    if not 0 <= minimum <= maximum <= tail_maximum or not 0 <= tail_probability <= 1:
+        raise ValueError(f"invalid orders-per-customer distribution: {value}")
+    return OrderCountDistribution(minimum, maximum, tail_probability, tail_maximum)
+
+# Function to determine the number of orders for the customer
+def generate_order_count(rng, distribution=DEFAULT_ORDER_COUNTS):
+    base_order_count = rng.randint(distribution.minimum, distribution.maximum)
+    if base_order_count == distribution.maximum:
+        if rng.random() < distribution.tail_probability:
+            return rng.randint(distribution.maximum, distribution.tail_maximum)
+    return base_order_count
+
+# Basket sizes of every order a customer places. They come from their own random
+# stream so order and detail counts can be planned without generating the orders.
+def order_shape(settings, customer_id):
+    rng = random.Random(f"{settings.seed}:shape:{customer_id}")
+    return [rng.randint(3, 7) for _ in range(generate_order_count(rng, settings.order_counts))]
+
+# Total orders and order lines for a range of customer IDs
+def count_orders(settings, first_customer_id, last_customer_id):
+    if settings.generator == 'numpy':
+        return vectorized.count_orders(settings, first_customer_id, last_customer_id)
+    orders = 0
+    lines = 0
+    for customer_id in range(first_customer_id, last_customer_id + 1):
+        shape = order_shape(settings, customer_id)
+        orders += len(shape)
+        lines += sum(shape)
+    return orders, lines
+
+# Function to pick a random order time between start_date and now, never in the future
+def random_order_datetime(rng, start_date, now):
+    order_date = start_date + datetime.timedelta(days=rng.randint(0, (now.date() - start_date).days))
+    if order_date == now.date():
+        random_hour = rng.randint(0, now.hour)
+        random_minute = rng.randint(0, now.minute) if random_hour == now.hour else rng.randint(0, 59)
+        random_second = rng.randint(0, now.second) if random_minute == now.minute else rng.randint(0, 59)
+    else:
+        random_hour = rng.randint(0, 23)
+        random_minute = rng.randint(0, 59)
+        random_second = rng.randint(0, 59)
+    return datetime.datetime.combine(order_date, datetime.time(random_hour, random_minute, random_second))
+
+# Orders of one customer as (order datetime, [(product ID, quantity), ...]).
+# Everything is derived from (seed, customer ID), so the result does not depend
+# on which process or shard generates the customer.
+def customer_orders(settings, customer_id, product_ids):
+    rng = random.Random(f"{settings.seed}:orders:{customer_id}")
+    for basket_size in order_shape(settings, customer_id):
+        order_datetime = random_order_datetime(rng, settings.start_date, settings.now)
+        lines = [(rng.choice(product_ids), rng.randint(1, 5)) for _ in range(basket_size)]
+        yield order_datetime, lines
+
+# Season of a month, as stored in Orders.OrderSeason and ProductOrders.Season
+SEASONS = {12: 'Winter', 1: 'Winter', 2: 'Winter', 3: 'Spring', 4: 'Spring', 5: 'Spring',
+           6: 'Summer', 7: 'Summer', 8: 'Summer', 9: 'Autumn', 10: 'Autumn', 11: 'Autumn'}
+
+# Calendar slot of an order as (date, hour, day of week, season). The day of week
+# counts from Sunday = 0, like MySQL's DAYOFWEEK(OrderDate) - 1.
+def order_slot(order_datetime):
+    return (order_datetime.date(), order_datetime.hour, (order_datetime.weekday() + 1) % 7,
+            SEASONS[order_datetime.month])
+
+# Function to add counters from one dict of per-key lists into another
+def merge_counters(target, source):
+    for key, values in source.items():
+        totals = target.get(key)
+        if totals is None:
+            target[key] = list(values)
+        else:
+            for i, value in enumerate(values):
+                totals[i] += value
+
+# Derived-table values aggregated while orders are generated: PopularProducts,
+# DynamicPricing, ProductOrders, OrderPatterns and the DailyProductSales rollup
+class OrderAggregates:
+    def __init__(self):
+        self.popularity_scores = {}
+        # ProductID -> (OrderDetailID, TotalPrice) of the product's latest order line
+        self.current_prices = {}
+        # (date, ProductID) -> [quantity, revenue, cost]
+        self.daily_sales = {}
+        # (ProductID, hour, day of week, season) -> [quantity]
+        self.product_orders = {}
+        self.last_order_id = 0
+
+    def add_line(self, order_id, order_detail_id, slot, product_id, quantity, total_price, line_cost):
+        order_date, hour, day_of_week, season = slot
+        self.popularity_scores[product_id] = self.popularity_scores.get(product_id, 0) + quantity
+        self.current_prices[product_id] = (order_detail_id, total_price)
+        sales = self.daily_sales.get((order_date, product_id))
+        if sales is None:
+            self.daily_sales[(order_date, product_id)] = [quantity, total_price, line_cost]
+        else:
+            sales[0] += quantity
+            sales[1] += total_price
+            sales[2] += line_cost
+        counts = self.product_orders.get((product_id, hour, day_of_week, season))
+        if counts is None:
+            self.product_orders[(product_id, hour, day_of_week, season)] = [quantity]
+        else:
+            counts[0] += quantity
+        if order_id > self.last_order_id:
+            self.last_order_id = order_id
+
+    def merge(self, other):
+        for product_id, score in other.popularity_scores.items():
+            self.popularity_scores[product_id] = self.popularity_scores.get(product_id, 0) + score
+        for product_id, latest in other.current_prices.items():
+            if product_id not in self.current_prices or latest[0] > self.current_prices[product_id][0]:
+                self.current_prices[product_id] = latest
+        merge_counters(self.daily_sales, other.daily_sales)
+        merge_counters(self.product_orders, other.product_orders)
+        self.last_order_id = max(self.last_order_id, other.last_order_id)
+
+    # include_derived selects PopularProducts, DynamicPricing, ProductOrders and OrderPatterns
+    def register(self, writer, include_daily_sales=True, include_derived=True):
+        if include_daily_sales:
+            writer.register('DailyProductSales', DAILY_PRODUCT_SALES_COLUMNS, DAILY_PRODUCT_SALES_UPSERT)
+        if not include_derived:
+            return
+        writer.register('PopularProducts', ('ProductID', 'PopularityScore'),
+                        'ON DUPLICATE KEY UPDATE PopularityScore = PopularityScore + VALUES(PopularityScore)')
+        writer.register('DynamicPricing', ('ProductID', 'CurrentPrice', 'LastUpdated'),
+                        'ON DUPLICATE KEY UPDATE CurrentPrice = VALUES(CurrentPrice), LastUpdated = VALUES(LastUpdated)')
+        # Rows carry their ProductOrderID, so existing slots are updated in place with their new totals
+        writer.register('ProductOrders', ('ProductOrderID', 'ProductID', 'OrderHour', 'OrderDayOfWeek', 'Season', 'OrderCount'),
+                        'ON DUPLICATE KEY UPDATE OrderCount = VALUES(OrderCount)')
+        # Replaces the peak hours of the products written; the caller deletes their previous rows first
+        writer.register('OrderPatterns', ('ProductID', 'OrderHour', 'OrderCount'),
+                        'ON DUPLICATE KEY UPDATE OrderCount = VALUES(OrderCount)')
+
+    # Busiest hours of the products ordered, as {ProductID: (quantity, [hours])}, over these
+    # orders plus the existing ProductOrders rows of those products. Ties keep every peak hour.
+    def peak_hours(self, existing_product_orders=None):
+        hourly = {}
+        for (product_id, hour, _, _), (quantity,) in self.product_orders.items():
+            hourly[(product_id, hour)] = hourly.get((product_id, hour), 0) + quantity
+        for (product_id, hour, _, _), (_, quantity) in (existing_product_orders or {}).items():
+            if product_id in self.popularity_scores:
+                hourly[(product_id, hour)] = hourly.get((product_id, hour), 0) + quantity
+        peaks = {}
+        for (product_id, hour), quantity in sorted(hourly.items()):
+            peak = peaks.get(product_id)
+            if peak is None or quantity > peak[0]:
+                peaks[product_id] = (quantity, [hour])
+            elif quantity == peak[0]:
+                peak[1].append(hour)
+        return peaks
+
+    # Writes the aggregated rows. existing_product_orders holds the ProductOrders rows already
+    # in the database (see load_product_orders), which these orders are added to.
+    def write(self, writer, last_updated, include_daily_sales=True, existing_product_orders=None,
+              include_derived=True):
+        if include_daily_sales:
+            for (sales_date, product_id), (quantity, revenue, cost) in sorted(self.daily_sales.items()):
+                writer.add('DailyProductSales', (sales_date, product_id, quantity, revenue, cost))
+        if not include_derived:
+            return
+        existing_product_orders = existing_product_orders or {}
+        for product_id, score in self.popularity_scores.items():
+            writer.add('PopularProducts', (product_id, score))
+        for product_id, (_, current_price) in self.current_prices.items():
+            writer.add('DynamicPricing', (product_id, current_price, last_updated))
+        next_product_order_id = max((row[0] for row in existing_product_orders.values()), default=0) + 1
+        for key, (quantity,) in sorted(self.product_orders.items()):
+            product_order_id, previous_quantity = existing_product_orders.get(key, (None, 0))
+            if product_order_id is None:
+                product_order_id = next_product_order_id
+                next_product_order_id += 1
+            writer.add('ProductOrders', (product_order_id,) + key + (previous_quantity + quantity,))
+        for product_id, (quantity, hours) in sorted(self.peak_hours(existing_product_orders).items()):
+            for hour in hours:
+                writer.add('OrderPatterns', (product_id, hour, quantity))
+
+# Function to read the existing ProductOrders rows as
+# {(ProductID, hour, day of week, season): (ProductOrderID, OrderCount)}.
+# The table has at most one row per product and time slot, so this stays small.
+def load_product_orders(cursor):
+    cursor.execute('SELECT ProductOrderID, ProductID, OrderHour, OrderDayOfWeek, Season, OrderCount FROM ProductOrders')
+    return {(product_id, hour, day_of_week, season): (product_order_id, order_count)
+            for product_order_id, product_id, hour, day_of_week, season, order_count in cursor.fetchall()}
+
+# Function to register the Orders, OrderDetails and PaymentDetails tables on a writer. With
+# dated_details order lines also carry their order's OrderDate, as the partitioned layout requires.
+# A payment has its order's ID as PaymentID, so shards need no separate numbering for them.
+# With customer_stats the statistics of each customer's new orders are merged into CustomerStats.
+def register_order_tables(writer, dated_details=False, customer_stats=False):
+    writer.register('Orders', ('OrderID', 'CustomerID', 'OrderDate'))
+    writer.register('OrderDetails', ('OrderDetailID', 'OrderID', 'ProductID', 'Quantity', 'TotalPrice')
+                    + (('OrderDate',) if dated_details else ()))
+    writer.register('PaymentDetails', ('PaymentID', 'OrderID', 'PaymentAmount', 'PaymentDate', 'PaymentMethod',
+                                       'PaymentStatus'))
+    if customer_stats:
+        writer.register('CustomerStats', CUSTOMER_STATS_COLUMNS, CUSTOMER_STATS_UPSERT)
+
+# Payment of each order of a customer as (method, status, delay in seconds), drawn from
+# its own stream, so the orders of a seed do not depend on them
+def customer_payments(settings, customer_id):
+    rng = random.Random(f"{settings.seed}:payments:{customer_id}")
+    while True:
+        yield (rng.choices(PAYMENT_METHODS, PAYMENT_METHOD_WEIGHTS)[0],
+               rng.choices(PAYMENT_STATUSES, PAYMENT_STATUS_WEIGHTS)[0], rng.randint(0, MAX_PAYMENT_DELAY))
+
+# Function to generate and write the orders of the given customers, numbering
+# orders and order lines from the given IDs. `products` maps ProductID to
+# (Price, Cost). CustomerStats rows are written too if the writer has the table.
+# The writer is given a checkpoint after each customer, positioned at its CustomerID.
+# Returns (orders, order lines) written.
+def write_orders(writer, customer_ids, settings, products, first_order_id, first_order_detail_id,
+                 aggregates, progress=None):
+    if settings.generator == 'numpy':
+        return vectorized.write_orders(writer, customer_ids, settings, products, first_order_id,
+                                       first_order_detail_id, aggregates, progress)
+    product_ids = list(products)
+    dated_details = 'OrderDate' in writer.columns['OrderDetails']
+    customer_stats = 'CustomerStats' in writer.columns
+    order_id = first_order_id
+    order_detail_id = first_order_detail_id
+    for i, customer_id in enumerate(customer_ids):
+        payments = customer_payments(settings, customer_id)
+        customer_first_order_id = order_id
+        spend = 0
+        first_order_date = last_order_date = None
+        for order_datetime, lines in customer_orders(settings, customer_id, product_ids):
+            writer.add('Orders', (order_id, customer_id, order_datetime))
+            slot = order_slot(order_datetime)
+            order_total = 0
+            for product_id, quantity in lines:
+                price, cost = products[product_id]
+                total_price = round(quantity * price, 2)
+                if dated_details:
+                    writer.add('OrderDetails', (order_detail_id, order_id, product_id, quantity, total_price, order_datetime))
+                else:
+                    writer.add('OrderDetails', (order_detail_id, order_id, product_id, quantity, total_price))
+                aggregates.add_line(order_id, order_detail_id, slot, product_id, quantity, total_price, quantity * cost)
+                order_total += total_price
+                order_detail_id += 1
+            method, status, delay = next(payments)
+            payment_date = min(order_datetime + datetime.timedelta(seconds=delay), settings.now)
+            writer.add('PaymentDetails', (order_id, order_id, order_total, payment_date, method, status))
+            spend += order_total
+            first_order_date = min(first_order_date or order_datetime, order_datetime)
+            last_order_date = max(last_order_date or order_datetime, order_datetime)
+            order_id += 1
+        if customer_stats and order_id > customer_first_order_id:
+            writer.add('CustomerStats', (customer_id, order_id - customer_first_order_id, spend, first_order_date,
+                                         last_order_date))
+        writer.checkpoint(customer_id)
+        if progress:
+            progress(i + 1, order_id - first_order_id)
+    return order_id - first_order_id, order_detail_id - first_order_detail_id
+
+# Imported last because the NumPy generator builds on the definitions above
+from seeding import vectorized  # noqa: E402
@@ -0,0 +1,134 @@
+import datetime
+
+# Order tables that can be range-partitioned, with the date column each one is split on.
+# OrderDetails carries a copy of its order's OrderDate so it can be partitioned like Orders.
+PARTITIONED_TABLES = {
+    'Orders': ('OrderID', 'OrderDate'),
+    'OrderDetails': ('OrderDetailID', 'OrderDate'),
+    'PaymentDetails': ('PaymentID', 'PaymentDate'),
+}
+
+# Partition names are p<YYYY> or p<YYYYMM>, followed by a catch-all pmax partition
+PARTITION_NAME_FORMATS = {'year': 'p%Y', 'month': 'p%Y%m'}
+
+# Function to return the first day of the period after the one containing day
+def next_period(day, granularity):
+    if granularity == 'year':
+        return datetime.date(day.year + 1, 1, 1)
+    return datetime.date(day.year + (day.month == 12), day.month % 12 + 1, 1)
+
+# Function to return the first day of the period `periods` periods after the one containing day
+def periods_ahead(day, granularity, periods):
+    for _ in range(periods):
+        day = next_period(day, granularity)
+    return day
+
+# Function to list the partitions covering first_day..last_day as [(name, exclusive upper bound)].
+# Earlier dates fall into the first partition and later ones into pmax.
+def partition_bounds(first_day, last_day, granularity):
+    bounds = []
+    day = first_day
+    while day <= last_day:
+        upper = next_period(day, granularity)
+        bounds.append((day.strftime(PARTITION_NAME_FORMATS[granularity]), upper))
+        day = upper
+    return bounds
+
+# Function to format partition definitions for PARTITION BY / REORGANIZE PARTITION
+def partition_definitions(bounds):
+    definitions = [f"PARTITION {name} VALUES LESS THAN ('{upper.isoformat()}')" for name, upper in bounds]
+    definitions.append("PARTITION pmax VALUES LESS THAN (MAXVALUE)")
+    return ', '.join(definitions)
+
+# Function to read the range partitions of the order tables as {table: [(name, upper bound)]},
+# with pmax left out. Tables that are not partitioned are missing from the result.
+def existing_partitions(cursor):
+    cursor.execute(f'''
+        SELECT TABLE_NAME, PARTITION_NAME, PARTITION_DESCRIPTION
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND PARTITION_NAME IS NOT NULL
+        AND TABLE_NAME IN ({', '.join(['%s'] * len(PARTITIONED_TABLES))})
+        ORDER BY TABLE_NAME, PARTITION_ORDINAL_POSITION
+    ''', tuple(PARTITIONED_TABLES))
+    partitions = {}
+    for table, name, description in cursor.fetchall():
+        partitions.setdefault(table, [])
+        if name != 'pmax':
+            partitions[table].append((name, datetime.date.fromisoformat(description.strip("'")[:10])))
+    return partitions
+
+# Function to tell the granularity of existing partitions from their names
+def partition_granularity(partitions):
+    return 'year' if partitions and len(partitions[0][0]) == len('p2020') else 'month'
+
+# Function to tell whether OrderDetails carries the OrderDate column of the partitioned layout
+def order_details_dated(cursor):
+    cursor.execute('''
+        SELECT COUNT(*) FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'OrderDetails' AND COLUMN_NAME = 'OrderDate'
+    ''')
+    return bool(cursor.fetchone()[0])
+
+# Function to read the foreign keys declared on or referencing the order tables as [(table, name)].
+# Partitioned InnoDB tables can neither have nor be the target of foreign keys.
+def order_table_foreign_keys(cursor):
+    placeholders = ', '.join(['%s'] * len(PARTITIONED_TABLES))
+    cursor.execute(f'''
+        SELECT TABLE_NAME, CONSTRAINT_NAME
+        FROM information_schema.REFERENTIAL_CONSTRAINTS
+        WHERE CONSTRAINT_SCHEMA = DATABASE()
+        AND (TABLE_NAME IN ({placeholders}) OR REFERENCED_TABLE_NAME IN ({placeholders}))
+        ORDER BY TABLE_NAME, CONSTRAINT_NAME
+    ''', tuple(PARTITIONED_TABLES) * 2)
+    return cursor.fetchall()
+
+# Function to plan the statements that range-partition the order tables by month or year,
+# with partitions from first_day through last_day. Tables already partitioned are left as
+# they are. The primary keys are extended with the date column, because every unique key
+# of a partitioned table must contain the partitioning column, and the foreign keys are dropped.
+def plan_partitioning(cursor, granularity, first_day, last_day):
+    partitioned = existing_partitions(cursor)
+    pending = [table for table in PARTITIONED_TABLES if table not in partitioned]
+    if not pending:
+        return []
+
+    statements = []
+    foreign_keys = {}
+    for table, name in order_table_foreign_keys(cursor):
+        foreign_keys.setdefault(table, []).append(name)
+    for table, names in foreign_keys.items():
+        statements.append(f"ALTER TABLE {table} " + ', '.join([f"DROP FOREIGN KEY {name}" for name in names]))
+
+    if 'OrderDetails' in pending and not order_details_dated(cursor):
+        statements.append('ALTER TABLE OrderDetails ADD COLUMN OrderDate DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP')
+        statements.append('''
+            UPDATE OrderDetails od
+            JOIN Orders o ON o.OrderID = od.OrderID
+            SET od.OrderDate = o.OrderDate
+        ''')
+
+    definitions = partition_definitions(partition_bounds(first_day, last_day, granularity))
+    for table in pending:
+        id_column, date_column = PARTITIONED_TABLES[table]
+        statements.append(f'''
+            ALTER TABLE {table}
+            MODIFY {date_column} DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            DROP PRIMARY KEY,
+            ADD PRIMARY KEY ({id_column}, {date_column})
+            PARTITION BY RANGE COLUMNS ({date_column}) ({definitions})
+        ''')
+    return statements
+
+# Function to plan the statements that add partitions ahead of time, so every partitioned
+# order table has partitions for `periods` months or years after today. New partitions are
+# split off pmax, which stays empty as long as this runs before the last partition fills up.
+def plan_future_partitions(cursor, today, periods):
+    statements = []
+    for table, partitions in existing_partitions(cursor).items():
+        if not partitions:
+            continue
+        granularity = partition_granularity(partitions)
+        bounds = partition_bounds(partitions[-1][1], periods_ahead(today, granularity, periods), granularity)
+        if bounds:
+            statements.append(f"ALTER TABLE {table} REORGANIZE PARTITION pmax INTO ({partition_definitions(bounds)})")
+    return statements
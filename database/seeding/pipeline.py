@@ -0,0 +1,136 @@
+import collections
+import queue
+import threading
+import time
+
+# Items queued between two stages; a full queue blocks the stage feeding it
+DEFAULT_QUEUE_SIZE = 8
+
+# Marks the end of a stage's input
+_END = object()
+
+# One stage of a pipeline, run on its own thread. A source stage iterates over its input;
+# any other stage takes items from its bounded input queue and calls function(item) on
+# each, on the stage's thread or, given an executor, on a worker pool with up to `window`
+# calls in flight. Results other than None are put on every downstream stage's queue in
+# input order. Time is split into busy (working, or waiting on the pool), starved
+# (waiting for input) and blocked (waiting for room downstream).
+class Stage:
+    def __init__(self, name, function=None, source=None, executor=None, window=1, queue_size=DEFAULT_QUEUE_SIZE):
+        self.name = name
+        self.function = function
+        self.source = source
+        self.executor = executor
+        self.window = window
+        self.input = queue.Queue(queue_size)
+        self.outputs = []
+        self.items = 0
+        self.busy = 0.0
+        self.starved = 0.0
+        self.blocked = 0.0
+        self.error = None
+        self.cancelled = None
+        self.thread = threading.Thread(target=self._run, name=f"pipeline-{name}", daemon=True)
+
+    def feeds(self, *stages):
+        self.outputs.extend(stages)
+        return self
+
+    def _emit(self, result):
+        if result is None:
+            return
+        started = time.perf_counter()
+        for stage in self.outputs:
+            stage.input.put(result)
+        self.blocked += time.perf_counter() - started
+
+    def _items(self):
+        if self.source is not None:
+            iterator = iter(self.source)
+            while not self.cancelled.is_set():
+                started = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    self.busy += time.perf_counter() - started
+                yield item
+            return
+        while True:
+            started = time.perf_counter()
+            item = self.input.get()
+            self.starved += time.perf_counter() - started
+            if item is _END:
+                return
+            yield item
+
+    def _call(self, item):
+        started = time.perf_counter()
+        result = self.function(item) if self.function else item
+        self.busy += time.perf_counter() - started
+        return result
+
+    def _collect(self, future):
+        started = time.perf_counter()
+        result = future.result()
+        self.busy += time.perf_counter() - started
+        return result
+
+    def _run(self):
+        in_flight = collections.deque()
+        try:
+            for item in self._items():
+                # After a failure the input is still drained, so upstream stages are never left blocked
+                if self.error is not None or self.cancelled.is_set():
+                    continue
+                self.items += 1
+                if self.executor is None:
+                    self._emit(self._call(item))
+                    continue
+                in_flight.append(self.executor.submit(self.function, item))
+                if len(in_flight) >= self.window:
+                    self._emit(self._collect(in_flight.popleft()))
+            while in_flight and self.error is None and not self.cancelled.is_set():
+                self._emit(self._collect(in_flight.popleft()))
+        except Exception as err:
+            self.error = err
+            self.cancelled.set()
+            for _ in self._items():
+                pass
+        finally:
+            for future in in_flight:
+                future.cancel()
+            for stage in self.outputs:
+                stage.input.put(_END)
+
+# Stage statistics: items handled and the share of the pipeline's wall time spent
+# busy, starved and blocked
+StageStats = collections.namedtuple('StageStats', ('name', 'items', 'busy', 'starved', 'blocked'))
+
+# Function to run the stages until the source is exhausted and every stage has finished.
+# The first error raised by a stage cancels the pipeline and is re-raised here.
+# Returns (wall seconds, [StageStats]).
+def run_pipeline(stages):
+    cancelled = threading.Event()
+    for stage in stages:
+        stage.cancelled = cancelled
+    started = time.perf_counter()
+    for stage in stages:
+        stage.thread.start()
+    for stage in stages:
+        stage.thread.join()
+    seconds = time.perf_counter() - started
+    for stage in stages:
+        if stage.error is not None:
+            raise stage.error
+    wall = seconds if seconds > 0 else 1.0
+    return seconds, [StageStats(stage.name, stage.items, stage.busy / wall, stage.starved / wall, stage.blocked / wall)
+                     for stage in stages]
+
+# Function to format the stage statistics, marking the busiest stage as the bottleneck
+def format_stage_stats(stats):
+    bottleneck = max(stats, key=lambda stage: stage.busy).name if stats else None
+    return [f"Stage {stage.name}: {stage.items} items, busy {stage.busy:.0%}, starved {stage.starved:.0%}, "
+            f"blocked {stage.blocked:.0%}" + (" (bottleneck)" if stage.name == bottleneck else '')
+            for stage in stats]
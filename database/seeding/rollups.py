@@ -0,0 +1,336 @@
+import time
+
+from seeding.schema import missing_order_columns
+
+# Rollup tables maintained by the loader and the refresh job. Their DDL is migration 3;
+# changes to them are later migrations.
+ROLLUP_TABLES = {
+    # Last OrderID folded into each rollup; LastOrderID is widened to BIGINT by a migration
+    'RollupWatermarks': '''
+        CREATE TABLE IF NOT EXISTS RollupWatermarks (
+            RollupName VARCHAR(64) PRIMARY KEY,
+            LastOrderID INT NOT NULL DEFAULT 0,
+            UpdatedAt DATETIME NOT NULL
+        )
+    ''',
+    # Sales per day and product, so dashboards scan days x products instead of order lines
+    'DailyProductSales': '''
+        CREATE TABLE IF NOT EXISTS DailyProductSales (
+            SalesDate DATE,
+            ProductID INT,
+            Quantity INT NOT NULL,
+            Revenue DECIMAL(14, 2) NOT NULL,
+            Cost DECIMAL(14, 2) NOT NULL,
+            PRIMARY KEY (SalesDate, ProductID),
+            KEY idx_dailyproductsales_product (ProductID, SalesDate),
+            FOREIGN KEY (ProductID) REFERENCES Products(ProductID)
+        )
+    ''',
+}
+
+# Order statistics per customer, so customer dashboards and the loyalty insight read one
+# row per customer instead of grouping every order. LoyaltyTier buckets OrderCount the
+# way insightsController.js does and is computed by MySQL whenever the count changes.
+CUSTOMER_STATS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS CustomerStats (
+        CustomerID BIGINT PRIMARY KEY,
+        OrderCount INT NOT NULL,
+        LifetimeSpend DECIMAL(14, 2) NOT NULL,
+        FirstOrderDate DATETIME NOT NULL,
+        LastOrderDate DATETIME NOT NULL,
+        LoyaltyTier VARCHAR(32) AS (
+            CASE
+                WHEN OrderCount = 1 THEN 'New Customer'
+                WHEN OrderCount BETWEEN 2 AND 5 THEN 'Occasional Customer'
+                WHEN OrderCount BETWEEN 6 AND 10 THEN 'Loyal Customer'
+                WHEN OrderCount BETWEEN 11 AND 15 THEN 'Very Loyal Customer'
+                WHEN OrderCount BETWEEN 16 AND 20 THEN 'Elite Customer'
+                WHEN OrderCount > 20 THEN 'Super Elite Customer'
+                ELSE 'Undefined'
+            END
+        ) STORED,
+        KEY idx_customerstats_tier (LoyaltyTier),
+        FOREIGN KEY (CustomerID) REFERENCES Customers(CustomerID)
+    )
+'''
+
+CUSTOMER_STATS_COLUMNS = ('CustomerID', 'OrderCount', 'LifetimeSpend', 'FirstOrderDate', 'LastOrderDate')
+
+# Additive merge, so the statistics of orders folded in later add to the row already present
+CUSTOMER_STATS_UPSERT = '''ON DUPLICATE KEY UPDATE
+    OrderCount = OrderCount + VALUES(OrderCount),
+    LifetimeSpend = LifetimeSpend + VALUES(LifetimeSpend),
+    FirstOrderDate = LEAST(FirstOrderDate, VALUES(FirstOrderDate)),
+    LastOrderDate = GREATEST(LastOrderDate, VALUES(LastOrderDate))'''
+
+DAILY_PRODUCT_SALES_COLUMNS = ('SalesDate', 'ProductID', 'Quantity', 'Revenue', 'Cost')
+
+# Additive merge, so rows folded in later add to the rows already present
+DAILY_PRODUCT_SALES_UPSERT = '''ON DUPLICATE KEY UPDATE
+    Quantity = Quantity + VALUES(Quantity),
+    Revenue = Revenue + VALUES(Revenue),
+    Cost = Cost + VALUES(Cost)'''
+
+# Widens the watermark to BIGINT, so it holds any OrderID the Orders key may grow to
+WIDEN_WATERMARKS = 'ALTER TABLE RollupWatermarks MODIFY LastOrderID BIGINT NOT NULL DEFAULT 0'
+
+# Tables derived from the orders, emptied by a rebuild, and the watermarks they are refreshed by
+DERIVED_TABLES = ('DailyProductSales', 'PopularProducts', 'DynamicPricing', 'ProductOrders', 'OrderPatterns',
+                  'CustomerStats')
+
+# Orders behind the newest one within which a missing OrderID is taken to be an order whose
+# transaction has not committed yet. AUTO_INCREMENT hands out IDs when rows are inserted,
+# not when they commit, so an order may become visible after higher IDs were folded; the
+# refreshes stop before such a gap and fold past it once it is this many orders old (a
+# rolled-back insert leaves a gap that never fills).
+ORDER_ID_SAFETY_LAG = 1000
+
+# Function to create the rollup tables and CustomerStats if they do not exist yet
+def ensure_rollup_tables(cursor):
+    for ddl in list(ROLLUP_TABLES.values()) + [CUSTOMER_STATS_TABLE]:
+        cursor.execute(ddl)
+
+# Function to read the last OrderID folded into a rollup, or default if it has none yet
+def get_watermark(cursor, rollup_name, lock=False, default=0):
+    cursor.execute('SELECT LastOrderID FROM RollupWatermarks WHERE RollupName = %s' + (' FOR UPDATE' if lock else ''),
+                   (rollup_name,))
+    row = cursor.fetchone()
+    return row[0] if row else default
+
+# Function to record the last OrderID folded into a rollup
+def set_watermark(cursor, rollup_name, last_order_id):
+    cursor.execute('''
+        INSERT INTO RollupWatermarks (RollupName, LastOrderID, UpdatedAt)
+        VALUES (%s, %s, NOW())
+        ON DUPLICATE KEY UPDATE LastOrderID = VALUES(LastOrderID), UpdatedAt = VALUES(UpdatedAt)
+    ''', (rollup_name, last_order_id))
+
+# Function to find the orders after the watermark that are safe to fold: those up to the
+# first missing OrderID within lag orders of the newest one, or up to the newest one if
+# no ID is missing there. Returns (last OrderID to fold, orders to fold).
+def committed_orders(cursor, last_order_id, lag=ORDER_ID_SAFETY_LAG):
+    cursor.execute('SELECT COALESCE(MAX(OrderID), 0) FROM Orders')
+    new_last_order_id = max(cursor.fetchone()[0], last_order_id)
+    window_start = max(last_order_id, new_last_order_id - lag)
+    cursor.execute('SELECT OrderID FROM Orders WHERE OrderID > %s ORDER BY OrderID', (window_start,))
+    expected_order_id = window_start + 1
+    for (order_id,) in cursor.fetchall():
+        if order_id != expected_order_id:
+            new_last_order_id = expected_order_id - 1
+            break
+        expected_order_id += 1
+    cursor.execute('SELECT COUNT(*) FROM Orders WHERE OrderID > %s AND OrderID <= %s',
+                   (last_order_id, new_last_order_id))
+    return new_last_order_id, cursor.fetchone()[0]
+
+# Function to fold the orders placed since the watermark into DailyProductSales.
+# Returns (orders folded, rollup rows touched, seconds). The caller commits.
+def refresh_daily_product_sales(cursor, lag=ORDER_ID_SAFETY_LAG):
+    started = time.perf_counter()
+    last_order_id = get_watermark(cursor, 'DailyProductSales', lock=True)
+    new_last_order_id, order_count = committed_orders(cursor, last_order_id, lag)
+    if not order_count:
+        return 0, 0, time.perf_counter() - started
+
+    cursor.execute(f'''
+        INSERT INTO DailyProductSales ({', '.join(DAILY_PRODUCT_SALES_COLUMNS)})
+        SELECT * FROM (
+            SELECT
+                DATE(o.OrderDate) AS NewSalesDate,
+                od.ProductID AS NewProductID,
+                SUM(od.Quantity) AS NewQuantity,
+                SUM(od.TotalPrice) AS NewRevenue,
+                SUM(p.Cost * od.Quantity) AS NewCost
+            FROM Orders o
+            JOIN OrderDetails od ON od.OrderID = o.OrderID
+            JOIN Products p ON p.ProductID = od.ProductID
+            WHERE o.OrderID > %s AND o.OrderID <= %s
+            GROUP BY DATE(o.OrderDate), od.ProductID
+        ) AS NewSales
+        {DAILY_PRODUCT_SALES_UPSERT}
+    ''', (last_order_id, new_last_order_id))
+    # With ON DUPLICATE KEY UPDATE an inserted row counts 1 and an updated row counts 2
+    rows_touched = cursor.rowcount
+    set_watermark(cursor, 'DailyProductSales', new_last_order_id)
+    return order_count, rows_touched, time.perf_counter() - started
+
+# Watermark of the order-derived tables, which are refreshed together
+ORDER_DERIVED_WATERMARK = 'OrderDerivedTables'
+
+# Quantities of the orders being folded per product and time slot, with the latest order
+# line of each slot, aggregated once so the derived tables do not each rescan the order lines
+NEW_ORDER_SLOTS = '''
+    CREATE TEMPORARY TABLE NewOrderSlots (
+        ProductID INT,
+        OrderHour INT,
+        OrderDayOfWeek INT,
+        Season VARCHAR(50),
+        Quantity INT NOT NULL,
+        LastOrderDetailID BIGINT NOT NULL,
+        OrderLines INT NOT NULL,
+        PRIMARY KEY (ProductID, OrderHour, OrderDayOfWeek, Season)
+    )
+'''
+
+# Statements folding NewOrderSlots into each derived table, in order, as (table, statement).
+# They keep the loader's meaning of the tables: PopularProducts and ProductOrders add up the
+# quantities ordered, DynamicPricing holds the total of each product's latest order line,
+# and OrderPatterns holds each product's busiest hours over its ProductOrders totals.
+ORDER_DERIVED_STATEMENTS = [
+    ('PopularProducts', '''
+        INSERT INTO PopularProducts (ProductID, PopularityScore)
+        SELECT * FROM (
+            SELECT ProductID AS NewProductID, SUM(Quantity) AS NewScore FROM NewOrderSlots GROUP BY ProductID
+        ) AS NewScores
+        ON DUPLICATE KEY UPDATE PopularityScore = PopularityScore + VALUES(PopularityScore)
+    '''),
+    ('DynamicPricing', '''
+        INSERT INTO DynamicPricing (ProductID, CurrentPrice, LastUpdated)
+        SELECT * FROM (
+            SELECT od.ProductID AS NewProductID, od.TotalPrice AS NewPrice, %(now)s AS NewLastUpdated
+            FROM (SELECT MAX(LastOrderDetailID) AS OrderDetailID FROM NewOrderSlots GROUP BY ProductID) AS Latest
+            JOIN OrderDetails od ON od.OrderDetailID = Latest.OrderDetailID
+        ) AS NewPrices
+        ON DUPLICATE KEY UPDATE CurrentPrice = VALUES(CurrentPrice), LastUpdated = VALUES(LastUpdated)
+    '''),
+    # ProductOrders has no unique key on the slot: existing slots are updated, new ones inserted
+    ('ProductOrders', '''
+        UPDATE ProductOrders po
+        JOIN NewOrderSlots n ON n.ProductID = po.ProductID AND n.OrderHour = po.OrderHour
+            AND n.OrderDayOfWeek = po.OrderDayOfWeek AND n.Season = po.Season
+        SET po.OrderCount = po.OrderCount + n.Quantity
+    '''),
+    ('ProductOrders', '''
+        INSERT INTO ProductOrders (ProductID, OrderHour, OrderDayOfWeek, Season, OrderCount)
+        SELECT n.ProductID, n.OrderHour, n.OrderDayOfWeek, n.Season, n.Quantity
+        FROM NewOrderSlots n
+        WHERE NOT EXISTS (
+            SELECT 1 FROM ProductOrders po
+            WHERE po.ProductID = n.ProductID AND po.OrderHour = n.OrderHour
+            AND po.OrderDayOfWeek = n.OrderDayOfWeek AND po.Season = n.Season
+        )
+        ORDER BY n.ProductID, n.OrderHour, n.OrderDayOfWeek, n.Season
+    '''),
+    ('OrderPatterns', '''
+        DELETE FROM OrderPatterns WHERE ProductID IN (SELECT ProductID FROM NewOrderSlots)
+    '''),
+    # Ties keep every peak hour
+    ('OrderPatterns', '''
+        INSERT INTO OrderPatterns (ProductID, OrderHour, OrderCount)
+        SELECT ProductID, OrderHour, Quantity FROM (
+            SELECT ProductID, OrderHour, SUM(OrderCount) AS Quantity,
+                   RANK() OVER (PARTITION BY ProductID ORDER BY SUM(OrderCount) DESC) AS HourRank
+            FROM ProductOrders
+            WHERE ProductID IN (SELECT ProductID FROM NewOrderSlots)
+            GROUP BY ProductID, OrderHour
+        ) AS Hours
+        WHERE HourRank = 1
+    '''),
+]
+
+# Function to check that Orders has the generated columns the order-derived refresh
+# groups by, which the 'Generated order columns' migration adds to an existing database
+def require_order_columns(cursor):
+    missing = missing_order_columns(cursor)
+    if missing:
+        raise ValueError(f"Orders lacks the generated columns {', '.join([name for name, _ in missing])}; "
+                         f"apply the schema migrations with 0-Create-Database.py first")
+
+# Function to fold the order lines placed since the watermark into PopularProducts,
+# DynamicPricing, ProductOrders and OrderPatterns, so a refresh costs what was ordered
+# since the last one rather than the whole order history. Without a watermark the
+# additive totals are reset and every order is folded once. LastUpdated is set to now.
+# Returns (orders folded, order lines scanned, {table: rows affected}, seconds, rebuilt).
+# The caller commits.
+def refresh_order_derived_tables(cursor, now, lag=ORDER_ID_SAFETY_LAG):
+    started = time.perf_counter()
+    require_order_columns(cursor)
+    last_order_id = get_watermark(cursor, ORDER_DERIVED_WATERMARK, lock=True, default=None)
+    rebuilt = last_order_id is None
+    last_order_id = last_order_id or 0
+    new_last_order_id, order_count = committed_orders(cursor, last_order_id, lag)
+    rows_affected = {}
+    if rebuilt:
+        cursor.execute('UPDATE PopularProducts SET PopularityScore = 0')
+        rows_affected['PopularProducts'] = cursor.rowcount
+        cursor.execute('UPDATE ProductOrders SET OrderCount = 0')
+        rows_affected['ProductOrders'] = cursor.rowcount
+    if not order_count:
+        if rebuilt:
+            set_watermark(cursor, ORDER_DERIVED_WATERMARK, new_last_order_id)
+        return 0, 0, rows_affected, time.perf_counter() - started, rebuilt
+
+    cursor.execute('DROP TEMPORARY TABLE IF EXISTS NewOrderSlots')
+    cursor.execute(NEW_ORDER_SLOTS)
+    try:
+        cursor.execute('''
+            INSERT INTO NewOrderSlots
+            SELECT od.ProductID, o.OrderHour, o.OrderDayOfWeek, o.OrderSeason,
+                   SUM(od.Quantity), MAX(od.OrderDetailID), COUNT(*)
+            FROM Orders o
+            JOIN OrderDetails od ON od.OrderID = o.OrderID
+            WHERE o.OrderID > %s AND o.OrderID <= %s
+            GROUP BY od.ProductID, o.OrderHour, o.OrderDayOfWeek, o.OrderSeason
+        ''', (last_order_id, new_last_order_id))
+        cursor.execute('SELECT COALESCE(SUM(OrderLines), 0) FROM NewOrderSlots')
+        lines_scanned = int(cursor.fetchone()[0])
+        for table, statement in ORDER_DERIVED_STATEMENTS:
+            cursor.execute(statement, {'now': now})
+            rows_affected[table] = rows_affected.get(table, 0) + max(cursor.rowcount, 0)
+    finally:
+        cursor.execute('DROP TEMPORARY TABLE IF EXISTS NewOrderSlots')
+    set_watermark(cursor, ORDER_DERIVED_WATERMARK, new_last_order_id)
+    return order_count, lines_scanned, rows_affected, time.perf_counter() - started, rebuilt
+
+# Function to fold the orders placed since the watermark into CustomerStats. Without a
+# watermark the table is emptied and every order is folded once.
+# Returns (orders folded, rows affected, seconds, rebuilt). The caller commits.
+def refresh_customer_stats(cursor, lag=ORDER_ID_SAFETY_LAG):
+    started = time.perf_counter()
+    last_order_id = get_watermark(cursor, 'CustomerStats', lock=True, default=None)
+    rebuilt = last_order_id is None
+    if rebuilt:
+        cursor.execute('DELETE FROM CustomerStats')
+        last_order_id = 0
+    new_last_order_id, order_count = committed_orders(cursor, last_order_id, lag)
+    if not order_count:
+        if rebuilt:
+            set_watermark(cursor, 'CustomerStats', new_last_order_id)
+        return 0, 0, time.perf_counter() - started, rebuilt
+
+    cursor.execute(f'''
+        INSERT INTO CustomerStats ({', '.join(CUSTOMER_STATS_COLUMNS)})
+        SELECT * FROM (
+            SELECT
+                o.CustomerID AS NewCustomerID,
+                COUNT(*) AS NewOrderCount,
+                COALESCE(SUM(t.OrderTotal), 0) AS NewLifetimeSpend,
+                MIN(o.OrderDate) AS NewFirstOrderDate,
+                MAX(o.OrderDate) AS NewLastOrderDate
+            FROM Orders o
+            LEFT JOIN (
+                SELECT OrderID, SUM(TotalPrice) AS OrderTotal FROM OrderDetails
+                WHERE OrderID > %s AND OrderID <= %s
+                GROUP BY OrderID
+            ) AS t ON t.OrderID = o.OrderID
+            WHERE o.OrderID > %s AND o.OrderID <= %s AND o.CustomerID IS NOT NULL
+            GROUP BY o.CustomerID
+        ) AS NewStats
+        {CUSTOMER_STATS_UPSERT}
+    ''', (last_order_id, new_last_order_id, last_order_id, new_last_order_id))
+    # With ON DUPLICATE KEY UPDATE an inserted row counts 1 and an updated row counts 2
+    rows_touched = cursor.rowcount
+    set_watermark(cursor, 'CustomerStats', new_last_order_id)
+    return order_count, rows_touched, time.perf_counter() - started, rebuilt
+
+# Function to rebuild every derived table from all orders: the watermarks are removed
+# and the tables truncated, which MySQL commits at once, then each table is refreshed
+# from empty. Returns the results of refresh_daily_product_sales,
+# refresh_order_derived_tables and refresh_customer_stats. The caller commits.
+def rebuild_derived_tables(cursor, now, lag=ORDER_ID_SAFETY_LAG):
+    cursor.execute(f"DELETE FROM RollupWatermarks WHERE RollupName IN ('DailyProductSales', "
+                   f"'{ORDER_DERIVED_WATERMARK}', 'CustomerStats')")
+    for table in DERIVED_TABLES:
+        cursor.execute(f'TRUNCATE TABLE {table}')
+    return (refresh_daily_product_sales(cursor, lag), refresh_order_derived_tables(cursor, now, lag),
+            refresh_customer_stats(cursor, lag))
@@ -0,0 +1,131 @@
+import time
+
+from seeding.bulkload import foreign_keys
+
+# Stored generated columns of Orders, derived from OrderDate so the insights, revenue and
+# menu queries group by a column instead of computing HOUR()/DATE()/season per row, as
+# (column, definition). Orders is created without them and a migration adds them, so a
+# populated table gets them too.
+ORDER_GENERATED_COLUMNS = [
+    ('OrderHour', 'TINYINT AS (HOUR(OrderDate)) STORED'),
+    ('OrderDayOfWeek', 'TINYINT AS (DAYOFWEEK(OrderDate) - 1) STORED'),
+    ('OrderSeason', '''VARCHAR(10) AS (
+        CASE
+            WHEN MONTH(OrderDate) IN (12, 1, 2) THEN 'Winter'
+            WHEN MONTH(OrderDate) IN (3, 4, 5) THEN 'Spring'
+            WHEN MONTH(OrderDate) IN (6, 7, 8) THEN 'Summer'
+            WHEN MONTH(OrderDate) IN (9, 10, 11) THEN 'Autumn'
+        END
+    ) STORED'''),
+    ('OrderDay', 'DATE AS (DATE(OrderDate)) STORED'),
+]
+
+# Secondary indexes for the backend's hot access paths, as (table, index name, columns).
+# The Orders* columns used here are the generated columns of ORDER_GENERATED_COLUMNS.
+HOT_PATH_INDEXES = [
+    # Date-range filters and DATE()/HOUR()/season GROUP BYs in the insights, revenue and profit controllers
+    ('Orders', 'idx_orders_orderdate', 'OrderDate'),
+    ('Orders', 'idx_orders_orderday', 'OrderDay'),
+    ('Orders', 'idx_orders_orderhour', 'OrderHour'),
+    ('Orders', 'idx_orders_orderseason', 'OrderSeason'),
+    ('Orders', 'idx_orders_customer_orderdate', 'CustomerID, OrderDate'),
+    # Covering indexes for per-product aggregates and for Orders -> OrderDetails joins
+    ('OrderDetails', 'idx_orderdetails_product_order', 'ProductID, OrderID, Quantity'),
+    ('OrderDetails', 'idx_orderdetails_order_product', 'OrderID, ProductID, Quantity'),
+    # Active promotion lookups (StartDate <= CURDATE() AND EndDate >= CURDATE())
+    ('Promotions', 'idx_promotions_dates', 'StartDate, EndDate, ProductID'),
+    # Low-stock filters and ORDER BY StockLevel
+    ('InventoryStatus', 'idx_inventorystatus_stocklevel', 'StockLevel'),
+    # Menu optimisation lookups by hour, day of week and season
+    ('ProductOrders', 'idx_productorders_slot', 'OrderHour, OrderDayOfWeek, Season'),
+]
+
+# Unique indexes behind the login lookups (WHERE Email = ?) of userController.js
+EMAIL_INDEXES = [
+    ('Customers', 'uq_customers_email', 'Email'),
+    ('Users', 'uq_users_email', 'Email'),
+]
+
+# Function to read the names of a table's columns in the current database
+def existing_columns(cursor, table):
+    cursor.execute('''
+        SELECT COLUMN_NAME FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    ''', (table,))
+    return {row[0] for row in cursor.fetchall()}
+
+# Function to list the generated Orders columns that do not exist yet
+def missing_order_columns(cursor):
+    present = existing_columns(cursor, 'Orders')
+    return [(name, definition) for name, definition in ORDER_GENERATED_COLUMNS if name not in present]
+
+# Function to plan the ALTER TABLE adding the missing generated Orders columns, in one
+# statement so a populated table is rebuilt once
+def plan_order_columns(cursor):
+    missing = missing_order_columns(cursor)
+    if not missing:
+        return []
+    return ["ALTER TABLE Orders " + ', '.join([f"ADD COLUMN {name} {definition}" for name, definition in missing])]
+
+# Function to read the names of the indexes that already exist, per table
+def existing_indexes(cursor):
+    cursor.execute('''
+        SELECT DISTINCT TABLE_NAME, INDEX_NAME
+        FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE()
+    ''')
+    indexes = {}
+    for table, index in cursor.fetchall():
+        indexes.setdefault(table, set()).add(index)
+    return indexes
+
+# Function to plan the ALTER TABLE statements adding the indexes (hot-path ones by default)
+# that are missing, one per table so each table is scanned once. Returns [(table, [index names], statement)].
+def plan_indexes(cursor, indexes=HOT_PATH_INDEXES, unique=False):
+    kind = 'UNIQUE INDEX' if unique else 'INDEX'
+    present = existing_indexes(cursor)
+    missing = {}
+    for table, name, columns in indexes:
+        if name not in present.get(table, ()):
+            missing.setdefault(table, []).append((name, columns))
+    return [
+        (table, [name for name, _ in table_indexes],
+         f"ALTER TABLE {table} " + ', '.join([f"ADD {kind} {name} ({columns})" for name, columns in table_indexes]))
+        for table, table_indexes in missing.items()
+    ]
+
+# Function to create the hot-path indexes that are missing. Returns [(table, [index names], seconds)].
+def create_indexes(cursor, indexes=HOT_PATH_INDEXES):
+    built = []
+    for table, names, statement in plan_indexes(cursor, indexes):
+        started = time.perf_counter()
+        cursor.execute(statement)
+        built.append((table, names, time.perf_counter() - started))
+    return built
+
+# Function to list the indexes whose leading columns are those of a foreign key, as
+# (table, index name, columns). InnoDB drops the index it created for a foreign key once
+# another index can serve it, and then refuses to drop that one (error 1553) whatever
+# FOREIGN_KEY_CHECKS is set to, so these indexes are never deferred.
+def foreign_key_indexes(cursor, indexes=HOT_PATH_INDEXES):
+    keys = foreign_keys(cursor)
+    return [(table, name, columns) for table, name, columns in indexes
+            if any(key_table == table and [column.strip() for column in columns.split(',')][:len(key_columns)]
+                   == key_columns for key_table, key_columns, _, _ in keys)]
+
+# Function to drop the hot-path indexes that exist, one statement per table, so a bulk load
+# does not maintain them row by row. Indexes a foreign key relies on are kept (see
+# foreign_key_indexes). Returns [(table, [index names], seconds)].
+def drop_indexes(cursor, indexes=HOT_PATH_INDEXES):
+    present = existing_indexes(cursor)
+    kept = foreign_key_indexes(cursor, indexes)
+    existing = {}
+    for table, name, columns in indexes:
+        if name in present.get(table, ()) and (table, name, columns) not in kept:
+            existing.setdefault(table, []).append(name)
+    dropped = []
+    for table, names in existing.items():
+        started = time.perf_counter()
+        cursor.execute(f"ALTER TABLE {table} " + ', '.join([f"DROP INDEX {name}" for name in names]))
+        dropped.append((table, names, time.perf_counter() - started))
+    return dropped
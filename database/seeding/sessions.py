@@ -0,0 +1,80 @@
+import datetime
+import random
+
+# Shopping sessions are either active (changed within ACTIVE_WINDOW of now) or abandoned
+# (left between ACTIVE_WINDOW and ABANDONED_WINDOW ago). Guests are not logged in.
+ACTIVE_SHARE = 0.35
+GUEST_SHARE = 0.25
+ACTIVE_WINDOW = datetime.timedelta(hours=2)
+ABANDONED_WINDOW = datetime.timedelta(days=30)
+
+# Items per cart, weighted towards small carts, and the quantity range of an item
+CART_SIZES = (1, 2, 3, 4, 5, 6, 7, 8)
+CART_SIZE_WEIGHTS = (20, 22, 18, 13, 10, 7, 6, 4)
+MAX_CART_QUANTITY = 5
+
+# Sessions generated between progress reports
+PROGRESS_INTERVAL = 1000
+
+# Share of the customer count given a session when --sessions is not set
+DEFAULT_SESSION_SHARE = 0.2
+
+SESSION_COLUMNS = ('SessionID', 'UserID', 'Total', 'CreatedAt', 'ModifiedAt')
+CART_ITEM_COLUMNS = ('CartItemID', 'SessionID', 'ProductID', 'Quantity', 'DateAdded')
+
+# Function to register the ShoppingSession and CartItem tables on a writer
+def register_session_tables(writer):
+    writer.register('ShoppingSession', SESSION_COLUMNS)
+    writer.register('CartItem', CART_ITEM_COLUMNS)
+
+# Function to derive a guest SessionID from its creation time the way the backend's
+# generateSessionID() does (DDMMYYYYHHMMSS). Guest IDs stay above any CustomerID.
+def guest_session_id(created_at):
+    return int(created_at.strftime('%d%m%Y%H%M%S'))
+
+# Function to pick the time a session was last changed and the time it was created
+def session_times(rng, now, active):
+    if active:
+        modified_at = now - datetime.timedelta(seconds=rng.randint(0, int(ACTIVE_WINDOW.total_seconds())))
+    else:
+        modified_at = now - datetime.timedelta(seconds=rng.randint(int(ACTIVE_WINDOW.total_seconds()) + 1,
+                                                                   int(ABANDONED_WINDOW.total_seconds())))
+    created_at = modified_at - datetime.timedelta(seconds=rng.randint(0, 3600 if active else 2 * 86400))
+    return created_at, modified_at
+
+# Function to generate and write `count` shopping sessions with their carts, as of now.
+# Logged-in sessions belong to customers drawn from 1..last_customer_id and use the
+# CustomerID as SessionID, as the backend does after login; the rest are guest sessions.
+# Cart items are distinct products added between the session's creation and last change,
+# numbered from first_cart_item_id. Total stays 0.00 until a checkout, as in the backend.
+# Returns (sessions, cart items) written.
+def write_sessions(writer, count, seed, now, last_customer_id, product_ids, first_cart_item_id, progress=None):
+    rng = random.Random(f"{seed}:sessions")
+    customer_sessions = min(round(count * (1 - GUEST_SHARE)), last_customer_id)
+    customer_ids = sorted(rng.sample(range(1, last_customer_id + 1), customer_sessions))
+    guest_ids = set()
+    cart_item_id = first_cart_item_id
+    for i in range(count):
+        active = rng.random() < ACTIVE_SHARE
+        created_at, modified_at = session_times(rng, now, active)
+        if i < customer_sessions:
+            session_id = user_id = customer_ids[i]
+        else:
+            # Guests starting in the same second would share an ID, so later ones move a second back
+            while guest_session_id(created_at) in guest_ids:
+                created_at -= datetime.timedelta(seconds=1)
+            session_id = guest_session_id(created_at)
+            guest_ids.add(session_id)
+            user_id = None
+        writer.add('ShoppingSession', (session_id, user_id, 0, created_at, modified_at))
+
+        cart_size = rng.choices(CART_SIZES, CART_SIZE_WEIGHTS)[0]
+        span = int((modified_at - created_at).total_seconds())
+        added = sorted(rng.randint(0, span) for _ in range(cart_size - 1)) + [span]
+        for product_id, seconds in zip(rng.sample(product_ids, min(cart_size, len(product_ids))), added):
+            writer.add('CartItem', (cart_item_id, session_id, product_id, rng.randint(1, MAX_CART_QUANTITY),
+                                    created_at + datetime.timedelta(seconds=seconds)))
+            cart_item_id += 1
+        if progress and ((i + 1) % PROGRESS_INTERVAL == 0 or i + 1 == count):
+            progress(i + 1)
+    return count, cart_item_id - first_cart_item_id
@@ -0,0 +1,24 @@
+# Function to split the customer IDs first..last into at most `shards` contiguous ranges
+def split_customer_range(first_customer_id, last_customer_id, shards):
+    total = last_customer_id - first_customer_id + 1
+    shards = max(1, min(shards, total))
+    size, remainder = divmod(total, shards)
+    ranges = []
+    start = first_customer_id
+    for index in range(shards):
+        end = start + size - 1 + (1 if index < remainder else 0)
+        ranges.append((start, end))
+        start = end + 1
+    return ranges
+
+# Function to turn per-shard (orders, order lines) counts into the first OrderID and
+# OrderDetailID of every shard, so shards number their rows without overlapping
+def plan_id_offsets(counts, first_order_id, first_order_detail_id):
+    offsets = []
+    order_id = first_order_id
+    order_detail_id = first_order_detail_id
+    for orders, lines in counts:
+        offsets.append((order_id, order_detail_id))
+        order_id += orders
+        order_detail_id += lines
+    return offsets
@@ -0,0 +1,534 @@
+import abc
+import bisect
+import csv
+import datetime
+import decimal
+import os
+import re
+import sqlite3
+
+import mysql.connector
+
+# Parquet output is optional: without pyarrow the parquet sink cannot be selected
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from seeding.writers import tsv_field
+
+# Sinks the generated tables can be written to. 'mysql' is a server connection; the
+# others stand in for one without a server. Rows inserted into a stand-in sink are
+# stored per table (in SQLite, CSV, Parquet or TSV files, or only counted), and the
+# lookups the loader makes (next free IDs, customer pages, product prices, watermarks)
+# are answered from what was written. Rows upserted with ON DUPLICATE KEY UPDATE are
+# merged by key in memory, as MySQL would, and stored when the sink is closed. Any
+# statement a stand-in does not model raises NotSupportedError instead of passing.
+
+# Auto-increment key of each table the loader writes
+ID_COLUMNS = {
+    'Customers': 'CustomerID',
+    'Users': 'UserID',
+    'Products': 'ProductID',
+    'Orders': 'OrderID',
+    'OrderDetails': 'OrderDetailID',
+    'PaymentDetails': 'PaymentID',
+    'ProductOrders': 'ProductOrderID',
+    'Promotions': 'PromotionID',
+    'ShoppingSession': 'SessionID',
+    'CartItem': 'CartItemID',
+}
+
+# Unique key of each table rows are upserted into, where it is not the auto-increment key
+KEY_COLUMNS = {
+    'PopularProducts': ('ProductID',),
+    'DynamicPricing': ('ProductID',),
+    'OrderPatterns': ('ProductID', 'OrderHour'),
+    'InventoryStatus': ('ProductID',),
+    'DailyProductSales': ('SalesDate', 'ProductID'),
+    'CustomerStats': ('CustomerID',),
+    'RollupWatermarks': ('RollupName',),
+}
+
+INSERT_PATTERN = re.compile(r'^\s*INSERT INTO (\w+) \(([^)]*)\)')
+VALUES_PATTERN = re.compile(r' VALUES \(((?:[^()]|\(\))*)\)')
+UPSERT_PATTERN = re.compile(r' ON DUPLICATE KEY UPDATE (.+)$')
+MAX_ID_PATTERN = re.compile(r'^SELECT COALESCE\(MAX\((\w+)\), 0\) FROM (\w+)$')
+SELECT_PATTERN = re.compile(r'^SELECT ([\w, ]+) FROM (\w+)(?: WHERE (\w+) = %s)?(?: FOR UPDATE)?$')
+DELETE_PATTERN = re.compile(r'^DELETE FROM (\w+) WHERE (\w+) IN \(((?:%s, )*%s)\)$')
+CREATE_PATTERN = re.compile(r'^CREATE TABLE IF NOT EXISTS \w+ ')
+
+# Assignments of an ON DUPLICATE KEY UPDATE clause a stand-in merges: a column set to the
+# new value, to the sum of both, or to the lower or higher of both
+ASSIGNMENT_PATTERN = re.compile(r'(\w+) = (?:VALUES\((\w+)\)|(\w+) \+ VALUES\((\w+)\)|'
+                                r'(LEAST|GREATEST)\((\w+), VALUES\((\w+)\)\))(?:, |$)')
+MERGES = {
+    'set': lambda old, new: new,
+    'add': lambda old, new: old + new,
+    'LEAST': min,
+    'GREATEST': max,
+}
+
+# Function to parse an ON DUPLICATE KEY UPDATE clause into {column: merge}, or None if
+# it assigns anything but the forms of ASSIGNMENT_PATTERN to the column itself
+def parse_upsert(clause):
+    merges = {}
+    position = 0
+    while position < len(clause):
+        match = ASSIGNMENT_PATTERN.match(clause, position)
+        if not match:
+            return None
+        column, set_source, add_column, add_source, function, bound_column, bound_source = match.groups()
+        if set_source:
+            sources, merge = (set_source,), 'set'
+        elif add_source:
+            sources, merge = (add_column, add_source), 'add'
+        else:
+            sources, merge = (bound_column, bound_source), function
+        if any(source != column for source in sources):
+            return None
+        merges[column] = MERGES[merge]
+        position = match.end()
+    return merges
+
+# Error raised for a statement a stand-in sink does not model
+def unsupported(statement):
+    return mysql.connector.errors.NotSupportedError(msg=f"Stand-in sinks do not model this statement: {statement}")
+
+# SQL functions a stand-in evaluates in the VALUES of a single-row INSERT
+SQL_FUNCTIONS = {
+    'NOW()': lambda: datetime.datetime.now().replace(microsecond=0),
+}
+
+# Rows per Parquet row group
+PARQUET_ROW_GROUP_SIZE = 100000
+
+# Stand-in database keeping what the loader reads back. Subclasses store the rows.
+class StandinDatabase(abc.ABC):
+    def __init__(self, path):
+        self.path = path
+        self.max_ids = {}
+        self.customer_ids = []
+        self.products = []
+        self.rows_stored = {}
+        # Tables written with upserts, as {table: (columns, {key: row})}, stored on close
+        self.keyed = {}
+
+    def insert(self, table, columns, rows):
+        if table in self.keyed:
+            raise mysql.connector.errors.NotSupportedError(
+                msg=f"Stand-in sinks cannot mix plain INSERTs with upserts into {table}")
+        id_column = ID_COLUMNS.get(table)
+        last_id = self.max_ids.get(table, 0)
+        stored = []
+        for row in rows:
+            if id_column in columns:
+                row_id = row[columns.index(id_column)]
+                last_id = max(last_id, row_id)
+            else:
+                last_id += 1
+                row_id = last_id
+            if table == 'Customers':
+                bisect.insort(self.customer_ids, row_id)
+            elif table == 'Products':
+                self.products.append((row_id, row[columns.index('Price')], row[columns.index('Cost')]))
+            stored.append(row)
+        self.max_ids[table] = last_id
+        self.rows_stored[table] = self.rows_stored.get(table, 0) + len(stored)
+        self.store(table, columns, stored)
+
+    # Merges rows into a table by its unique key: a new key is inserted, an existing one
+    # updated with the merges of the ON DUPLICATE KEY UPDATE clause. Returns the affected
+    # row count MySQL reports, 1 per row inserted and 2 per row updated.
+    def upsert(self, table, columns, rows, merges):
+        key_columns = KEY_COLUMNS.get(table) or ((ID_COLUMNS[table],) if table in ID_COLUMNS else None)
+        if key_columns is None or table in self.rows_stored or not set(key_columns) <= set(columns):
+            raise mysql.connector.errors.NotSupportedError(msg=f"Stand-in sinks cannot upsert into {table}")
+        stored_columns, keyed_rows = self.keyed.setdefault(table, (tuple(columns), {}))
+        if tuple(columns) != stored_columns:
+            raise mysql.connector.errors.NotSupportedError(
+                msg=f"Stand-in sinks need the same columns for every upsert into {table}")
+        key_indexes = [columns.index(column) for column in key_columns]
+        merge_indexes = [(columns.index(column), merge) for column, merge in merges.items()]
+        affected = 0
+        for row in rows:
+            key = tuple(row[index] for index in key_indexes)
+            existing = keyed_rows.get(key)
+            if existing is None:
+                keyed_rows[key] = list(row)
+                affected += 1
+            else:
+                for index, merge in merge_indexes:
+                    existing[index] = merge(existing[index], row[index])
+                affected += 2
+        if table in ID_COLUMNS:
+            self.max_ids[table] = max([self.max_ids.get(table, 0)] + [key[0] for key in keyed_rows])
+        return affected
+
+    # Deletes the upserted rows whose column holds one of the values. Returns the rows deleted.
+    def delete(self, table, column, values):
+        if table in self.rows_stored:
+            raise mysql.connector.errors.NotSupportedError(msg=f"Stand-in sinks cannot delete from {table}")
+        if table not in self.keyed:
+            return 0
+        columns, keyed_rows = self.keyed[table]
+        index = columns.index(column)
+        values = set(values)
+        deleted = [key for key, row in keyed_rows.items() if row[index] in values]
+        for key in deleted:
+            del keyed_rows[key]
+        return len(deleted)
+
+    @abc.abstractmethod
+    def store(self, table, columns, rows):
+        pass
+
+    def query(self, statement, params):
+        match = MAX_ID_PATTERN.match(statement)
+        if match:
+            return [(self.max_ids.get(match.group(2), 0),)]
+        if statement.startswith('SELECT CustomerID FROM Customers WHERE CustomerID > %s ORDER BY CustomerID ASC LIMIT %s'):
+            start = bisect.bisect_right(self.customer_ids, params[0])
+            return [(customer_id,) for customer_id in self.customer_ids[start:start + params[1]]]
+        if statement == 'SELECT COUNT(*) FROM Customers WHERE CustomerID < %s':
+            return [(bisect.bisect_left(self.customer_ids, params[0]),)]
+        if statement == 'SELECT COUNT(*) FROM Customers WHERE CustomerID > %s':
+            return [(len(self.customer_ids) - bisect.bisect_right(self.customer_ids, params[0]),)]
+        if statement.startswith('SELECT CustomerID, Email FROM Customers WHERE CustomerID > %s AND CustomerID < %s'):
+            # Emails are not kept, so only a range without customers can be answered
+            if bisect.bisect_left(self.customer_ids, params[1]) > bisect.bisect_right(self.customer_ids, params[0]):
+                raise unsupported(statement)
+            return []
+        if statement.startswith('SELECT ProductID, Price, Cost FROM Products'):
+            return list(self.products)
+        if statement.startswith('SELECT ProductID FROM Products'):
+            return [(product_id,) for product_id, _, _ in self.products]
+        if statement.startswith('SELECT COUNT(*) FROM information_schema.COLUMNS'):
+            # Stand-in tables are never partitioned, so OrderDetails has no OrderDate copy
+            return [(0,)]
+        match = SELECT_PATTERN.match(statement)
+        if match and match.group(2) not in self.rows_stored:
+            return self.select(match.group(2), [column.strip() for column in match.group(1).split(',')],
+                               match.group(3), params)
+        raise unsupported(statement)
+
+    # Reads columns of the upserted rows, of those whose where_column equals the parameter if given
+    def select(self, table, columns, where_column, params):
+        if table not in self.keyed:
+            return []
+        stored_columns, keyed_rows = self.keyed[table]
+        if not set(columns) <= set(stored_columns) or (where_column and where_column not in stored_columns):
+            raise mysql.connector.errors.NotSupportedError(msg=f"Stand-in sinks do not have these columns of {table}")
+        indexes = [stored_columns.index(column) for column in columns]
+        rows = keyed_rows.values()
+        if where_column:
+            where_index = stored_columns.index(where_column)
+            rows = [row for row in rows if row[where_index] == params[0]]
+        return [tuple(row[index] for index in indexes) for row in rows]
+
+    # Counts rows another connection to the same sink stored, e.g. a shard process's, so
+    # the summary and the next free IDs cover them
+    def add_rows(self, counts, max_ids):
+        for table, rows in counts.items():
+            self.rows_stored[table] = self.rows_stored.get(table, 0) + rows
+        for table, max_id in max_ids.items():
+            self.max_ids[table] = max(self.max_ids.get(table, 0), max_id)
+
+    # Rows held per table, stored or upserted
+    def row_counts(self):
+        counts = dict(self.rows_stored)
+        counts.update({table: len(keyed_rows) for table, (_, keyed_rows) in self.keyed.items()})
+        return counts
+
+    def flush(self):
+        pass
+
+    # Stores the upserted tables, which are final once the sink is closed
+    def close(self):
+        for table, (columns, keyed_rows) in self.keyed.items():
+            self.store(table, columns, list(keyed_rows.values()))
+        self.keyed.clear()
+        self.close_storage()
+
+    def close_storage(self):
+        pass
+
+# Counts rows without storing them, to measure generation apart from ingest
+class NullDatabase(StandinDatabase):
+    def store(self, table, columns, rows):
+        pass
+
+# One TSV file per table in the LOAD DATA format of tsv_field(), without a header
+class TsvDatabase(StandinDatabase):
+    def __init__(self, path):
+        super().__init__(path)
+        os.makedirs(path, exist_ok=True)
+        self.files = {}
+
+    def open_file(self, table, columns):
+        return open(os.path.join(self.path, f"{table}.tsv"), 'w', encoding='utf-8')
+
+    def store(self, table, columns, rows):
+        spool = self.files.get(table)
+        if spool is None:
+            spool = self.files[table] = self.open_file(table, columns)
+        self.write_rows(spool, rows)
+
+    def write_rows(self, spool, rows):
+        spool.write(''.join(['\t'.join([tsv_field(value) for value in row]) + '\n' for row in rows]))
+
+    def flush(self):
+        for spool in self.files.values():
+            spool.flush()
+
+    def close_storage(self):
+        for spool in self.files.values():
+            spool.close()
+        self.files.clear()
+
+# One CSV file per table, starting with a header row of the columns first inserted.
+# NULL is written as an empty field.
+class CsvDatabase(TsvDatabase):
+    def open_file(self, table, columns):
+        spool = open(os.path.join(self.path, f"{table}.csv"), 'w', encoding='utf-8', newline='')
+        csv.writer(spool, lineterminator='\n').writerow(columns)
+        return spool
+
+    def write_rows(self, spool, rows):
+        csv.writer(spool, lineterminator='\n').writerows(rows)
+
+# Function to choose the Parquet type of a column from its first non-NULL value
+def parquet_type(values):
+    value = next((value for value in values if value is not None), None)
+    if isinstance(value, bool):
+        return pyarrow.bool_()
+    if isinstance(value, int):
+        return pyarrow.int64()
+    if isinstance(value, float):
+        return pyarrow.float64()
+    if isinstance(value, decimal.Decimal):
+        scale = max([-item.as_tuple().exponent for item in values if item is not None] + [2])
+        return pyarrow.decimal128(18, scale)
+    if isinstance(value, datetime.datetime):
+        return pyarrow.timestamp('s')
+    if isinstance(value, datetime.date):
+        return pyarrow.date32()
+    return pyarrow.string()
+
+# One Parquet file per table, written a row group at a time. Column types are chosen
+# from the first row group; later rows are converted to them.
+class ParquetDatabase(StandinDatabase):
+    def __init__(self, path):
+        super().__init__(path)
+        os.makedirs(path, exist_ok=True)
+        self.columns = {}
+        self.buffers = {}
+        self.writers = {}
+
+    def store(self, table, columns, rows):
+        self.columns.setdefault(table, columns)
+        buffer = self.buffers.setdefault(table, [])
+        buffer.extend(rows)
+        if len(buffer) >= PARQUET_ROW_GROUP_SIZE:
+            self.write_row_group(table)
+
+    def write_row_group(self, table):
+        buffer = self.buffers[table]
+        if not buffer:
+            return
+        columns = self.columns[table]
+        values = {column: [row[index] for row in buffer] for index, column in enumerate(columns)}
+        writer = self.writers.get(table)
+        if writer is None:
+            schema = pyarrow.schema([(column, parquet_type(values[column])) for column in columns])
+            writer = self.writers[table] = pyarrow.parquet.ParquetWriter(
+                os.path.join(self.path, f"{table}.parquet"), schema)
+        writer.write_table(pyarrow.Table.from_pydict(values, schema=writer.schema))
+        buffer.clear()
+
+    def close_storage(self):
+        for table in self.buffers:
+            self.write_row_group(table)
+        for writer in self.writers.values():
+            writer.close()
+        self.writers.clear()
+
+# Function to convert a value to a type SQLite stores; exact numbers and times are kept as text
+def sqlite_value(value):
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(sep=' ')
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return value
+
+# One SQLite database file. A table is created, replacing any table of the same name,
+# when it is first written, with the auto-increment key as INTEGER PRIMARY KEY and the
+# columns inserted; columns first inserted later are added to it.
+class SqliteDatabase(StandinDatabase):
+    def __init__(self, path):
+        super().__init__(path)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=OFF')
+        self.columns = {}
+
+    def create_table(self, table, columns):
+        id_column = ID_COLUMNS.get(table)
+        definitions = [f"{id_column} INTEGER PRIMARY KEY"] if id_column else []
+        definitions += [column for column in columns if column != id_column]
+        self.conn.execute(f'DROP TABLE IF EXISTS {table}')
+        self.conn.execute(f"CREATE TABLE {table} ({', '.join(definitions)})")
+        self.columns[table] = set(columns) | ({id_column} if id_column else set())
+
+    def store(self, table, columns, rows):
+        if table not in self.columns:
+            self.create_table(table, columns)
+        for column in columns:
+            if column not in self.columns[table]:
+                self.conn.execute(f'ALTER TABLE {table} ADD COLUMN {column}')
+                self.columns[table].add(column)
+        self.conn.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['?'] * len(columns))})",
+            [[sqlite_value(value) for value in row] for row in rows])
+
+    def flush(self):
+        self.conn.commit()
+
+    def close_storage(self):
+        self.conn.commit()
+        self.conn.close()
+
+class StandinCursor:
+    def __init__(self, database):
+        self.database = database
+        self.rowcount = 0
+        self.result = []
+
+    def execute(self, statement, params=()):
+        statement = ' '.join(statement.split())
+        self.result = []
+        self.rowcount = 0
+        match = INSERT_PATTERN.match(statement)
+        values = VALUES_PATTERN.search(statement) if match else None
+        if values:
+            self.write(statement, match, [self.evaluate(statement, values.group(1), params)])
+        elif statement.startswith('SELECT'):
+            self.result = self.database.query(statement, params)
+        elif DELETE_PATTERN.match(statement):
+            match = DELETE_PATTERN.match(statement)
+            self.rowcount = self.database.delete(match.group(1), match.group(2), params)
+        elif not CREATE_PATTERN.match(statement):
+            # Tables are created when they are first written, so CREATE TABLE IF NOT EXISTS has nothing to do
+            raise unsupported(statement)
+
+    def executemany(self, statement, rows):
+        statement = ' '.join(statement.split())
+        match = INSERT_PATTERN.match(statement)
+        if not match:
+            raise unsupported(statement)
+        self.write(statement, match, rows)
+
+    # Inserts rows, or upserts them if the statement has an ON DUPLICATE KEY UPDATE clause
+    def write(self, statement, match, rows):
+        columns = [column.strip() for column in match.group(2).split(',')]
+        upsert = UPSERT_PATTERN.search(statement)
+        if upsert:
+            merges = parse_upsert(upsert.group(1))
+            if merges is None:
+                raise unsupported(statement)
+            self.rowcount = self.database.upsert(match.group(1), columns, rows, merges)
+        else:
+            self.database.insert(match.group(1), columns, rows)
+            self.rowcount = len(rows)
+
+    # Evaluates the VALUES of a single-row INSERT: placeholders and SQL_FUNCTIONS
+    @staticmethod
+    def evaluate(statement, values, params):
+        params = iter(params or ())
+        row = []
+        for value in (value.strip() for value in values.split(',')):
+            if value == '%s':
+                row.append(next(params))
+            elif value in SQL_FUNCTIONS:
+                row.append(SQL_FUNCTIONS[value]())
+            else:
+                raise unsupported(statement)
+        return row
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+    def fetchall(self):
+        return self.result
+
+    def close(self):
+        pass
+
+class StandinConnection:
+    def __init__(self, database):
+        self.database = database
+
+    def cursor(self):
+        return StandinCursor(self.database)
+
+    def commit(self):
+        self.database.flush()
+
+    def rollback(self):
+        pass
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        self.database.close()
+
+# Stand-in sinks selectable with --sink, besides 'mysql'
+STANDIN_SINKS = {
+    'sqlite': SqliteDatabase,
+    'csv': CsvDatabase,
+    'parquet': ParquetDatabase,
+    'tsv': TsvDatabase,
+    'null': NullDatabase,
+}
+
+SINKS = ('mysql',) + tuple(sorted(STANDIN_SINKS))
+
+# Function to tell whether a sink's dependencies are installed
+def sink_available(name):
+    return name != 'parquet' or pyarrow is not None
+
+# Function to return where a stand-in sink writes by default under a directory:
+# a database file for SQLite, a directory of files for the others
+def default_sink_path(name, directory):
+    return os.path.join(directory, 'seed.sqlite3' if name == 'sqlite' else name)
+
+# Function to open a sink as a connection: a MySQL connection with the given config,
+# or a stand-in writing to path
+def open_sink(name, path=None, config=None, allow_local_infile=False):
+    if name == 'mysql':
+        return mysql.connector.connect(**config, allow_local_infile=allow_local_infile)
+    return StandinConnection(STANDIN_SINKS[name](path))
+
+# Function to read the rows a stand-in sink holds per table and its highest ID per table,
+# as ({table: rows}, {table: ID}); empty for MySQL
+def sink_rows(conn):
+    database = getattr(conn, 'database', None)
+    if not isinstance(database, StandinDatabase):
+        return {}, {}
+    return database.row_counts(), dict(database.max_ids)
+
+# Function to add the rows of sink_rows() another connection stored to a stand-in sink
+def add_sink_rows(conn, counts, max_ids):
+    database = getattr(conn, 'database', None)
+    if isinstance(database, StandinDatabase):
+        database.add_rows(counts, max_ids)
+
+# Function to describe the rows a sink stored
+def sink_summary(conn):
+    counts, _ = sink_rows(conn)
+    return [f"Sink {table}: {rows} rows" for table, rows in counts.items()]
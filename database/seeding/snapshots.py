@@ -0,0 +1,137 @@
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+
+from seeding.writers import load_data_infile, tsv_field
+
+# Version of the snapshot layout; snapshots of another layout are regenerated
+SNAPSHOT_FORMAT = 1
+
+# Tables left out of snapshots: the schema version belongs to the migrations and the
+# seed checkpoints to the run that wrote them, not to the data
+EXCLUDED_TABLES = ('SchemaVersion', 'SeedCheckpoints')
+
+# Rows fetched per round trip while a table is dumped
+DUMP_BATCH_SIZE = 10000
+
+# Function to derive the key of a snapshot from the parameters that decide the generated
+# data, e.g. (seed, scale, schema version). Equal parameters give the same key.
+def snapshot_key(parameters):
+    encoded = json.dumps({'format': SNAPSHOT_FORMAT, **parameters}, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()[:16]
+
+# Function to return the path of the snapshot with the given key
+def snapshot_path(directory, key):
+    return os.path.join(directory, f"snapshot-{key}.zip")
+
+# Function to read the columns of every table a snapshot holds as {table: [column]}.
+# Generated columns are computed by MySQL and cannot be loaded, so they are left out.
+def snapshot_columns(cursor):
+    cursor.execute(f'''
+        SELECT TABLE_NAME, COLUMN_NAME FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND EXTRA NOT LIKE '%%GENERATED%%'
+        AND TABLE_NAME NOT IN ({', '.join(['%s'] * len(EXCLUDED_TABLES))})
+        AND TABLE_NAME IN (SELECT TABLE_NAME FROM information_schema.TABLES
+                           WHERE TABLE_SCHEMA = DATABASE() AND TABLE_TYPE = 'BASE TABLE')
+        ORDER BY TABLE_NAME, ORDINAL_POSITION
+    ''', EXCLUDED_TABLES)
+    columns = {}
+    for table, column in cursor.fetchall():
+        columns.setdefault(table, []).append(column)
+    return columns
+
+# Function to fingerprint the tables and columns a snapshot would hold, so databases
+# migrated to another layout (e.g. partitioned order tables) get their own snapshots
+def schema_fingerprint(cursor):
+    encoded = json.dumps(snapshot_columns(cursor), sort_keys=True)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()[:16]
+
+# Function to list the snapshot tables that already hold rows
+def non_empty_tables(cursor, tables):
+    filled = []
+    for table in tables:
+        cursor.execute(f'SELECT 1 FROM {table} LIMIT 1')
+        if cursor.fetchall():
+            filled.append(table)
+    return filled
+
+# Function to save every table of the database and the credential file to a compressed
+# snapshot: one TSV file per table in LOAD DATA format and a manifest with the parameters
+# and the reference time the data was generated as of.
+# The snapshot is written under a temporary name and renamed, so a failed run leaves none.
+# Returns {table: rows}.
+def save_snapshot(conn, path, parameters, as_of, credential_path=None):
+    cursor = conn.cursor()
+    columns = snapshot_columns(cursor)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    partial_path = path + '.partial'
+    rows = {}
+    try:
+        with zipfile.ZipFile(partial_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for table, table_columns in columns.items():
+                cursor.execute(f"SELECT {', '.join(table_columns)} FROM {table}")
+                rows[table] = 0
+                with archive.open(f"{table}.tsv", 'w', force_zip64=True) as member:
+                    while True:
+                        batch = cursor.fetchmany(DUMP_BATCH_SIZE)
+                        if not batch:
+                            break
+                        member.write(''.join(['\t'.join([tsv_field(value) for value in row]) + '\n'
+                                              for row in batch]).encode('utf-8'))
+                        rows[table] += len(batch)
+            credential_name = None
+            if credential_path and os.path.exists(credential_path):
+                credential_name = 'credentials' + os.path.splitext(credential_path)[1]
+                archive.write(credential_path, credential_name)
+            archive.writestr('manifest.json', json.dumps({
+                'format': SNAPSHOT_FORMAT,
+                'key': snapshot_key(parameters),
+                'parameters': parameters,
+                'as_of': as_of,
+                'created': datetime.datetime.now().isoformat(timespec='seconds'),
+                'tables': [{'name': table, 'columns': table_columns, 'rows': rows[table]}
+                           for table, table_columns in columns.items()],
+                'credentials': credential_name,
+            }, indent=2, default=str))
+        os.replace(partial_path, path)
+    finally:
+        cursor.close()
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+    return rows
+
+# Function to restore a snapshot into a database whose tables are empty, loading every
+# table with LOAD DATA LOCAL INFILE with foreign key and unique checks off for the session;
+# they are set back to what they were before, so a bulk load that has them off keeps them off.
+# The credential file is restored next to credential_base with the suffix it was saved with.
+# Returns (manifest, credential file path or None). The caller commits.
+def restore_snapshot(cursor, path, credential_base):
+    with zipfile.ZipFile(path) as archive:
+        manifest = json.loads(archive.read('manifest.json'))
+        tables = [table['name'] for table in manifest['tables']]
+        filled = non_empty_tables(cursor, tables)
+        if filled:
+            raise ValueError(f"a snapshot can only be restored into empty tables, found rows in {', '.join(filled)}")
+        cursor.execute('SELECT @@FOREIGN_KEY_CHECKS, @@UNIQUE_CHECKS')
+        foreign_key_checks, unique_checks = cursor.fetchone()
+        cursor.execute('SET FOREIGN_KEY_CHECKS = 0')
+        cursor.execute('SET UNIQUE_CHECKS = 0')
+        try:
+            with tempfile.TemporaryDirectory(prefix='seeding_snapshot_') as directory:
+                for table in manifest['tables']:
+                    table_path = archive.extract(f"{table['name']}.tsv", directory)
+                    load_data_infile(cursor, table['name'], table['columns'], table_path)
+                    os.remove(table_path)
+        finally:
+            cursor.execute(f'SET UNIQUE_CHECKS = {int(unique_checks)}')
+            cursor.execute(f'SET FOREIGN_KEY_CHECKS = {int(foreign_key_checks)}')
+        credential_path = None
+        if manifest['credentials']:
+            credential_path = os.path.splitext(credential_base)[0] + os.path.splitext(manifest['credentials'])[1]
+            with archive.open(manifest['credentials']) as source, open(credential_path, 'wb') as target:
+                shutil.copyfileobj(source, target)
+    return manifest, credential_path
@@ -0,0 +1,22 @@
+import collections
+import itertools
+
+# Function to split an iterable into lists of at most `size` items
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+# Like executor.map, but submits work lazily and keeps at most `window` calls in
+# flight, so memory stays flat however long the input is. Results keep input order.
+def bounded_map(executor, fn, iterable, window):
+    in_flight = collections.deque()
+    for item in iterable:
+        in_flight.append(executor.submit(fn, item))
+        if len(in_flight) >= window:
+            yield in_flight.popleft().result()
+    while in_flight:
+        yield in_flight.popleft().result()
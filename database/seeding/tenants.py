@@ -0,0 +1,49 @@
+import collections
+import random
+
+# Largest share of a category's items a restaurant may leave off its menu, and by which
+# its prices may differ; beyond it too few products remain for the inventory phase
+MAX_CATALOGUE_VARIATION = 0.5
+
+# One tenant database of a multi-restaurant run: its number, database name, seed and customers
+Tenant = collections.namedtuple('Tenant', ('index', 'database', 'seed', 'customers'))
+
+# Function to vary a product catalogue ({category: {items, cost_range, price_range}}) for
+# one restaurant: each category keeps a random share of its items, at least 1 - variation
+# of them in menu order, and its cost and price ranges are scaled by one factor within
+# 1 +/- variation. Draws from its own stream of the seed, so runs without variation keep
+# the catalogue and prices they had.
+def vary_catalogue(catalogue, seed, variation):
+    rng = random.Random(f"{seed}:catalogue")
+    varied = {}
+    for category, data in catalogue.items():
+        items = data["items"]
+        keep = max(1, round(len(items) * rng.uniform(1 - variation, 1)))
+        kept = set(rng.sample(items, keep))
+        factor = rng.uniform(1 - variation, 1 + variation)
+        varied[category] = {
+            "items": [item for item in items if item in kept],
+            "cost_range": tuple(round(bound * factor, 2) for bound in data["cost_range"]),
+            "price_range": tuple(round(bound * factor, 2) for bound in data["price_range"]),
+        }
+    return varied
+
+# Function to parse a --customers value for tenants: a count, or MIN-MAX for sizes drawn per tenant
+def parse_customer_range(value):
+    minimum, separator, maximum = value.partition('-')
+    minimum = int(minimum)
+    maximum = int(maximum) if separator else minimum
+    if not 1 <= minimum <= maximum:
+        raise ValueError(f"invalid customer range: {value}")
+    return minimum, maximum
+
+# Function to plan the tenants of a run: tenant i is the database <prefix>_<i>, with a seed
+# and a customer count drawn from its own stream of the run's seed, so adding tenants
+# does not change the ones planned before them
+def plan_tenants(count, prefix, seed, customer_range):
+    tenants = []
+    for index in range(1, count + 1):
+        rng = random.Random(f"{seed}:tenant:{index}")
+        tenants.append(Tenant(index, f"{prefix}_{index:02d}", rng.randrange(2 ** 32),
+                              rng.randint(*customer_range)))
+    return tenants
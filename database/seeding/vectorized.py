@@ -0,0 +1,273 @@
+import datetime
+import decimal
+import hashlib
+import itertools
+
+# NumPy is optional: without it orders are generated by the pure-Python generator in orders.py
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from seeding.orders import (MAX_PAYMENT_DELAY, PAYMENT_METHOD_WEIGHTS, PAYMENT_METHODS, PAYMENT_STATUS_WEIGHTS,
+                            PAYMENT_STATUSES, SEASONS, merge_counters)
+
+# Customers whose orders are drawn together as arrays. Random streams are keyed by
+# (seed, block), so a customer's orders do not depend on which shard generates them.
+CUSTOMER_BLOCK_SIZE = 4096
+
+# Season names in the order of their codes, and the season code of each month (January first)
+SEASON_NAMES = sorted(set(SEASONS.values()))
+MONTH_SEASON_CODES = [SEASON_NAMES.index(SEASONS[month]) for month in range(1, 13)]
+
+# Rows collected by KeyedSums before they are reduced
+KEYED_SUMS_BATCH = 1 << 20
+
+# Largest quantity of an order line; quantities are uniform between 1 and this
+MAX_QUANTITY = 5
+
+# Function to tell whether the NumPy generator can be used
+def available():
+    return numpy is not None
+
+# Function to return the block of a customer ID
+def customer_block(customer_id):
+    return (customer_id - 1) // CUSTOMER_BLOCK_SIZE
+
+# Function to create the random stream of one block for one purpose
+def block_stream(settings, purpose, block):
+    digest = hashlib.sha256(f"{settings.seed}:{purpose}:{block}".encode()).digest()
+    return numpy.random.default_rng(int.from_bytes(digest[:16], 'big'))
+
+# Order counts of every customer of a block and basket sizes of every order, drawn from
+# their own stream so order and line counts can be planned without generating the orders.
+# Counts follow generate_order_count(): uniform, and customers drawing the maximum move
+# to the heavy tail with the tail probability.
+def block_shapes(settings, block):
+    rng = block_stream(settings, 'shape', block)
+    distribution = settings.order_counts
+    counts = rng.integers(distribution.minimum, distribution.maximum + 1, CUSTOMER_BLOCK_SIZE)
+    tail = (counts == distribution.maximum) & (rng.random(CUSTOMER_BLOCK_SIZE) < distribution.tail_probability)
+    counts[tail] = rng.integers(distribution.maximum, distribution.tail_maximum + 1, int(tail.sum()))
+    sizes = rng.integers(3, 8, int(counts.sum()))
+    return counts, sizes
+
+# Total orders and order lines for a range of customer IDs
+def count_orders(settings, first_customer_id, last_customer_id):
+    orders = 0
+    lines = 0
+    for block in range(customer_block(first_customer_id), customer_block(last_customer_id) + 1):
+        counts, sizes = block_shapes(settings, block)
+        first = max(first_customer_id - block * CUSTOMER_BLOCK_SIZE - 1, 0)
+        last = min(last_customer_id - block * CUSTOMER_BLOCK_SIZE, CUSTOMER_BLOCK_SIZE)
+        order_offsets = numpy.concatenate(([0], numpy.cumsum(counts)))
+        line_offsets = numpy.concatenate(([0], numpy.cumsum(sizes)))
+        orders += int(order_offsets[last] - order_offsets[first])
+        lines += int(line_offsets[order_offsets[last]] - line_offsets[order_offsets[first]])
+    return orders, lines
+
+# Order times as seconds since start_date, never after now. Mirrors random_order_datetime():
+# orders falling on today's date have their hour, minute and second capped at now.
+def draw_order_seconds(rng, start_date, now, count):
+    today = (now.date() - start_date).days
+    days = rng.integers(0, today + 1, count)
+    hours = rng.integers(0, 24, count)
+    minutes = rng.integers(0, 60, count)
+    seconds = rng.integers(0, 60, count)
+    is_today = numpy.flatnonzero(days == today)
+    if len(is_today):
+        capped = len(is_today)
+        hours[is_today] = rng.integers(0, now.hour + 1, capped)
+        minutes[is_today] = numpy.where(hours[is_today] == now.hour, rng.integers(0, now.minute + 1, capped),
+                                        rng.integers(0, 60, capped))
+        seconds[is_today] = numpy.where(minutes[is_today] == now.minute, rng.integers(0, now.second + 1, capped),
+                                        rng.integers(0, 60, capped))
+    return days * 86400 + hours * 3600 + minutes * 60 + seconds
+
+# Function to draw one of the choices for each of count rows, with the given weights
+def draw_weighted(rng, weights, count):
+    weights = numpy.asarray(weights, dtype=float)
+    return rng.choice(len(weights), count, p=weights / weights.sum())
+
+# Orders of the given customers of one block as arrays: the customer and time of every
+# order, the basket size of every order, the product index and quantity of every line,
+# and the payment method, status and delay of every order (from their own stream).
+# The whole block is drawn whichever of its customers are asked for.
+def block_orders(settings, block, customer_ids, product_count):
+    counts, sizes = block_shapes(settings, block)
+    rng = block_stream(settings, 'orders', block)
+    order_seconds = draw_order_seconds(rng, settings.start_date, settings.now, len(sizes))
+    product_indexes = rng.integers(0, product_count, int(sizes.sum()))
+    quantities = rng.integers(1, MAX_QUANTITY + 1, len(product_indexes))
+    payment_rng = block_stream(settings, 'payments', block)
+    payment_methods = draw_weighted(payment_rng, PAYMENT_METHOD_WEIGHTS, len(sizes))
+    payment_statuses = draw_weighted(payment_rng, PAYMENT_STATUS_WEIGHTS, len(sizes))
+    payment_delays = payment_rng.integers(0, MAX_PAYMENT_DELAY + 1, len(sizes))
+
+    offsets = numpy.asarray(customer_ids, dtype=numpy.int64) - block * CUSTOMER_BLOCK_SIZE - 1
+    selected = numpy.zeros(CUSTOMER_BLOCK_SIZE, dtype=bool)
+    selected[offsets] = True
+    order_customers = numpy.repeat(numpy.arange(CUSTOMER_BLOCK_SIZE), counts)
+    order_mask = selected[order_customers]
+    line_mask = numpy.repeat(order_mask, sizes)
+    return (order_customers[order_mask] + block * CUSTOMER_BLOCK_SIZE + 1, order_seconds[order_mask],
+            sizes[order_mask], product_indexes[line_mask], quantities[line_mask],
+            (payment_methods[order_mask], payment_statuses[order_mask], payment_delays[order_mask]))
+
+# Function to convert an amount in cents to a Decimal
+def cents_to_decimal(cents):
+    return decimal.Decimal(cents).scaleb(-2)
+
+# Integer sums per integer key, kept as arrays. Keys added are reduced with
+# numpy.unique in batches, so memory stays proportional to the distinct keys.
+class KeyedSums:
+    def __init__(self, width):
+        self.keys = numpy.empty(0, dtype=numpy.int64)
+        self.sums = numpy.empty((width, 0), dtype=numpy.int64)
+        self.pending = []
+        self.pending_size = 0
+
+    def add(self, keys, *columns):
+        self.pending.append((keys, numpy.stack(columns)))
+        self.pending_size += len(keys)
+        if self.pending_size > max(KEYED_SUMS_BATCH, len(self.keys)):
+            self.reduce()
+
+    def reduce(self):
+        if not self.pending:
+            return
+        keys = numpy.concatenate([self.keys] + [keys for keys, _ in self.pending])
+        columns = numpy.concatenate([self.sums] + [columns for _, columns in self.pending], axis=1)
+        self.keys, inverse = numpy.unique(keys, return_inverse=True)
+        self.sums = numpy.stack([numpy.bincount(inverse, weights=column, minlength=len(self.keys))
+                                 for column in columns]).astype(numpy.int64)
+        self.pending = []
+        self.pending_size = 0
+
+    # Returns [(key, sum, ...)] as Python ints
+    def items(self):
+        self.reduce()
+        return zip(self.keys.tolist(), *self.sums.tolist())
+
+# Function to generate and write the orders of the given customers with NumPy, a block of
+# customers at a time, numbering orders and order lines from the given IDs. Takes the same
+# arguments as orders.write_orders() and writes the same tables, with a checkpoint after
+# each block of customers. Returns (orders, order lines) written.
+def write_orders(writer, customer_ids, settings, products, first_order_id, first_order_detail_id,
+                 aggregates, progress=None):
+    product_ids = numpy.array(list(products), dtype=numpy.int64)
+    product_count = len(product_ids)
+    price_cents = numpy.array([round(price * 100) for price, _ in products.values()], dtype=numpy.int64)
+    cost_cents = numpy.array([round(cost * 100) for _, cost in products.values()], dtype=numpy.int64)
+    # TotalPrice of every (product, quantity), computed exactly as write_orders() does
+    total_prices = numpy.empty(product_count * MAX_QUANTITY, dtype=object)
+    total_prices[:] = [round(quantity * price, 2) for price, _ in products.values()
+                       for quantity in range(1, MAX_QUANTITY + 1)]
+    dated_details = 'OrderDate' in writer.columns['OrderDetails']
+    customer_stats = 'CustomerStats' in writer.columns
+    start = numpy.datetime64(settings.start_date, 's')
+    last_second = int((settings.now - datetime.datetime.combine(settings.start_date, datetime.time())).total_seconds())
+    first_weekday = settings.start_date.weekday()
+    month_season_codes = numpy.array(MONTH_SEASON_CODES)
+
+    daily_sales = KeyedSums(3)
+    product_orders = KeyedSums(1)
+    popularity_scores = numpy.zeros(product_count, dtype=numpy.int64)
+    latest_lines = numpy.full(product_count, -1, dtype=numpy.int64)
+    latest_totals = [None] * product_count
+
+    order_id = first_order_id
+    order_detail_id = first_order_detail_id
+    customers_done = 0
+    for block, block_customer_ids in itertools.groupby(customer_ids, key=customer_block):
+        block_customer_ids = list(block_customer_ids)
+        order_customers, order_seconds, sizes, product_indexes, quantities, payments = block_orders(
+            settings, block, block_customer_ids, product_count)
+        order_count = len(order_customers)
+        line_count = len(product_indexes)
+
+        order_datetimes = (start + order_seconds.astype('timedelta64[s]')).tolist()
+        writer.add_many('Orders', zip(range(order_id, order_id + order_count), order_customers.tolist(),
+                                      order_datetimes))
+        line_order_ids = numpy.repeat(numpy.arange(order_id, order_id + order_count), sizes)
+        line_totals = total_prices[product_indexes * MAX_QUANTITY + quantities - 1].tolist()
+        columns = [range(order_detail_id, order_detail_id + line_count), line_order_ids.tolist(),
+                   product_ids[product_indexes].tolist(), quantities.tolist(), line_totals]
+        if dated_details:
+            columns.append(numpy.repeat(numpy.array(order_datetimes, dtype=object), sizes).tolist())
+        writer.add_many('OrderDetails', zip(*columns))
+
+        # One payment per order for the order's total, PaymentID = OrderID
+        payment_methods, payment_statuses, payment_delays = payments
+        line_cents = price_cents[product_indexes] * quantities
+        order_cents = numpy.add.reduceat(line_cents, numpy.cumsum(sizes) - sizes) if order_count else line_cents
+        payment_seconds = numpy.minimum(order_seconds + payment_delays, last_second)
+        order_ids = range(order_id, order_id + order_count)
+        writer.add_many('PaymentDetails', zip(
+            order_ids, order_ids, [cents_to_decimal(cents) for cents in order_cents.tolist()],
+            (start + payment_seconds.astype('timedelta64[s]')).tolist(),
+            [PAYMENT_METHODS[code] for code in payment_methods.tolist()],
+            [PAYMENT_STATUSES[code] for code in payment_statuses.tolist()]))
+
+        # Orders come grouped by customer, so each customer's statistics reduce over one run of orders
+        if customer_stats and order_count:
+            runs = numpy.flatnonzero(numpy.r_[True, order_customers[1:] != order_customers[:-1]])
+            writer.add_many('CustomerStats', zip(
+                order_customers[runs].tolist(), numpy.diff(numpy.r_[runs, order_count]).tolist(),
+                [cents_to_decimal(cents) for cents in numpy.add.reduceat(order_cents, runs).tolist()],
+                (start + numpy.minimum.reduceat(order_seconds, runs).astype('timedelta64[s]')).tolist(),
+                (start + numpy.maximum.reduceat(order_seconds, runs).astype('timedelta64[s]')).tolist()))
+
+        # Derived tables, aggregated with NumPy under numeric keys and turned into dictionaries at the end
+        line_seconds = numpy.repeat(order_seconds, sizes)
+        line_days = line_seconds // 86400
+        line_hours = line_seconds % 86400 // 3600
+        line_weekdays = (first_weekday + line_days + 1) % 7
+        line_months = (start + line_seconds.astype('timedelta64[s]')).astype('datetime64[M]').astype(numpy.int64) % 12
+        line_seasons = month_season_codes[line_months]
+        popularity_scores += numpy.bincount(product_indexes, weights=quantities,
+                                            minlength=product_count).astype(numpy.int64)
+        block_latest = numpy.full(product_count, -1, dtype=numpy.int64)
+        numpy.maximum.at(block_latest, product_indexes, numpy.arange(line_count))
+        for product_index in numpy.flatnonzero(block_latest >= 0).tolist():
+            line = int(block_latest[product_index])
+            latest_lines[product_index] = order_detail_id + line
+            latest_totals[product_index] = line_totals[line]
+
+        daily_sales.add(line_days * product_count + product_indexes, quantities,
+                        line_cents, cost_cents[product_indexes] * quantities)
+        product_orders.add(((product_indexes * 24 + line_hours) * 7 + line_weekdays) * 4 + line_seasons, quantities)
+
+        order_id += order_count
+        order_detail_id += line_count
+        writer.checkpoint(block_customer_ids[-1])
+        customers_done += len(block_customer_ids)
+        if progress:
+            progress(customers_done, order_id - first_order_id)
+
+    # Fold the numeric keys back into the aggregates' dictionaries
+    for product_index in numpy.flatnonzero(latest_lines >= 0).tolist():
+        product_id = int(product_ids[product_index])
+        aggregates.popularity_scores[product_id] = (aggregates.popularity_scores.get(product_id, 0)
+                                                    + int(popularity_scores[product_index]))
+        latest = (int(latest_lines[product_index]), latest_totals[product_index])
+        if product_id not in aggregates.current_prices or latest[0] > aggregates.current_prices[product_id][0]:
+            aggregates.current_prices[product_id] = latest
+    days = (settings.now.date() - settings.start_date).days + 1
+    dates = [settings.start_date + datetime.timedelta(days=day) for day in range(days)]
+    product_id_list = product_ids.tolist()
+    for target, totals in (
+            (aggregates.daily_sales, {
+                (dates[key // product_count], product_id_list[key % product_count]):
+                    [quantity, cents_to_decimal(revenue), cents_to_decimal(cost)]
+                for key, quantity, revenue, cost in daily_sales.items()}),
+            (aggregates.product_orders, {
+                (product_id_list[key // 672], key // 28 % 24, key // 4 % 7, SEASON_NAMES[key % 4]): [quantity]
+                for key, quantity in product_orders.items()})):
+        if target:
+            merge_counters(target, totals)
+        else:
+            target.update(totals)
+    if order_id > first_order_id:
+        aggregates.last_order_id = max(aggregates.last_order_id, order_id - 1)
+    return order_id - first_order_id, order_detail_id - first_order_detail_id
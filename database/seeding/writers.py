@@ -0,0 +1,235 @@
+import datetime
+import itertools
+import os
+import shutil
+import tempfile
+import time
+import weakref
+
+# Number of rows sent per multi-row INSERT by the bulk writer
+BULK_BATCH_SIZE = 5000
+
+# Number of rows spooled to a TSV file before it is handed to LOAD DATA
+LOAD_DATA_BATCH_SIZE = 200000
+
+# Common bookkeeping for the table writers. Tables are flushed in registration
+# order, so a child table (OrderDetails) never reaches the server before its parent (Orders).
+class TableWriter:
+    def __init__(self, cursor, batch_size):
+        self.cursor = cursor
+        self.batch_size = batch_size
+        self.columns = {}
+        self.on_duplicate = {}
+        self.pending = {}
+        self.rows_written = {}
+        self.seconds_spent = {}
+        self.commit = None
+        self.commit_rows = 0
+        self.record_checkpoint = None
+        self.uncommitted = 0
+        self.commits = 0
+
+    # Commits with commit() whenever `rows` rows have been written since the last commit,
+    # so a long phase is split into transactions of a bounded size
+    def commit_every(self, commit, rows):
+        self.commit = commit
+        self.commit_rows = rows
+
+    # Commits only at checkpoints instead: checkpoint(position) is called by the generator
+    # between whole units of work, and once `rows` rows are buffered or uncommitted it
+    # flushes every table, calls record(position) and commits, so the recorded position
+    # is committed together with exactly the rows up to it
+    def commit_at_checkpoints(self, commit, rows, record):
+        self.commit_every(commit, rows)
+        self.record_checkpoint = record
+
+    def checkpoint(self, position):
+        if not self.record_checkpoint or not self.commit_rows:
+            return
+        if self.uncommitted + sum(self.pending.values()) < self.commit_rows:
+            return
+        self.flush()
+        self.record_checkpoint(position)
+        self._commit()
+
+    def _commit(self):
+        self.commit()
+        self.uncommitted = 0
+        self.commits += 1
+
+    def register(self, table, columns, on_duplicate=''):
+        self.columns[table] = tuple(columns)
+        self.on_duplicate[table] = on_duplicate
+        self.pending[table] = 0
+        self.rows_written[table] = 0
+        self.seconds_spent[table] = 0.0
+
+    def add(self, table, row):
+        self._buffer(table, row)
+        self.pending[table] += 1
+        if self.pending[table] >= self.batch_size:
+            self.flush(table)
+
+    # Adds rows from an iterable, buffering them a batch at a time
+    def add_many(self, table, rows):
+        rows = iter(rows)
+        while True:
+            batch = list(itertools.islice(rows, self.batch_size - self.pending[table]))
+            if not batch:
+                return
+            self._buffer_many(table, batch)
+            self.pending[table] += len(batch)
+            if self.pending[table] >= self.batch_size:
+                self.flush(table)
+
+    def _buffer_many(self, table, rows):
+        for row in rows:
+            self._buffer(table, row)
+
+    # Flushes the given table and every table registered before it, or all tables
+    def flush(self, table=None):
+        tables = list(self.columns)
+        if table is not None:
+            tables = tables[:tables.index(table) + 1]
+        for name in tables:
+            if not self.pending[name]:
+                continue
+            started = time.perf_counter()
+            self._write(name)
+            self.seconds_spent[name] += time.perf_counter() - started
+            self.rows_written[name] += self.pending[name]
+            self.uncommitted += self.pending[name]
+            self.pending[name] = 0
+        if self.commit_rows and not self.record_checkpoint and self.uncommitted >= self.commit_rows:
+            self._commit()
+
+    def close(self):
+        pass
+
+    def summary(self):
+        lines = []
+        for table, rows in self.rows_written.items():
+            seconds = self.seconds_spent[table]
+            rate = rows / seconds if seconds > 0 else 0
+            lines.append(f"{table}: {rows} rows written in {seconds:.2f}s ({rate:,.0f} rows/sec)")
+        if self.commits:
+            lines.append(f"{self.commits} intermediate commits of {self.commit_rows}+ rows")
+        return lines
+
+    def insert_statement(self, table):
+        columns = self.columns[table]
+        placeholders = ', '.join(['%s'] * len(columns))
+        return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders}) {self.on_duplicate[table]}".rstrip()
+
+# Buffers rows per table and writes them as multi-row executemany batches
+class BulkWriter(TableWriter):
+    def __init__(self, cursor, batch_size=BULK_BATCH_SIZE):
+        super().__init__(cursor, batch_size)
+        self.buffers = {}
+
+    def register(self, table, columns, on_duplicate=''):
+        super().register(table, columns, on_duplicate)
+        self.buffers[table] = []
+
+    def _buffer(self, table, row):
+        self.buffers[table].append(row)
+
+    def _buffer_many(self, table, rows):
+        self.buffers[table].extend(rows)
+
+    def _write(self, table):
+        self.cursor.executemany(self.insert_statement(table), self.buffers[table])
+        self.buffers[table].clear()
+
+# Function to format one value for a LOAD DATA TSV file (default FIELDS/LINES options)
+def tsv_field(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(sep=' ')
+    if isinstance(value, str):
+        return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+    return str(value)
+
+# Function to ingest a TSV file written with tsv_field() into a table with LOAD DATA LOCAL INFILE
+def load_data_infile(cursor, table, columns, path):
+    cursor.execute(f'''
+        LOAD DATA LOCAL INFILE %s INTO TABLE {table}
+        CHARACTER SET utf8mb4
+        FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'
+        LINES TERMINATED BY '\\n'
+        ({', '.join(columns)})
+    ''', (path,))
+
+# Streams rows per table into temporary TSV files and ingests them with
+# LOAD DATA LOCAL INFILE. Tables registered with an ON DUPLICATE KEY clause are
+# loaded into a temporary staging table first and merged with INSERT ... SELECT,
+# because LOAD DATA itself can only REPLACE or IGNORE duplicates.
+# The connection must be opened with allow_local_infile=True.
+class LoadDataWriter(TableWriter):
+    def __init__(self, cursor, batch_size=LOAD_DATA_BATCH_SIZE, directory=None):
+        super().__init__(cursor, batch_size)
+        # Spool files live in a private directory that is removed even if a phase fails midway
+        self.directory = tempfile.mkdtemp(prefix='load_data_', dir=directory)
+        self._cleanup = weakref.finalize(self, shutil.rmtree, self.directory, ignore_errors=True)
+        self.files = {}
+
+    def register(self, table, columns, on_duplicate=''):
+        super().register(table, columns, on_duplicate)
+        self.files[table] = None
+
+    def _buffer(self, table, row):
+        spool = self.files[table]
+        if spool is None:
+            spool = self.files[table] = tempfile.NamedTemporaryFile(
+                'w', encoding='utf-8', newline='\n', prefix=f"{table}_", suffix='.tsv',
+                dir=self.directory, delete=False)
+        spool.write('\t'.join([tsv_field(value) for value in row]))
+        spool.write('\n')
+
+    def _write(self, table):
+        spool = self.files[table]
+        self.files[table] = None
+        spool.close()
+        try:
+            if self.on_duplicate[table]:
+                self._load_and_merge(table, spool.name)
+            else:
+                self._load(table, table, spool.name)
+        finally:
+            os.remove(spool.name)
+
+    def _load(self, table, target, path):
+        load_data_infile(self.cursor, target, self.columns[table], path)
+
+    def _load_and_merge(self, table, path):
+        staging = f"{table}_Staging"
+        columns = self.columns[table]
+        # Staged columns are renamed so the ON DUPLICATE KEY clause only sees the target table's names
+        staged = ', '.join([f"{column} AS Staged{i}" for i, column in enumerate(columns)])
+        self.cursor.execute(f'CREATE TEMPORARY TABLE IF NOT EXISTS {staging} LIKE {table}')
+        self.cursor.execute(f'TRUNCATE TABLE {staging}')
+        self._load(table, staging, path)
+        self.cursor.execute(f'''
+            INSERT INTO {table} ({', '.join(columns)})
+            SELECT * FROM (SELECT {staged} FROM {staging}) AS Staged
+            {self.on_duplicate[table]}
+        ''')
+        self.cursor.execute(f'DROP TEMPORARY TABLE {staging}')
+
+    # Discards spool files that were never loaded
+    def close(self):
+        for table, spool in self.files.items():
+            if spool is not None:
+                spool.close()
+                self.files[table] = None
+                self.pending[table] = 0
+        self._cleanup()
+
+# Writer implementations selectable with --loader
+WRITERS = {
+    'insert': BulkWriter,
+    'load-data': LoadDataWriter,
+}
@@ -0,0 +1,22 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+DATABASE_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOADER_PATH = os.path.join(DATABASE_DIRECTORY, '1-Insert-Sample-Data-To-Database.py')
+
+# The seeding package is imported from the database directory, as the scripts do
+sys.path.insert(0, DATABASE_DIRECTORY)
+
+# The loader reads its connection settings when it is imported; no server is contacted
+os.environ.setdefault('DATABASE_PORT', '3306')
+
+# Fixture importing the loader script as a module, fresh for each test so its globals start clean
+@pytest.fixture
+def loader():
+    spec = importlib.util.spec_from_file_location('seed_loader', LOADER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
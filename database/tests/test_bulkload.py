@@ -0,0 +1,77 @@
+from seeding.bulkload import begin_bulk_load, end_bulk_load, foreign_keys, verify_integrity
+from seeding.schema import HOT_PATH_INDEXES, drop_indexes, foreign_key_indexes
+
+# Foreign keys of the schema, as KEY_COLUMN_USAGE rows
+FOREIGN_KEY_ROWS = [
+    ('OrderDetails', 'orderdetails_ibfk_1', 'OrderID', 'Orders', 'OrderID'),
+    ('OrderDetails', 'orderdetails_ibfk_2', 'ProductID', 'Products', 'ProductID'),
+    ('Orders', 'orders_ibfk_1', 'CustomerID', 'Customers', 'CustomerID'),
+]
+
+# Cursor of a database holding every hot-path index, recording the statements run and
+# answering COUNT(*) queries with the given counts in turn
+class SchemaCursor:
+    def __init__(self, counts=()):
+        self.statements = []
+        self.counts = list(counts)
+        self.result = []
+
+    def execute(self, statement, params=None):
+        self.statements.append(' '.join(statement.split()))
+        if 'information_schema.KEY_COLUMN_USAGE' in statement:
+            self.result = FOREIGN_KEY_ROWS
+        elif 'information_schema.STATISTICS' in statement and 'NON_UNIQUE' in statement:
+            self.result = [('Customers', 'uq_customers_email', 'Email')]
+        elif 'information_schema.STATISTICS' in statement:
+            self.result = [(table, name) for table, name, _ in HOT_PATH_INDEXES]
+        elif 'COUNT(*)' in statement:
+            self.result = [(self.counts.pop(0),)]
+        else:
+            self.result = []
+
+    def fetchone(self):
+        return self.result[0]
+
+    def fetchall(self):
+        return self.result
+
+def test_foreign_keys_group_columns_per_constraint():
+    assert foreign_keys(SchemaCursor()) == [
+        ('OrderDetails', ['OrderID'], 'Orders', ['OrderID']),
+        ('OrderDetails', ['ProductID'], 'Products', ['ProductID']),
+        ('Orders', ['CustomerID'], 'Customers', ['CustomerID']),
+    ]
+
+def test_indexes_leading_with_a_foreign_key_are_not_dropped():
+    kept = {name for _, name, _ in foreign_key_indexes(SchemaCursor())}
+    assert kept == {'idx_orders_customer_orderdate', 'idx_orderdetails_product_order',
+                    'idx_orderdetails_order_product'}
+    cursor = SchemaCursor()
+    dropped = {name for _, names, _ in drop_indexes(cursor) for name in names}
+    assert dropped == {name for _, name, _ in HOT_PATH_INDEXES} - kept
+    statements = [statement for statement in cursor.statements if statement.startswith('ALTER TABLE')]
+    assert not any(name in statement for statement in statements for name in kept)
+    # OrderDetails only holds foreign key indexes, so it is not altered at all
+    assert not any(statement.startswith('ALTER TABLE OrderDetails') for statement in statements)
+
+def test_bulk_load_turns_checks_off_and_back_on():
+    cursor = SchemaCursor()
+    begin_bulk_load(cursor)
+    end_bulk_load(cursor)
+    assert cursor.statements == [
+        'SET SESSION foreign_key_checks = 0', 'SET SESSION unique_checks = 0',
+        'SET SESSION foreign_key_checks = 1', 'SET SESSION unique_checks = 1',
+    ]
+
+def test_integrity_problems_are_reported_per_key():
+    # Three foreign keys, then the unique email index
+    problems, checks, _ = verify_integrity(SchemaCursor(counts=[0, 2, 0, 1]))
+    assert checks == 4
+    assert problems == [
+        '2 rows of OrderDetails (ProductID) reference missing Products (ProductID) rows',
+        '1 values of unique key Customers.uq_customers_email (Email) are duplicated',
+    ]
+
+def test_intact_database_has_no_integrity_problems():
+    problems, checks, _ = verify_integrity(SchemaCursor(counts=[0, 0, 0, 0]))
+    assert problems == [] and checks == 4
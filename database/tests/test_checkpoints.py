@@ -0,0 +1,90 @@
+import argparse
+import datetime
+
+import mysql.connector
+import pytest
+from mysql.connector import errorcode
+
+from seeding.checkpoints import RETRY_MAX_DELAY, Checkpoint, is_retryable, retry_delay
+
+def lost_connection():
+    return mysql.connector.errors.OperationalError(msg="Lost connection", errno=errorcode.CR_SERVER_LOST)
+
+def test_only_listed_errors_are_retryable():
+    assert is_retryable(lost_connection())
+    assert is_retryable(mysql.connector.errors.DatabaseError(errno=errorcode.ER_LOCK_DEADLOCK))
+    assert not is_retryable(mysql.connector.errors.OperationalError(msg="Connection not available"))
+    assert not is_retryable(mysql.connector.errors.ProgrammingError(errno=errorcode.ER_NO_SUCH_TABLE))
+
+def test_retry_delay_doubles_up_to_the_maximum():
+    for attempt in range(1, 12):
+        delay = retry_delay(attempt)
+        assert min(2 ** (attempt - 1), RETRY_MAX_DELAY) * 0.5 <= delay <= min(2 ** (attempt - 1), RETRY_MAX_DELAY)
+
+# Fixture preparing the loader to run phases with checkpoints, without a server
+@pytest.fixture
+def checkpointed(loader, monkeypatch):
+    delays = []
+    monkeypatch.setattr(loader, 'checkpoints', {})
+    monkeypatch.setattr(loader, 'retries', 2)
+    monkeypatch.setattr(loader, 'reconnect', lambda: None)
+    monkeypatch.setattr(loader, 'load_checkpoints', lambda cursor: {})
+    monkeypatch.setattr(loader.time, 'sleep', delays.append)
+    loader.delays = delays
+    return loader
+
+# Function to make a phase failing with the given errors, in order, before it succeeds
+def failing_phase(*errors):
+    calls = []
+
+    def phase():
+        calls.append(len(calls))
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return 'done'
+    return phase, calls
+
+def test_run_phase_retries_a_lost_connection(checkpointed):
+    phase, calls = failing_phase(lost_connection())
+    assert checkpointed.run_phase('generate_orders_and_details', phase) == 'done'
+    assert len(calls) == 2
+    assert len(checkpointed.delays) == 1
+
+def test_run_phase_gives_up_after_the_retries(checkpointed):
+    phase, calls = failing_phase(*[lost_connection()] * 3)
+    with pytest.raises(mysql.connector.errors.OperationalError):
+        checkpointed.run_phase('generate_orders_and_details', phase)
+    assert len(calls) == 3
+
+def test_run_phase_does_not_retry_other_errors(checkpointed):
+    phase, calls = failing_phase(mysql.connector.errors.OperationalError(msg="Connection not available"))
+    with pytest.raises(mysql.connector.errors.OperationalError):
+        checkpointed.run_phase('generate_orders_and_details', phase)
+    assert len(calls) == 1
+
+def test_run_phase_does_not_retry_without_checkpoints(loader, monkeypatch):
+    monkeypatch.setattr(loader, 'checkpoints', None)
+    phase, calls = failing_phase(lost_connection())
+    with pytest.raises(mysql.connector.errors.OperationalError):
+        loader.run_phase('generate_orders_and_details', phase)
+    assert len(calls) == 1
+
+def test_run_phase_skips_a_phase_completed_before_the_connection_was_lost(checkpointed, monkeypatch):
+    monkeypatch.setattr(checkpointed, 'load_checkpoints',
+                        lambda cursor: {'generate_promotions': Checkpoint(0, True, None)})
+    phase, calls = failing_phase(lost_connection())
+    assert checkpointed.run_phase('generate_promotions', phase) is None
+    assert len(calls) == 1
+
+def test_resume_restores_the_options_of_the_interrupted_run(loader):
+    args = argparse.Namespace(
+        start_date=datetime.date(2024, 1, 1), orders_per_customer=loader.DEFAULT_ORDER_COUNTS, generator='python',
+        sessions=10, append=False, bcrypt_cost=4, credentials_format='csv', catalogue_variation=0.0, seed=7)
+    now = datetime.datetime(2024, 6, 1, 12, 0)
+    parameters = loader.run_parameters(args, 7, now, 300, 7, None, None)
+
+    resumed = argparse.Namespace(start_date=None, orders_per_customer=None, generator='numpy', sessions=0,
+                                 append=True, bcrypt_cost=12, credentials_format='text', catalogue_variation=0.5,
+                                 seed=None)
+    assert loader.resume_parameters(resumed, parameters) == (7, now, 300, 7, None, None)
+    assert resumed == args
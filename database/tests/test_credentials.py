@@ -0,0 +1,38 @@
+import pytest
+
+from seeding.credentials import (CREDENTIAL_FORMATS, credentials_path, format_credentials, open_credentials,
+                                 read_credentials, truncate_credentials)
+
+RECORDS = [(customer_id, f"Customer {customer_id}", f"customer{customer_id}@example.com", f"pw{customer_id}",
+            '1 Main Street', '555-0100') for customer_id in range(1, 6)]
+
+# Function to write the records to a credential file of the format, cut off partway through the last one
+def write_credentials(tmp_path, credential_format, cut_off=False):
+    path = credentials_path(str(tmp_path / 'credentials'), credential_format)
+    with open_credentials(path, credential_format) as credential_file:
+        credential_file.write(format_credentials(RECORDS, credential_format))
+    if cut_off:
+        with open(path, 'r+b') as credential_file:
+            credential_file.truncate(credential_file.seek(0, 2) - 5)
+    return path
+
+@pytest.mark.parametrize('credential_format', sorted(CREDENTIAL_FORMATS))
+def test_credentials_are_read_back(tmp_path, credential_format):
+    path = write_credentials(tmp_path, credential_format)
+    assert read_credentials(path) == [(customer_id, email, password)
+                                      for customer_id, _, email, password, _, _ in RECORDS]
+
+@pytest.mark.parametrize('credential_format', sorted(CREDENTIAL_FORMATS))
+def test_truncate_keeps_the_committed_customers(tmp_path, credential_format):
+    path = write_credentials(tmp_path, credential_format)
+    assert truncate_credentials(path, 3) == 3
+    assert [customer_id for customer_id, _, _ in read_credentials(path)] == [1, 2, 3]
+
+@pytest.mark.parametrize('credential_format', sorted(CREDENTIAL_FORMATS))
+def test_truncate_drops_a_record_cut_off(tmp_path, credential_format):
+    path = write_credentials(tmp_path, credential_format, cut_off=True)
+    assert truncate_credentials(path, 5) == 4
+    assert [customer_id for customer_id, _, _ in read_credentials(path)] == [1, 2, 3, 4]
+
+def test_truncate_without_a_file(tmp_path):
+    assert truncate_credentials(str(tmp_path / 'missing.txt'), 5) == 0
@@ -0,0 +1,27 @@
+from seeding.emails import DuplicateEmails, EmailFilter, disambiguate_email, email_digest
+
+def test_digest_ignores_case():
+    assert email_digest('Jane.Doe@Example.com') == email_digest('jane.doe@example.com')
+    assert email_digest('jane.doe@example.com') != email_digest('john.doe@example.com')
+
+def test_disambiguated_email_is_tagged_with_the_customer_id():
+    assert disambiguate_email('jane.doe@example.com', 1234) == 'jane.doe+1234@example.com'
+
+def test_filter_never_misses_an_added_email():
+    email_filter = EmailFilter(1000)
+    digests = [email_digest(f"customer{number}@example.com") for number in range(1000)]
+    for digest in digests:
+        email_filter.add(digest)
+    assert all(digest in email_filter for digest in digests)
+
+def test_only_repeated_emails_are_reported_whatever_their_order():
+    emails = [f"customer{number}@example.com" for number in range(500)] + ['customer7@example.com',
+                                                                         'CUSTOMER42@example.com']
+    for ordered in (emails, list(reversed(emails))):
+        duplicates = DuplicateEmails(len(ordered))
+        for email in ordered:
+            duplicates.add(email_digest(email))
+        assert duplicates.count == 2
+        assert 'customer7@example.com' in duplicates and 'customer42@example.com' in duplicates
+        # The two repeated emails, and at most a false positive
+        assert sum(f"customer{number}@example.com" in duplicates for number in range(500)) <= 3
@@ -0,0 +1,18 @@
+import bcrypt
+
+from seeding.hashing import BCRYPT_SALT_LENGTH, derive_salt, hash_password
+
+def test_derived_salts_repeat_per_seed_and_customer():
+    assert derive_salt(3, 42, 4) == derive_salt(3, 42, 4)
+    assert derive_salt(3, 42, 4) != derive_salt(3, 43, 4)
+    assert derive_salt(3, 42, 4) != derive_salt(4, 42, 4)
+
+def test_derived_salt_is_a_valid_bcrypt_salt():
+    salt = derive_salt(3, 42, 4)
+    assert len(salt) == BCRYPT_SALT_LENGTH and salt.startswith(b'$2b$04$')
+    hashed = hash_password('secret', 4, salt)
+    assert hashed.encode().startswith(salt)
+    assert bcrypt.checkpw(b'secret', hashed.encode())
+
+def test_passwords_get_a_random_salt_without_a_derived_one():
+    assert hash_password('secret', 4) != hash_password('secret', 4)
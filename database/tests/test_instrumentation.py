@@ -0,0 +1,30 @@
+import io
+import json
+
+from seeding.instrumentation import Instrumentation
+
+def test_log_starts_a_new_line_after_an_open_progress_line():
+    stream = io.StringIO()
+    instrumentation = Instrumentation('text', stream=stream)
+    instrumentation.progress_event('Adding customers', 50, 100, 10.0, 5.0, final=False)
+    instrumentation.log('Reconnecting')
+    assert stream.getvalue().endswith(')\nReconnecting\n')
+
+def test_shorter_progress_lines_overwrite_longer_ones():
+    stream = io.StringIO()
+    instrumentation = Instrumentation('text', stream=stream)
+    instrumentation.progress_event('Adding customers', 50, 100, 10.0, 5.0, final=False)
+    first = stream.getvalue()
+    instrumentation.progress_event('Adding customers', 100, 100, 10.0, None, final=True)
+    second = stream.getvalue()[len(first):]
+    assert len(second.rstrip('\n')) >= len(first)
+    instrumentation.log('Done')
+    assert stream.getvalue().endswith('\nDone\n') and not stream.getvalue().endswith('\n\nDone\n')
+
+def test_json_mode_writes_one_event_per_line():
+    stream = io.StringIO()
+    instrumentation = Instrumentation('json', stream=stream)
+    instrumentation.progress_event('Adding customers', 50, 100, 10.0, 5.0, final=False)
+    instrumentation.log('Reconnecting')
+    events = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [event['event'] for event in events] == ['progress', 'log']
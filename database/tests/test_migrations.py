@@ -0,0 +1,111 @@
+import re
+
+from seeding.migrations import (INITIAL_TABLES, MIGRATIONS, applied_versions, apply_migrations, migration_statements,
+                                pending_migrations, plan_initial_schema)
+
+# Cursor answering the information_schema lookups of the migration steps with the given tables
+class SchemaCursor:
+    def __init__(self, tables=()):
+        self.tables = tables
+        self.statements = []
+        self.result = []
+
+    def execute(self, statement, params=None):
+        self.statements.append(statement)
+        self.result = [(table,) for table in self.tables] if 'information_schema.TABLES' in statement else []
+
+    def fetchall(self):
+        return self.result
+
+def test_versions_are_numbered_in_order_from_one():
+    assert [migration.version for migration in MIGRATIONS] == list(range(1, len(MIGRATIONS) + 1))
+
+def test_pending_migrations_skip_applied_ones():
+    assert pending_migrations(set()) == MIGRATIONS
+    assert [migration.version for migration in pending_migrations({1, 2, 3})] == list(range(4, len(MIGRATIONS) + 1))
+    assert pending_migrations({migration.version for migration in MIGRATIONS}) == []
+
+def test_pending_migrations_stop_at_the_target():
+    assert [migration.version for migration in pending_migrations({1}, target=3)] == [2, 3]
+
+def test_pending_migrations_can_defer_index_only_ones():
+    deferred = pending_migrations(set(), defer_indexes=True)
+    assert all(not migration.index_only for migration in deferred)
+    assert len(deferred) == len(MIGRATIONS) - sum(migration.index_only for migration in MIGRATIONS)
+
+def test_initial_schema_creates_only_missing_tables():
+    assert plan_initial_schema(SchemaCursor()) == [ddl for _, ddl in INITIAL_TABLES]
+    # A database created before the migrations has every table, whatever the case of its names
+    assert plan_initial_schema(SchemaCursor([table.lower() for table, _ in INITIAL_TABLES])) == []
+    planned = plan_initial_schema(SchemaCursor(['Customers', 'Users']))
+    assert planned == [ddl for table, ddl in INITIAL_TABLES if table not in ('Customers', 'Users')]
+
+def test_migration_statements_resolve_planned_steps():
+    statements = migration_statements(SchemaCursor(), MIGRATIONS[0])
+    assert statements == [ddl for _, ddl in INITIAL_TABLES]
+
+def test_dry_run_only_reads_the_schema():
+    cursor = SchemaCursor()
+    results = apply_migrations(None, cursor, set(), dry_run=True)
+    assert [migration for migration, _, _ in results] == MIGRATIONS
+    assert all(statement.split()[0] == 'SELECT' for statement in cursor.statements)
+
+# Database keeping its tables and the SchemaVersion rows, of which only committed ones
+# survive the connection being closed, as with mysql-connector's autocommit off
+class MigratedDatabase:
+    def __init__(self):
+        self.tables = set()
+        self.versions = set()
+        self.uncommitted = set()
+        self.statements = []
+        self.result = []
+
+    def cursor(self):
+        return self
+
+    def commit(self):
+        self.versions |= self.uncommitted
+        self.uncommitted = set()
+
+    def close(self):
+        self.uncommitted = set()
+
+    def execute(self, statement, params=None):
+        self.statements.append(statement)
+        created = re.search(r'CREATE TABLE IF NOT EXISTS (\w+)', statement)
+        if created:
+            # DDL commits implicitly
+            self.commit()
+            self.tables.add(created.group(1))
+        elif statement.split()[0] in ('ALTER', 'CREATE', 'UPDATE'):
+            self.commit()
+        if 'INSERT INTO SchemaVersion' in statement:
+            self.uncommitted.add(params[0])
+        elif "TABLE_NAME = 'SchemaVersion'" in statement:
+            self.result = [(int('SchemaVersion' in self.tables),)]
+        elif 'information_schema.TABLES' in statement:
+            self.result = [(table,) for table in self.tables]
+        elif statement.startswith('SELECT Version FROM SchemaVersion'):
+            self.result = [(version,) for version in self.versions]
+        else:
+            self.result = []
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+    def fetchall(self):
+        return self.result
+
+def test_every_applied_migration_is_committed():
+    database = MigratedDatabase()
+    apply_migrations(database, database, applied_versions(database))
+    database.close()
+    assert database.versions == {migration.version for migration in MIGRATIONS}
+
+def test_migrating_a_migrated_database_applies_nothing():
+    database = MigratedDatabase()
+    apply_migrations(database, database, applied_versions(database))
+    database.close()
+    executed = len(database.statements)
+    assert apply_migrations(database, database, applied_versions(database)) == []
+    assert all(statement.lstrip().startswith('SELECT') for statement in database.statements[executed:])
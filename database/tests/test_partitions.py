@@ -0,0 +1,90 @@
+import datetime
+
+from seeding.partitions import next_period, partition_bounds, partition_definitions, periods_ahead, \
+    plan_future_partitions, plan_partitioning
+
+# Cursor of a database with the given partitions (as information_schema.PARTITIONS rows),
+# foreign keys on the order tables and OrderDetails.OrderDate column, or not
+class PartitionCursor:
+    def __init__(self, partitions=(), foreign_keys=(), dated_details=False):
+        self.partitions = list(partitions)
+        self.foreign_keys = list(foreign_keys)
+        self.dated_details = dated_details
+        self.result = []
+
+    def execute(self, statement, params=None):
+        if 'information_schema.PARTITIONS' in statement:
+            self.result = self.partitions
+        elif 'information_schema.REFERENTIAL_CONSTRAINTS' in statement:
+            self.result = self.foreign_keys
+        elif 'information_schema.COLUMNS' in statement:
+            self.result = [(int(self.dated_details),)]
+
+    def fetchone(self):
+        return self.result[0]
+
+    def fetchall(self):
+        return self.result
+
+# Function to squeeze the whitespace of planned statements
+def squeezed(statements):
+    return [' '.join(statement.split()) for statement in statements]
+
+def test_periods_roll_over_the_year():
+    assert next_period(datetime.date(2024, 12, 15), 'month') == datetime.date(2025, 1, 1)
+    assert next_period(datetime.date(2024, 3, 1), 'month') == datetime.date(2024, 4, 1)
+    assert next_period(datetime.date(2024, 3, 1), 'year') == datetime.date(2025, 1, 1)
+    assert periods_ahead(datetime.date(2024, 11, 20), 'month', 3) == datetime.date(2025, 2, 1)
+
+def test_bounds_cover_every_period_of_the_range():
+    assert partition_bounds(datetime.date(2024, 11, 1), datetime.date(2025, 1, 31), 'month') == [
+        ('p202411', datetime.date(2024, 12, 1)), ('p202412', datetime.date(2025, 1, 1)),
+        ('p202501', datetime.date(2025, 2, 1))]
+    assert partition_bounds(datetime.date(2023, 1, 1), datetime.date(2024, 6, 1), 'year') == [
+        ('p2023', datetime.date(2024, 1, 1)), ('p2024', datetime.date(2025, 1, 1))]
+    assert partition_definitions([('p2023', datetime.date(2024, 1, 1))]) == \
+        "PARTITION p2023 VALUES LESS THAN ('2024-01-01'), PARTITION pmax VALUES LESS THAN (MAXVALUE)"
+
+def test_partitioning_drops_foreign_keys_and_dates_order_details():
+    cursor = PartitionCursor(foreign_keys=[('OrderDetails', 'orderdetails_ibfk_1'),
+                                           ('PaymentDetails', 'payment_ibfk_1')])
+    statements = squeezed(plan_partitioning(cursor, 'year', datetime.date(2023, 1, 1), datetime.date(2024, 1, 1)))
+    assert statements[:3] == [
+        'ALTER TABLE OrderDetails DROP FOREIGN KEY orderdetails_ibfk_1',
+        'ALTER TABLE PaymentDetails DROP FOREIGN KEY payment_ibfk_1',
+        'ALTER TABLE OrderDetails ADD COLUMN OrderDate DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP',
+    ]
+    assert statements[3].startswith('UPDATE OrderDetails od JOIN Orders o')
+    partitioned = statements[4:]
+    assert [statement.split()[2] for statement in partitioned] == ['Orders', 'OrderDetails', 'PaymentDetails']
+    assert 'ADD PRIMARY KEY (PaymentID, PaymentDate) PARTITION BY RANGE COLUMNS (PaymentDate)' in partitioned[2]
+    assert partitioned[0].endswith("(PARTITION p2023 VALUES LESS THAN ('2024-01-01'), "
+                                   "PARTITION p2024 VALUES LESS THAN ('2025-01-01'), "
+                                   "PARTITION pmax VALUES LESS THAN (MAXVALUE))")
+
+def test_partitioned_tables_are_left_as_they_are():
+    partitions = [(table, name, description) for table in ('Orders', 'OrderDetails', 'PaymentDetails')
+                  for name, description in (('p2024', "'2025-01-01'"), ('pmax', 'MAXVALUE'))]
+    assert plan_partitioning(PartitionCursor(partitions), 'year', datetime.date(2023, 1, 1),
+                             datetime.date(2024, 1, 1)) == []
+    # Only the table that is not partitioned yet is, and OrderDetails already has its OrderDate
+    cursor = PartitionCursor([row for row in partitions if row[0] != 'Orders'], dated_details=True)
+    statements = squeezed(plan_partitioning(cursor, 'year', datetime.date(2023, 1, 1), datetime.date(2024, 1, 1)))
+    assert len(statements) == 1 and statements[0].startswith('ALTER TABLE Orders MODIFY OrderDate')
+
+def test_future_partitions_are_split_off_pmax():
+    cursor = PartitionCursor([
+        ('Orders', 'p202410', "'2024-11-01 00:00:00'"), ('Orders', 'p202411', "'2024-12-01 00:00:00'"),
+        ('Orders', 'pmax', 'MAXVALUE'),
+        ('PaymentDetails', 'p2024', "'2025-01-01'"), ('PaymentDetails', 'pmax', 'MAXVALUE'),
+    ])
+    assert plan_future_partitions(cursor, datetime.date(2024, 11, 20), 2) == [
+        "ALTER TABLE Orders REORGANIZE PARTITION pmax INTO (PARTITION p202412 VALUES LESS THAN ('2025-01-01'), "
+        "PARTITION p202501 VALUES LESS THAN ('2025-02-01'), PARTITION pmax VALUES LESS THAN (MAXVALUE))",
+        "ALTER TABLE PaymentDetails REORGANIZE PARTITION pmax INTO (PARTITION p2025 VALUES LESS THAN ('2026-01-01'), "
+        "PARTITION p2026 VALUES LESS THAN ('2027-01-01'), PARTITION pmax VALUES LESS THAN (MAXVALUE))",
+    ]
+    # Orders already has a partition for the month after October, so only PaymentDetails gets one
+    assert plan_future_partitions(cursor, datetime.date(2024, 10, 5), 1) == [
+        "ALTER TABLE PaymentDetails REORGANIZE PARTITION pmax INTO (PARTITION p2025 VALUES LESS THAN ('2026-01-01'), "
+        "PARTITION pmax VALUES LESS THAN (MAXVALUE))"]
@@ -0,0 +1,85 @@
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from seeding.pipeline import Stage, StageStats, format_stage_stats, run_pipeline
+
+# Function to run a pipeline on another thread, failing the test instead of hanging if it never finishes
+def finished_pipeline(stages, timeout=10):
+    outcome = {}
+
+    def run():
+        try:
+            outcome['result'] = run_pipeline(stages)
+        except Exception as err:
+            outcome['error'] = err
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "the pipeline did not shut down"
+    assert all(not stage.thread.is_alive() for stage in stages)
+    return outcome
+
+def test_items_flow_through_every_stage_in_order():
+    collected, exported = [], []
+    source = Stage('source', source=range(100), queue_size=2)
+    doubled = Stage('double', lambda item: item * 2, queue_size=2)
+    # None results are dropped instead of being passed on
+    even = Stage('even', lambda item: item if item % 4 == 0 else None, queue_size=2)
+    write = Stage('write', collected.append, queue_size=2)
+    export = Stage('export', exported.append, queue_size=2)
+    source.feeds(doubled)
+    doubled.feeds(even)
+    even.feeds(write, export)
+    seconds, stats = finished_pipeline([source, doubled, even, write, export])['result']
+    assert collected == exported == [item * 2 for item in range(0, 100, 2)]
+    assert [(stage.name, stage.items) for stage in stats] == [
+        ('source', 100), ('double', 100), ('even', 100), ('write', 50), ('export', 50)]
+
+def test_pool_results_keep_their_input_order():
+    collected = []
+    with ThreadPoolExecutor(4) as executor:
+        source = Stage('source', source=range(50))
+        square = Stage('square', lambda item: item * item, executor=executor, window=8)
+        write = Stage('write', collected.append)
+        source.feeds(square)
+        square.feeds(write)
+        finished_pipeline([source, square, write])
+    assert collected == [item * item for item in range(50)]
+
+@pytest.mark.parametrize('failing', ['source', 'middle', 'pool', 'last'])
+def test_an_error_in_any_stage_stops_the_pipeline_and_is_raised(failing):
+    consumed = []
+
+    def fail_at(item):
+        if item == 5:
+            raise ValueError(f"failed at {item}")
+        return item
+
+    def source_items():
+        for item in itertools.count():
+            consumed.append(item)
+            if failing == 'source':
+                fail_at(item)
+            yield item
+
+    with ThreadPoolExecutor(2) as executor:
+        source = Stage('source', source=source_items(), queue_size=1)
+        middle = Stage('middle', fail_at if failing == 'middle' else lambda item: item, queue_size=1)
+        pool = Stage('pool', fail_at if failing == 'pool' else lambda item: item, executor=executor, window=2,
+                     queue_size=1)
+        last = Stage('last', fail_at if failing == 'last' else lambda item: None, queue_size=1)
+        source.feeds(middle)
+        middle.feeds(pool)
+        pool.feeds(last)
+        outcome = finished_pipeline([source, middle, pool, last])
+    assert str(outcome['error']) == 'failed at 5'
+    # The source is an endless iterator: it only stops because the failure cancelled it
+    assert len(consumed) < 100
+
+def test_the_busiest_stage_is_the_bottleneck():
+    lines = format_stage_stats([StageStats('hash', 10, 0.9, 0.05, 0.0), StageStats('write', 10, 0.2, 0.7, 0.0)])
+    assert lines == ['Stage hash: 10 items, busy 90%, starved 5%, blocked 0% (bottleneck)',
+                     'Stage write: 10 items, busy 20%, starved 70%, blocked 0%']
@@ -0,0 +1,82 @@
+import datetime
+import sqlite3
+
+import pytest
+
+from seeding.rollups import DERIVED_TABLES, committed_orders, rebuild_derived_tables, require_order_columns
+from seeding.schema import ORDER_GENERATED_COLUMNS
+
+# Cursor over an SQLite database taking the MySQL placeholders
+class SqliteCursor:
+    def __init__(self, conn):
+        self.cursor = conn.cursor()
+
+    def execute(self, statement, params=()):
+        self.cursor.execute(statement.replace('%s', '?'), params)
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+# Function to create an Orders table holding the given IDs
+def orders_cursor(order_ids):
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE Orders (OrderID INTEGER PRIMARY KEY)')
+    conn.executemany('INSERT INTO Orders VALUES (?)', [(order_id,) for order_id in order_ids])
+    return SqliteCursor(conn)
+
+def test_all_orders_are_folded_without_gaps():
+    assert committed_orders(orders_cursor(range(1, 101)), 40) == (100, 60)
+
+def test_folding_stops_before_a_recent_gap():
+    # OrderID 95 may belong to a transaction that has not committed yet
+    cursor = orders_cursor([order_id for order_id in range(1, 101) if order_id != 95])
+    assert committed_orders(cursor, 40, lag=10) == (94, 54)
+
+def test_gaps_older_than_the_lag_are_folded_past():
+    # A gap this far behind the newest order is a rolled-back insert
+    cursor = orders_cursor([order_id for order_id in range(1, 101) if order_id != 50])
+    assert committed_orders(cursor, 40, lag=10) == (100, 59)
+
+def test_nothing_is_folded_past_the_watermark():
+    assert committed_orders(orders_cursor(range(1, 11)), 10) == (10, 0)
+    assert committed_orders(orders_cursor([]), 0) == (0, 0)
+
+# Cursor of a database without orders, recording the statements run
+class EmptyOrdersCursor:
+    def __init__(self, order_columns):
+        self.order_columns = order_columns
+        self.statements = []
+        self.result = []
+
+    def execute(self, statement, params=None):
+        self.statements.append(' '.join(statement.split()))
+        if 'information_schema.COLUMNS' in statement:
+            self.result = [(column,) for column in self.order_columns]
+        elif statement.startswith('SELECT LastOrderID'):
+            self.result = []
+        else:
+            self.result = [(0,)]
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+    def fetchall(self):
+        return self.result
+
+    @property
+    def rowcount(self):
+        return 0
+
+def test_refresh_requires_the_generated_order_columns():
+    with pytest.raises(ValueError, match='OrderHour'):
+        rebuild_derived_tables(EmptyOrdersCursor([]), datetime.datetime(2024, 1, 1))
+    require_order_columns(EmptyOrdersCursor([name for name, _ in ORDER_GENERATED_COLUMNS]))
+
+def test_rebuild_clears_the_watermarks_and_truncates_every_derived_table():
+    cursor = EmptyOrdersCursor([name for name, _ in ORDER_GENERATED_COLUMNS])
+    rebuild_derived_tables(cursor, datetime.datetime(2024, 1, 1))
+    assert cursor.statements[0].startswith('DELETE FROM RollupWatermarks')
+    assert cursor.statements[1:len(DERIVED_TABLES) + 1] == [f'TRUNCATE TABLE {table}' for table in DERIVED_TABLES]
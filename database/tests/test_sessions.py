@@ -0,0 +1,73 @@
+import datetime
+
+from seeding.sessions import ABANDONED_WINDOW, ACTIVE_WINDOW, MAX_CART_QUANTITY, guest_session_id, \
+    register_session_tables, write_sessions
+from seeding.writers import BulkWriter
+
+NOW = datetime.datetime(2024, 6, 30, 12, 0, 0)
+PRODUCT_IDS = list(range(1, 31))
+
+# Cursor keeping the rows of every multi-row INSERT, per table
+class RecordingCursor:
+    def __init__(self):
+        self.rows = {}
+
+    def executemany(self, statement, rows):
+        self.rows.setdefault(statement.split()[2], []).extend(rows)
+
+# Function to write sessions, returning (sessions, cart items, rows per table, progress reports)
+def written_sessions(count, seed=9, last_customer_id=1000, first_cart_item_id=1):
+    cursor = RecordingCursor()
+    writer = BulkWriter(cursor)
+    register_session_tables(writer)
+    reports = []
+    sessions, cart_items = write_sessions(writer, count, seed, NOW, last_customer_id, PRODUCT_IDS, first_cart_item_id,
+                                          progress=reports.append)
+    writer.flush()
+    return sessions, cart_items, cursor.rows, reports
+
+def test_guest_session_ids_follow_the_backend_format():
+    assert guest_session_id(datetime.datetime(2024, 6, 3, 9, 5, 7)) == 3062024090507
+
+def test_sessions_belong_to_customers_or_guests():
+    sessions, _, rows, reports = written_sessions(400)
+    assert sessions == len(rows['ShoppingSession']) == 400 and reports == [400]
+    customers = [row for row in rows['ShoppingSession'] if row[1] is not None]
+    guests = [row for row in rows['ShoppingSession'] if row[1] is None]
+    # Logged-in sessions use the CustomerID as SessionID, once per customer
+    assert len(customers) == 300
+    assert all(session_id == user_id and 1 <= user_id <= 1000 for session_id, user_id, _, _, _ in customers)
+    assert len({row[0] for row in customers}) == len(customers)
+    # Guest IDs are unique and above every CustomerID
+    assert len({row[0] for row in guests}) == len(guests) == 100
+    assert all(session_id > 1000 for session_id, _, _, _, _ in guests)
+
+def test_sessions_are_active_or_abandoned():
+    _, _, rows, _ = written_sessions(400)
+    for _, _, total, created_at, modified_at in rows['ShoppingSession']:
+        assert total == 0
+        assert created_at <= modified_at <= NOW
+        assert NOW - modified_at <= ABANDONED_WINDOW
+    active = sum(NOW - row[4] <= ACTIVE_WINDOW for row in rows['ShoppingSession'])
+    assert 0 < active < 400
+
+def test_cart_items_are_distinct_products_added_during_the_session():
+    _, cart_items, rows, _ = written_sessions(200, first_cart_item_id=501)
+    assert [row[0] for row in rows['CartItem']] == list(range(501, 501 + cart_items))
+    sessions = {row[0]: row for row in rows['ShoppingSession']}
+    carts = {}
+    for _, session_id, product_id, quantity, date_added in rows['CartItem']:
+        _, _, _, created_at, modified_at = sessions[session_id]
+        assert created_at <= date_added <= modified_at
+        assert 1 <= quantity <= MAX_CART_QUANTITY
+        carts.setdefault(session_id, []).append(product_id)
+    assert set(carts) == set(sessions)
+    assert all(len(products) == len(set(products)) for products in carts.values())
+
+def test_sessions_repeat_per_seed():
+    assert written_sessions(100) == written_sessions(100)
+    assert written_sessions(100)[2] != written_sessions(100, seed=10)[2]
+
+def test_few_customers_leave_the_other_sessions_to_guests():
+    _, _, rows, _ = written_sessions(100, last_customer_id=10)
+    assert sorted(row[1] for row in rows['ShoppingSession'] if row[1] is not None) == list(range(1, 11))
@@ -0,0 +1,70 @@
+import datetime
+
+from seeding.orders import DEFAULT_ORDER_COUNTS, OrderAggregates, OrderSettings, count_orders, register_order_tables, \
+    write_orders
+from seeding.shards import plan_id_offsets, split_customer_range
+from seeding.writers import BulkWriter
+
+SETTINGS = OrderSettings(9, datetime.date(2023, 1, 1), datetime.datetime(2024, 6, 30, 12, 0, 0), DEFAULT_ORDER_COUNTS)
+PRODUCTS = {product_id: (round(2 + product_id * 0.5, 2), round(1 + product_id * 0.25, 2))
+            for product_id in range(1, 21)}
+
+# Cursor keeping the rows of every multi-row INSERT, per table
+class RecordingCursor:
+    def __init__(self):
+        self.rows = {}
+
+    def executemany(self, statement, rows):
+        self.rows.setdefault(statement.split()[2], []).extend(rows)
+
+# Function to write the orders of the customers first..last, each shard numbering its
+# rows from its planned offsets. Returns the rows written per table.
+def sharded_rows(first, last, shards):
+    cursor = RecordingCursor()
+    ranges = split_customer_range(first, last, shards)
+    offsets = plan_id_offsets([count_orders(SETTINGS, start, end) for start, end in ranges], 1, 1)
+    for (start, end), (order_id, order_detail_id) in zip(ranges, offsets):
+        writer = BulkWriter(cursor)
+        register_order_tables(writer)
+        write_orders(writer, range(start, end + 1), SETTINGS, PRODUCTS, order_id, order_detail_id, OrderAggregates())
+        writer.flush()
+    return cursor.rows
+
+def test_ranges_cover_every_customer_once():
+    for shards in (1, 2, 3, 7, 50):
+        ranges = split_customer_range(1, 40, shards)
+        assert [customer_id for start, end in ranges for customer_id in range(start, end + 1)] == list(range(1, 41))
+        sizes = [end - start + 1 for start, end in ranges]
+        assert len(ranges) == min(shards, 40) and max(sizes) - min(sizes) <= 1
+
+def test_offsets_follow_the_preceding_shards_counts():
+    assert plan_id_offsets([(3, 10), (2, 4), (5, 9)], 101, 1001) == [(101, 1001), (104, 1011), (106, 1015)]
+
+def test_orders_are_the_same_for_any_shard_count():
+    single = sharded_rows(1, 60, 1)
+    assert single['Orders'] and single['OrderDetails'] and single['PaymentDetails']
+    for shards in (2, 3, 8):
+        assert sharded_rows(1, 60, shards) == single
+
+def test_shards_generate_the_same_customers_and_ids(loader, tmp_path):
+    # The loader's globals are never set here: shards only depend on the context they are handed
+    context = loader.ShardContext('insert', 'null', str(tmp_path), False, 0, 'text', str(tmp_path / 'credentials'),
+                                  'off')
+
+    def run(shards):
+        ranges = split_customer_range(1, 30, shards)
+        offsets = plan_id_offsets([count_orders(SETTINGS, start, end) for start, end in ranges], 1, 1)
+        results = [loader.run_shard(context, index, start, end, order_id, order_detail_id, SETTINGS, 4, None,
+                                    PRODUCTS, None, False, 9)
+                   for index, ((start, end), (order_id, order_detail_id)) in enumerate(zip(ranges, offsets))]
+        credentials = ''.join((tmp_path / f"credentials.shard{index}").read_text() for index in range(len(ranges)))
+        max_ids = {}
+        for result in results:
+            for table, max_id in result['sink_max_ids'].items():
+                max_ids[table] = max(max_ids.get(table, 0), max_id)
+        return (sum(result['orders'] for result in results), sum(result['order_details'] for result in results),
+                max_ids, credentials)
+
+    single = run(1)
+    assert single[2]['Customers'] == 30 and single[2]['Orders'] == single[0]
+    assert run(3) == single
@@ -0,0 +1,76 @@
+import datetime
+
+import mysql.connector
+import pytest
+
+from seeding.rollups import DAILY_PRODUCT_SALES_COLUMNS, DAILY_PRODUCT_SALES_UPSERT
+from seeding.sinks import NullDatabase, StandinConnection, StandinDatabase
+
+@pytest.fixture
+def cursor():
+    return StandinConnection(NullDatabase(None)).cursor()
+
+SALES_UPSERT = f"INSERT INTO DailyProductSales ({', '.join(DAILY_PRODUCT_SALES_COLUMNS)}) " \
+               f"VALUES (%s, %s, %s, %s, %s) {DAILY_PRODUCT_SALES_UPSERT}"
+
+def test_upserts_merge_rows_by_key(cursor):
+    january, march = datetime.date(2024, 1, 1), datetime.date(2024, 3, 1)
+    cursor.executemany(SALES_UPSERT, [(january, 1, 2, 10, 4), (march, 1, 1, 5, 2)])
+    assert cursor.rowcount == 2
+    cursor.executemany(SALES_UPSERT, [(january, 1, 1, 4, 1)])
+    assert cursor.rowcount == 2  # An updated row counts 2, as in MySQL
+    cursor.execute('SELECT SalesDate, ProductID, Quantity, Revenue, Cost FROM DailyProductSales '
+                   'WHERE SalesDate = %s', (january,))
+    assert cursor.fetchall() == [(january, 1, 3, 14, 5)]
+    assert cursor.database.row_counts() == {'DailyProductSales': 2}
+
+def test_watermarks_are_upserted_and_read_back(cursor):
+    for last_order_id in (10, 25):
+        cursor.execute('''
+            INSERT INTO RollupWatermarks (RollupName, LastOrderID, UpdatedAt)
+            VALUES (%s, %s, NOW())
+            ON DUPLICATE KEY UPDATE LastOrderID = VALUES(LastOrderID), UpdatedAt = VALUES(UpdatedAt)
+        ''', ('DailyProductSales', last_order_id))
+    cursor.execute('SELECT LastOrderID FROM RollupWatermarks WHERE RollupName = %s FOR UPDATE', ('DailyProductSales',))
+    assert cursor.fetchone() == (25,)
+
+def test_deletes_remove_upserted_rows(cursor):
+    cursor.executemany('INSERT INTO OrderPatterns (ProductID, OrderHour, OrderCount) VALUES (%s, %s, %s) '
+                       'ON DUPLICATE KEY UPDATE OrderCount = VALUES(OrderCount)', [(1, 9, 4), (2, 9, 3), (3, 18, 1)])
+    cursor.execute('DELETE FROM OrderPatterns WHERE ProductID IN (%s, %s)', (1, 3))
+    assert cursor.rowcount == 2
+    assert cursor.database.row_counts() == {'OrderPatterns': 1}
+
+def test_customer_lookups_follow_the_inserted_ids(cursor):
+    cursor.executemany('INSERT INTO Customers (CustomerID, Name) VALUES (%s, %s)',
+                       [(customer_id, 'Jane') for customer_id in (1, 2, 5, 9)])
+    cursor.execute('SELECT COUNT(*) FROM Customers WHERE CustomerID < %s', (5,))
+    assert cursor.fetchone() == (2,)
+    cursor.execute('SELECT COUNT(*) FROM Customers WHERE CustomerID > %s', (5,))
+    assert cursor.fetchone() == (1,)
+    cursor.execute('SELECT COALESCE(MAX(CustomerID), 0) FROM Customers')
+    assert cursor.fetchone() == (9,)
+
+@pytest.mark.parametrize('statement', [
+    'UPDATE Products SET Ranking = 1',
+    'SELECT Name FROM Customers WHERE Email = %s',
+    'INSERT INTO PopularProducts (ProductID, PopularityScore) VALUES (%s, %s) '
+    'ON DUPLICATE KEY UPDATE PopularityScore = PopularityScore * 2',
+])
+def test_unmodelled_statements_raise(cursor, statement):
+    cursor.executemany('INSERT INTO Customers (CustomerID, Name) VALUES (%s, %s)', [(1, 'Jane')])
+    with pytest.raises(mysql.connector.errors.NotSupportedError):
+        cursor.execute(statement, ('x', 1))
+
+def test_plain_rows_and_upserts_do_not_mix(cursor):
+    cursor.executemany('INSERT INTO PopularProducts (ProductID, PopularityScore) VALUES (%s, %s)', [(1, 5)])
+    with pytest.raises(mysql.connector.errors.NotSupportedError):
+        cursor.executemany('INSERT INTO PopularProducts (ProductID, PopularityScore) VALUES (%s, %s) '
+                           'ON DUPLICATE KEY UPDATE PopularityScore = PopularityScore + VALUES(PopularityScore)',
+                           [(1, 2)])
+
+def test_stand_ins_must_store_rows():
+    class Unstored(StandinDatabase):
+        pass
+    with pytest.raises(TypeError):
+        Unstored(None)
@@ -0,0 +1,137 @@
+import datetime
+import re
+import sqlite3
+import zipfile
+
+import pytest
+
+from seeding.snapshots import restore_snapshot, save_snapshot, snapshot_key, snapshot_path
+
+# Schema of the database the snapshots are taken from, as {table: [column definitions]}
+TABLES = {
+    'Customers': ['CustomerID INTEGER PRIMARY KEY', 'FirstName TEXT', 'Email TEXT', 'CreatedAt TEXT'],
+    'Orders': ['OrderID INTEGER PRIMARY KEY', 'CustomerID INTEGER', 'Notes TEXT'],
+    'SchemaVersion': ['Version INTEGER PRIMARY KEY'],
+}
+
+CUSTOMERS = [
+    (1, 'Ann', 'ann@example.com', '2024-01-02 03:04:05'),
+    (2, 'Tab\there', 'back\\slash@example.com', '2024-01-03 00:00:00'),
+    (3, 'Line\nbreak', None, '2024-01-04 00:00:00'),
+]
+ORDERS = [(10, 1, 'first'), (11, 3, None)]
+
+# MySQL connection over an in-memory SQLite database answering the statements the
+# snapshots issue: information_schema lookups, session variables and LOAD DATA
+class SnapshotConnection:
+    def __init__(self, foreign_key_checks=1, unique_checks=1):
+        self.db = sqlite3.connect(':memory:')
+        for table, columns in TABLES.items():
+            self.db.execute(f"CREATE TABLE {table} ({', '.join(columns)})")
+        self.session = {'FOREIGN_KEY_CHECKS': foreign_key_checks, 'UNIQUE_CHECKS': unique_checks}
+        self.statements = []
+
+    def cursor(self):
+        return SnapshotCursor(self)
+
+# Cursor of a SnapshotConnection
+class SnapshotCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rows = iter([])
+
+    def execute(self, statement, params=()):
+        statement = ' '.join(statement.split())
+        self.conn.statements.append(statement)
+        if 'information_schema.COLUMNS' in statement:
+            rows = [(table, column.split()[0]) for table, columns in TABLES.items() if table not in params
+                    for column in columns]
+        elif statement.startswith('SELECT @@'):
+            rows = [tuple(self.conn.session[name] for name in re.findall(r'@@(\w+)', statement))]
+        elif statement.startswith('SET '):
+            name, value = re.match(r'SET (\w+) = (\d+)', statement).groups()
+            self.conn.session[name] = int(value)
+            rows = []
+        elif statement.startswith('LOAD DATA'):
+            table, columns = re.search(r'INTO TABLE (\w+) .* \((.*)\)$', statement).groups()
+            with open(params[0], encoding='utf-8') as source:
+                loaded = [[tsv_value(field) for field in line.rstrip('\n').split('\t')] for line in source]
+            placeholders = ', '.join(['?'] * len(columns.split(',')))
+            self.conn.db.executemany(f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", loaded)
+            rows = []
+        else:
+            rows = self.conn.db.execute(statement).fetchall()
+        self.rows = iter(rows)
+
+    def fetchone(self):
+        return next(self.rows, None)
+
+    def fetchall(self):
+        return list(self.rows)
+
+    def fetchmany(self, size):
+        return [row for _, row in zip(range(size), self.rows)]
+
+    def close(self):
+        pass
+
+# Function to read one field of a LOAD DATA TSV file back
+def tsv_value(field):
+    if field == '\\N':
+        return None
+    return re.sub(r'\\(.)', lambda match: {'t': '\t', 'n': '\n', 'r': '\r'}.get(match.group(1), match.group(1)), field)
+
+# Function to fill a database with the sample rows
+def filled_connection():
+    conn = SnapshotConnection()
+    conn.db.executemany('INSERT INTO Customers VALUES (?, ?, ?, ?)', CUSTOMERS)
+    conn.db.executemany('INSERT INTO Orders VALUES (?, ?, ?)', ORDERS)
+    conn.db.execute('INSERT INTO SchemaVersion VALUES (8)')
+    return conn
+
+def test_snapshot_key_depends_on_every_parameter():
+    assert snapshot_key({'seed': 1, 'customers': 300}) == snapshot_key({'customers': 300, 'seed': 1})
+    assert snapshot_key({'seed': 1, 'customers': 300}) != snapshot_key({'seed': 2, 'customers': 300})
+
+def test_snapshot_round_trip_restores_rows_and_credentials(tmp_path):
+    credentials = tmp_path / 'passwords.csv'
+    credentials.write_text('email,password\nann@example.com,secret\n')
+    path = snapshot_path(str(tmp_path / 'snapshots'), snapshot_key({'seed': 1}))
+    rows = save_snapshot(filled_connection(), path, {'seed': 1}, datetime.datetime(2024, 1, 5))
+    assert rows == {'Customers': 3, 'Orders': 2}
+    save_snapshot(filled_connection(), path, {'seed': 1}, datetime.datetime(2024, 1, 5), str(credentials))
+    with zipfile.ZipFile(path) as archive:
+        assert sorted(archive.namelist()) == ['Customers.tsv', 'Orders.tsv', 'credentials.csv', 'manifest.json']
+
+    restored = SnapshotConnection()
+    manifest, credential_path = restore_snapshot(restored.cursor(), path, str(tmp_path / 'out.txt'))
+    assert manifest['key'] == snapshot_key({'seed': 1})
+    assert restored.db.execute('SELECT * FROM Customers ORDER BY CustomerID').fetchall() == CUSTOMERS
+    assert restored.db.execute('SELECT * FROM Orders ORDER BY OrderID').fetchall() == ORDERS
+    # The schema version belongs to the migrations of the restored database
+    assert restored.db.execute('SELECT * FROM SchemaVersion').fetchall() == []
+    assert credential_path == str(tmp_path / 'out.csv')
+    assert open(credential_path).read() == credentials.read_text()
+
+def test_restore_puts_the_session_checks_back_as_they_were(tmp_path):
+    path = str(tmp_path / 'snapshot.zip')
+    save_snapshot(filled_connection(), path, {'seed': 1}, datetime.datetime(2024, 1, 5))
+    for checks in ((1, 1), (0, 0), (0, 1)):
+        restored = SnapshotConnection(*checks)
+        restore_snapshot(restored.cursor(), path, str(tmp_path / 'credentials.csv'))
+        assert (restored.session['FOREIGN_KEY_CHECKS'], restored.session['UNIQUE_CHECKS']) == checks
+        assert 'SET FOREIGN_KEY_CHECKS = 0' in restored.statements
+
+def test_restore_refuses_tables_that_hold_rows(tmp_path):
+    path = str(tmp_path / 'snapshot.zip')
+    save_snapshot(filled_connection(), path, {'seed': 1}, datetime.datetime(2024, 1, 5))
+    with pytest.raises(ValueError, match='Customers, Orders'):
+        restore_snapshot(filled_connection().cursor(), path, str(tmp_path / 'credentials.csv'))
+
+def test_failed_save_leaves_no_snapshot(tmp_path):
+    conn = filled_connection()
+    conn.db.execute('DROP TABLE Orders')
+    path = str(tmp_path / 'snapshot.zip')
+    with pytest.raises(sqlite3.OperationalError):
+        save_snapshot(conn, path, {'seed': 1}, datetime.datetime(2024, 1, 5))
+    assert list(tmp_path.iterdir()) == []
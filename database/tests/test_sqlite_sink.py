@@ -0,0 +1,80 @@
+import os
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+from conftest import DATABASE_DIRECTORY, LOADER_PATH
+
+CUSTOMERS = 300
+
+# Fixture seeding 300 customers into the SQLite sink once, returning the database
+@pytest.fixture(scope='module')
+def seeded(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('sqlite_sink')
+    path = str(directory / 'seed.sqlite3')
+    result = subprocess.run(
+        [sys.executable, LOADER_PATH, '--sink', 'sqlite', '--sink-path', path, '--customers', str(CUSTOMERS),
+         '--bcrypt-cost', '4', '--hash-workers', '2', '--seed', '3', '--instrumentation', 'off',
+         '--credentials-path', str(directory / 'credentials.txt')],
+        cwd=DATABASE_DIRECTORY, env={**os.environ, 'DATABASE_PORT': '3306'}, capture_output=True, text=True,
+        timeout=600)
+    assert result.returncode == 0, result.stdout + result.stderr
+    conn = sqlite3.connect(path)
+    yield conn
+    conn.close()
+
+def scalar(conn, statement):
+    return conn.execute(statement).fetchone()[0]
+
+def test_customers_and_orders_are_stored(seeded):
+    # The fixed test customer is added to the customers asked for
+    assert scalar(seeded, 'SELECT COUNT(*) FROM Customers') == CUSTOMERS + 1
+    assert scalar(seeded, 'SELECT COUNT(*) FROM Orders') > 0
+    assert scalar(seeded, 'SELECT COUNT(*) FROM Orders') == scalar(seeded, 'SELECT COUNT(*) FROM PaymentDetails')
+    assert scalar(seeded, '''
+        SELECT COUNT(*) FROM OrderDetails od LEFT JOIN Orders o ON o.OrderID = od.OrderID WHERE o.OrderID IS NULL
+    ''') == 0
+
+def test_customer_stats_match_the_orders(seeded):
+    assert scalar(seeded, 'SELECT COUNT(*) FROM CustomerStats') == scalar(
+        seeded, 'SELECT COUNT(DISTINCT CustomerID) FROM Orders')
+    assert scalar(seeded, '''
+        SELECT COUNT(*) FROM CustomerStats s
+        JOIN (SELECT CustomerID, COUNT(*) AS Orders FROM Orders GROUP BY CustomerID) o ON o.CustomerID = s.CustomerID
+        WHERE o.Orders != s.OrderCount
+    ''') == 0
+
+def test_daily_product_sales_match_the_order_lines(seeded):
+    assert scalar(seeded, '''
+        SELECT COUNT(*) FROM DailyProductSales s
+        JOIN (
+            SELECT DATE(o.OrderDate) AS SalesDate, od.ProductID, SUM(od.Quantity) AS Quantity,
+                   ROUND(SUM(CAST(od.TotalPrice AS REAL)), 2) AS Revenue
+            FROM Orders o JOIN OrderDetails od ON od.OrderID = o.OrderID
+            GROUP BY DATE(o.OrderDate), od.ProductID
+        ) l ON l.SalesDate = s.SalesDate AND l.ProductID = s.ProductID
+        WHERE l.Quantity != s.Quantity OR ABS(l.Revenue - CAST(s.Revenue AS REAL)) > 0.005
+    ''') == 0
+    assert scalar(seeded, 'SELECT SUM(Quantity) FROM DailyProductSales') == scalar(
+        seeded, 'SELECT SUM(Quantity) FROM OrderDetails')
+
+def test_popular_products_add_up_the_quantities(seeded):
+    assert scalar(seeded, '''
+        SELECT COUNT(*) FROM PopularProducts p
+        JOIN (SELECT ProductID, SUM(Quantity) AS Quantity FROM OrderDetails GROUP BY ProductID) l
+            ON l.ProductID = p.ProductID
+        WHERE l.Quantity != CAST(p.PopularityScore AS REAL)
+    ''') == 0
+
+def test_order_patterns_hold_one_row_per_peak_hour(seeded):
+    assert scalar(seeded, '''
+        SELECT COUNT(*) FROM (SELECT ProductID, OrderHour FROM OrderPatterns GROUP BY ProductID, OrderHour
+                              HAVING COUNT(*) > 1)
+    ''') == 0
+
+def test_watermarks_reach_the_last_order(seeded):
+    last_order_id = scalar(seeded, 'SELECT MAX(OrderID) FROM Orders')
+    assert seeded.execute('SELECT RollupName, LastOrderID FROM RollupWatermarks ORDER BY RollupName').fetchall() == [
+        ('CustomerStats', last_order_id), ('DailyProductSales', last_order_id), ('OrderDerivedTables', last_order_id)]
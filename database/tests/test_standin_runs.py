@@ -0,0 +1,57 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import DATABASE_DIRECTORY, LOADER_PATH
+from seeding import sinks
+
+CUSTOMERS = 100
+
+# Function to build the loader's command line for a run of the given sink
+def loader_args(sink, directory, *options):
+    return ['--sink', sink, '--sink-path', str(directory / f"seed.{sink}"), '--customers', str(CUSTOMERS),
+            '--bcrypt-cost', '4', '--hash-workers', '2', '--seed', '9', '--as-of', '2024-06-30 12:00:00',
+            '--instrumentation', 'off', '--credentials-path', str(directory / 'credentials.txt'), *options]
+
+# Fixture recording every statement stand-in cursors are handed, and the ones they refuse
+@pytest.fixture
+def statements(monkeypatch):
+    issued, refused = [], []
+    for method in ('execute', 'executemany'):
+        def record(self, statement, params=(), original=getattr(sinks.StandinCursor, method)):
+            issued.append(' '.join(statement.split()))
+            try:
+                return original(self, statement, params)
+            except Exception:
+                refused.append(issued[-1])
+                raise
+        monkeypatch.setattr(sinks.StandinCursor, method, record)
+    return issued, refused
+
+@pytest.mark.parametrize('sink', [sink for sink in sinks.STANDIN_SINKS if sinks.sink_available(sink)])
+def test_every_statement_of_a_run_is_modelled(loader, statements, sink, tmp_path, monkeypatch, capsys):
+    issued, refused = statements
+    monkeypatch.setattr(sys, 'argv', [LOADER_PATH] + loader_args(sink, tmp_path))
+    assert loader.main() == 0, capsys.readouterr().out
+    assert refused == []
+    # Every table the loader writes went through the stand-in
+    written = {statement.split()[2] for statement in issued if statement.startswith('INSERT INTO')}
+    assert set(sinks.ID_COLUMNS) <= written
+
+# Function to run the loader in its own process, returning the lines describing the data
+def seeded_lines(directory, *options):
+    result = subprocess.run([sys.executable, LOADER_PATH] + loader_args('null', directory, *options),
+                            cwd=DATABASE_DIRECTORY, env={**os.environ, 'DATABASE_PORT': '3306'},
+                            capture_output=True, text=True, timeout=600)
+    assert result.returncode == 0, result.stdout + result.stderr
+    return sorted(line for line in result.stdout.splitlines()
+                  if line.startswith('Sink ') or 'shopping sessions and' in line)
+
+def test_sharded_runs_store_the_same_rows(tmp_path):
+    # The shards write over their own connections, so this process's sink only learns
+    # of their customers and orders from their results
+    single = seeded_lines(tmp_path)
+    assert any(line.startswith('Sink Customers: ') for line in single)
+    assert seeded_lines(tmp_path, '--shards', '3') == single
@@ -0,0 +1,44 @@
+import pytest
+
+from seeding.tenants import MAX_CATALOGUE_VARIATION, Tenant, parse_customer_range, plan_tenants, vary_catalogue
+
+CATALOGUE = {
+    'Coffee': {'items': ['Espresso', 'Latte', 'Mocha', 'Flat White'], 'cost_range': (1.0, 2.0),
+               'price_range': (3.0, 5.0)},
+    'Cakes': {'items': ['Brownie', 'Muffin'], 'cost_range': (0.5, 1.5), 'price_range': (2.0, 4.0)},
+}
+
+@pytest.mark.parametrize('value, expected', [('500', (500, 500)), ('100-900', (100, 900)), ('1-1', (1, 1))])
+def test_customer_ranges_are_a_count_or_bounds(value, expected):
+    assert parse_customer_range(value) == expected
+
+@pytest.mark.parametrize('value', ['0', '900-100', '-5', 'ten', '10-'])
+def test_invalid_customer_ranges_are_refused(value):
+    with pytest.raises(ValueError):
+        parse_customer_range(value)
+
+def test_tenants_get_their_own_database_seed_and_size():
+    tenants = plan_tenants(3, 'restaurant', 9, (100, 900))
+    assert [tenant.database for tenant in tenants] == ['restaurant_01', 'restaurant_02', 'restaurant_03']
+    assert [tenant.index for tenant in tenants] == [1, 2, 3]
+    assert len({tenant.seed for tenant in tenants}) == 3
+    assert all(100 <= tenant.customers <= 900 for tenant in tenants)
+    assert plan_tenants(1, 'restaurant', 9, (250, 250)) == [Tenant(1, 'restaurant_01', tenants[0].seed, 250)]
+
+def test_adding_tenants_keeps_the_ones_planned_before():
+    assert plan_tenants(5, 'restaurant', 9, (100, 900))[:3] == plan_tenants(3, 'restaurant', 9, (100, 900))
+    assert plan_tenants(3, 'restaurant', 10, (100, 900)) != plan_tenants(3, 'restaurant', 9, (100, 900))
+
+def test_catalogue_without_variation_is_kept():
+    assert vary_catalogue(CATALOGUE, 9, 0) == CATALOGUE
+
+def test_varied_catalogues_keep_menu_order_and_enough_items():
+    for seed in range(20):
+        varied = vary_catalogue(CATALOGUE, seed, MAX_CATALOGUE_VARIATION)
+        for category, data in CATALOGUE.items():
+            items = varied[category]['items']
+            assert items == [item for item in data['items'] if item in items]
+            assert len(items) >= max(1, round(len(data['items']) * (1 - MAX_CATALOGUE_VARIATION)))
+            (low, high), (varied_low, varied_high) = data['price_range'], varied[category]['price_range']
+            assert varied_low / low == pytest.approx(varied_high / high, rel=0.01)
+    assert vary_catalogue(CATALOGUE, 1, 0.3) == vary_catalogue(CATALOGUE, 1, 0.3)
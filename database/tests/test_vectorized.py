@@ -0,0 +1,78 @@
+import datetime
+
+import pytest
+
+pytest.importorskip('numpy')
+
+from seeding import vectorized
+from seeding.orders import DEFAULT_ORDER_COUNTS, OrderAggregates, OrderSettings, register_order_tables
+
+SETTINGS = OrderSettings(1, datetime.date(2024, 1, 1), datetime.datetime(2024, 3, 1, 12, 30), DEFAULT_ORDER_COUNTS,
+                         'numpy')
+PRODUCTS = {product_id: (round(2.5 * product_id, 2), round(1.25 * product_id, 2)) for product_id in range(1, 21)}
+
+# Writer keeping every row added, by table
+class RecordingWriter:
+    def __init__(self):
+        self.columns = {}
+        self.rows = {}
+
+    def register(self, table, columns, on_duplicate=''):
+        self.columns[table] = columns
+        self.rows[table] = []
+
+    def add_many(self, table, rows):
+        self.rows[table].extend(rows)
+
+    def checkpoint(self, position):
+        pass
+
+# Function to generate the orders of the customers in ranges, numbering each range after the last
+def generate(*ranges, customer_stats=False):
+    writer = RecordingWriter()
+    register_order_tables(writer, customer_stats=customer_stats)
+    aggregates = OrderAggregates()
+    order_id = order_detail_id = 1
+    for first_customer_id, last_customer_id in ranges:
+        orders, lines = vectorized.write_orders(writer, range(first_customer_id, last_customer_id + 1), SETTINGS,
+                                                PRODUCTS, order_id, order_detail_id, aggregates)
+        order_id += orders
+        order_detail_id += lines
+    return writer, aggregates
+
+def test_count_orders_matches_the_orders_written():
+    writer, _ = generate((1, 300))
+    assert vectorized.count_orders(SETTINGS, 1, 300) == (len(writer.rows['Orders']), len(writer.rows['OrderDetails']))
+
+def test_customers_get_the_same_orders_however_they_are_split():
+    whole, _ = generate((1, 300))
+    split, _ = generate((1, 120), (121, 300))
+    orders = lambda writer: sorted((customer_id, order_date) for _, customer_id, order_date in writer.rows['Orders'])
+    assert orders(whole) == orders(split)
+
+def test_orders_and_payments_fall_within_the_window():
+    writer, aggregates = generate((1, 300))
+    start = datetime.datetime.combine(SETTINGS.start_date, datetime.time())
+    assert all(start <= order_date <= SETTINGS.now for _, _, order_date in writer.rows['Orders'])
+    assert all(start <= payment[3] <= SETTINGS.now for payment in writer.rows['PaymentDetails'])
+    assert aggregates.last_order_id == len(writer.rows['Orders'])
+
+def test_customer_stats_add_up_to_the_orders():
+    writer, _ = generate((1, 300), customer_stats=True)
+    stats = writer.rows['CustomerStats']
+    assert sum(order_count for _, order_count, _, _, _ in stats) == len(writer.rows['Orders'])
+    assert sum(spend for _, _, spend, _, _ in stats) == sum(payment[2] for payment in writer.rows['PaymentDetails'])
+
+def test_aggregates_add_up_to_the_order_lines():
+    writer, aggregates = generate((1, 300))
+    quantity = sum(line[3] for line in writer.rows['OrderDetails'])
+    assert sum(aggregates.popularity_scores.values()) == quantity
+    assert sum(totals[0] for totals in aggregates.daily_sales.values()) == quantity
+    assert sum(totals[0] for totals in aggregates.product_orders.values()) == quantity
+
+def test_keyed_sums_reduce_by_key():
+    numpy = vectorized.numpy
+    sums = vectorized.KeyedSums(2)
+    sums.add(numpy.array([3, 1, 3]), numpy.array([1, 2, 3]), numpy.array([10, 20, 30]))
+    sums.add(numpy.array([1, 7]), numpy.array([4, 5]), numpy.array([40, 50]))
+    assert list(sums.items()) == [(1, 6, 60), (3, 4, 40), (7, 5, 50)]
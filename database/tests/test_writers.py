@@ -0,0 +1,75 @@
+import datetime
+import os
+
+from seeding.writers import LoadDataWriter, tsv_field
+
+# Cursor recording the statements run, with the contents of the files loaded by LOAD DATA
+class LoadDataCursor:
+    def __init__(self):
+        self.statements = []
+        self.loaded = []
+
+    def execute(self, statement, params=()):
+        statement = ' '.join(statement.split())
+        self.statements.append(statement)
+        if statement.startswith('LOAD DATA'):
+            with open(params[0], encoding='utf-8') as source:
+                self.loaded.append((statement.split()[7], source.read()))
+
+def test_fields_are_escaped_for_load_data():
+    assert tsv_field(None) == '\\N'
+    assert tsv_field(True) == '1'
+    assert tsv_field(datetime.datetime(2024, 1, 2, 3, 4, 5)) == '2024-01-02 03:04:05'
+    assert tsv_field('a\tb\nc\\d') == 'a\\tb\\nc\\\\d'
+
+def test_rows_are_loaded_from_a_spool_file():
+    cursor = LoadDataCursor()
+    writer = LoadDataWriter(cursor, batch_size=2)
+    writer.register('Orders', ('OrderID', 'CustomerID', 'OrderDate'))
+    writer.add('Orders', (1, 7, datetime.datetime(2024, 1, 2, 3, 4, 5)))
+    writer.add('Orders', (2, None, datetime.datetime(2024, 1, 3)))
+    assert cursor.loaded == [('Orders', '1\t7\t2024-01-02 03:04:05\n2\t\\N\t2024-01-03 00:00:00\n')]
+    assert cursor.statements[0].endswith('(OrderID, CustomerID, OrderDate)')
+    assert os.listdir(writer.directory) == []
+    writer.close()
+    assert not os.path.exists(writer.directory)
+
+def test_parent_tables_are_loaded_before_their_children():
+    cursor = LoadDataCursor()
+    writer = LoadDataWriter(cursor, batch_size=10)
+    writer.register('Orders', ('OrderID', 'CustomerID'))
+    writer.register('OrderDetails', ('OrderDetailID', 'OrderID'))
+    writer.add('Orders', (1, 7))
+    writer.add('OrderDetails', (1, 1))
+    writer.flush('OrderDetails')
+    assert [table for table, _ in cursor.loaded] == ['Orders', 'OrderDetails']
+    writer.close()
+
+def test_upserted_tables_are_staged_and_merged():
+    cursor = LoadDataCursor()
+    writer = LoadDataWriter(cursor)
+    upsert = 'ON DUPLICATE KEY UPDATE Quantity = Quantity + VALUES(Quantity)'
+    writer.register('DailyProductSales', ('SalesDate', 'ProductID', 'Quantity'), upsert)
+    writer.add('DailyProductSales', ('2024-01-02', 3, 5))
+    writer.flush()
+    assert cursor.loaded == [('DailyProductSales_Staging', '2024-01-02\t3\t5\n')]
+    assert cursor.statements == [
+        'CREATE TEMPORARY TABLE IF NOT EXISTS DailyProductSales_Staging LIKE DailyProductSales',
+        'TRUNCATE TABLE DailyProductSales_Staging',
+        cursor.statements[2],
+        'INSERT INTO DailyProductSales (SalesDate, ProductID, Quantity) SELECT * FROM (SELECT SalesDate AS Staged0, '
+        'ProductID AS Staged1, Quantity AS Staged2 FROM DailyProductSales_Staging) AS Staged ' + upsert,
+        'DROP TEMPORARY TABLE DailyProductSales_Staging',
+    ]
+    assert cursor.statements[2].startswith('LOAD DATA LOCAL INFILE %s INTO TABLE DailyProductSales_Staging')
+    assert writer.rows_written == {'DailyProductSales': 1}
+    writer.close()
+
+def test_unloaded_rows_are_discarded_on_close():
+    cursor = LoadDataCursor()
+    writer = LoadDataWriter(cursor)
+    writer.register('Orders', ('OrderID', 'CustomerID'))
+    writer.add('Orders', (1, 7))
+    writer.close()
+    assert cursor.statements == [] and writer.pending == {'Orders': 0}
+    assert not os.path.exists(writer.directory)